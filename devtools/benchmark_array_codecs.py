@@ -0,0 +1,64 @@
+"""
+Benchmark array codecs for SimStore ndarray storage.
+
+Reports write (serialize) and read (deserialize) throughput in MB/s of
+uncompressed data, compression ratio, and maximum error for each codec on
+random-walk coordinates.
+
+Usage: python benchmark_array_codecs.py [n_atoms] [n_frames]
+"""
+import sys
+import time
+
+import numpy as np
+
+from openpathsampling.experimental.simstore.attribute_handlers import (
+    NDArrayHandler
+)
+
+CODECS = ['', '|zlib', '|zlib(1)', '|lzma', '|quantize(0.001)',
+          '|quantize(0.001)|zlib', '|quantize(0.001)|lzma']
+
+
+def make_frames(n_atoms, n_frames, seed=0):
+    rng = np.random.RandomState(seed)
+    start = rng.uniform(0.0, 5.0, size=(n_atoms, 3))
+    steps = rng.normal(scale=0.01, size=(n_frames, n_atoms, 3))
+    return (start + np.cumsum(steps, axis=0)).astype(np.float32)
+
+
+def benchmark(codecs, frames):
+    n_atoms = frames.shape[1]
+    type_str = 'ndarray.float32({},3)'.format(n_atoms) + codecs
+    handler = NDArrayHandler.from_type_string(type_str)
+    megabytes = frames.nbytes / 1e6
+
+    start = time.time()
+    serialized = [handler.serialize(frame) for frame in frames]
+    write_time = time.time() - start
+
+    start = time.time()
+    deserialized = [handler.deserialize(data) for data in serialized]
+    read_time = time.time() - start
+
+    ratio = frames.nbytes / float(sum(len(data) for data in serialized))
+    error = max(np.abs(frame - orig).max()
+                for frame, orig in zip(deserialized, frames))
+    return megabytes / write_time, megabytes / read_time, ratio, error
+
+
+def main(n_atoms=50000, n_frames=20):
+    frames = make_frames(n_atoms, n_frames)
+    print("{} atoms, {} frames".format(n_atoms, n_frames))
+    print("{:24s} {:>12s} {:>12s} {:>8s} {:>10s}".format(
+        "codecs", "write MB/s", "read MB/s", "ratio", "max error"
+    ))
+    for codecs in CODECS:
+        write, read, ratio, error = benchmark(codecs, frames)
+        print("{:24s} {:12.1f} {:12.1f} {:8.2f} {:10.2e}".format(
+            codecs or "(none)", write, read, ratio, error
+        ))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,84 @@
+"""
+Benchmark the netCDF storage profiles.
+
+For each profile, saves a random-walk trajectory of toy snapshots and
+reports the time to save it, the file size, and the read throughput in
+MB/s of uncompressed coordinates for reading whole frames one at a time
+and for reading the time series of single atoms.
+
+Usage: python benchmark_storage_profiles.py [n_atoms] [n_frames]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import openpathsampling as paths
+import openpathsampling.engines.toy as toys
+
+
+def make_trajectory(n_atoms, n_frames, seed=0):
+    rng = np.random.RandomState(seed)
+    topology = toys.Topology(n_spatial=3, masses=np.ones(n_atoms), pes=None,
+                             n_atoms=n_atoms)
+    engine = toys.Engine({}, topology)
+    start = rng.uniform(0.0, 5.0, size=(n_atoms, 3))
+    steps = rng.normal(scale=0.01, size=(n_frames, n_atoms, 3))
+    coordinates = start + np.cumsum(steps, axis=0)
+    return paths.Trajectory([
+        toys.Snapshot(coordinates=coords,
+                      velocities=rng.normal(size=(n_atoms, 3)),
+                      engine=engine)
+        for coords in coordinates
+    ])
+
+
+def benchmark(profile, trajectory, filename):
+    start = time.time()
+    storage = paths.Storage(filename, 'w', template=trajectory[0],
+                            profile=profile)
+    storage.save(trajectory)
+    storage.close()
+    write_time = time.time() - start
+    size = os.path.getsize(filename) / 1e6
+
+    storage = paths.Storage(filename, 'r')
+    variable = storage.variables['snapshot0_coordinates']
+    n_frames, n_atoms, n_spatial = variable.shape
+    megabytes = n_frames * n_atoms * n_spatial * 4 / 1e6
+
+    start = time.time()
+    for frame in range(n_frames):
+        _ = variable[frame]
+    frame_time = time.time() - start
+
+    n_series = min(n_atoms, 10)
+    start = time.time()
+    for atom in range(n_series):
+        _ = variable[:, atom]
+    series_time = (time.time() - start) * n_atoms / n_series
+    storage.close()
+
+    return write_time, size, megabytes / frame_time, megabytes / series_time
+
+
+def main(n_atoms=2000, n_frames=500):
+    trajectory = make_trajectory(n_atoms, n_frames)
+    filename = os.path.join(tempfile.mkdtemp(), "profile.nc")
+    print("{} atoms, {} frames".format(n_atoms, n_frames))
+    print("{:22s} {:>9s} {:>10s} {:>12s} {:>12s}".format(
+        "profile", "write s", "size MB", "frames MB/s", "atoms MB/s"
+    ))
+    for profile in sorted(paths.Storage.storage_profiles):
+        write, size, frames, atoms = benchmark(profile, trajectory,
+                                               filename)
+        print("{:22s} {:9.2f} {:10.1f} {:12.1f} {:12.1f}".format(
+            profile, write, size, frames, atoms
+        ))
+    os.remove(filename)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
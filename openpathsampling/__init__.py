@@ -73,7 +73,7 @@ from .ensemble import (
     ReversedTrajectoryEnsemble, SequentialEnsemble, VolumeEnsemble,
     SequentialEnsemble, IntersectionEnsemble, UnionEnsemble,
     SingleFrameEnsemble, MinusInterfaceEnsemble, TISEnsemble,
-    OptionalEnsemble, join_ensembles
+    OptionalEnsemble, join_ensembles, EnsembleVerdictCache
 )
 
 from .step_visualizer_2D import StepVisualizer2D
@@ -2,6 +2,7 @@ import collections
 import pandas as pd
 import numpy as np
 
+import openpathsampling as paths
 from openpathsampling.netcdfplus import StorableNamedObject
 
 class ChannelAnalysis(StorableNamedObject):
@@ -85,11 +86,22 @@ class ChannelAnalysis(StorableNamedObject):
         """
         # for now, this assumes only one ensemble per channel
         # (would like that to change in the future)
+        # the summary only has MC cycle numbers, see _step_num
+        if self._step_num is ChannelAnalysis._step_num:
+            summary = paths.storage.StepSummary.for_steps(steps)
+        else:
+            summary = None
+        if summary is not None:
+            step_trajectories = self._step_trajectories_from_summary(summary)
+        else:
+            step_trajectories = (
+                (self._step_num(step), step.active[self.replica].trajectory)
+                for step in steps
+            )
+
         prev_traj = None
         last_start = {c: None for c in self._results}
-        for step in steps:
-            step_num = self._step_num(step)
-            traj = step.active[self.replica].trajectory
+        for step_num, traj in step_trajectories:
             if prev_traj is None:
                 prev_result = {c: len(self.channels[c].split(traj)) > 0
                                for c in self.channels}
@@ -129,6 +141,26 @@ class ChannelAnalysis(StorableNamedObject):
                 else:
                     self._results[c] += [(last_start[c], next_step)]
 
+    def _step_trajectories_from_summary(self, summary):
+        """Yield (step number, trajectory) using a :class:`.StepSummary`
+
+        Trajectories are only loaded when the replica's trajectory changes.
+        Only used if :meth:`._step_num` gives the MC cycle number.
+        """
+        col = summary.replica_column(self.replica)
+        trajectory_store = summary.storage.trajectories
+        prev_idx = None
+        traj = None
+        for step_num, traj_idx in zip(summary.mccycle,
+                                      summary.trajectories[:, col]):
+            if traj_idx < 0:
+                # replica not active in this step, as in SampleSet lookup
+                raise KeyError(self.replica)
+            if traj_idx != prev_idx:
+                traj = trajectory_store[int(traj_idx)]
+                prev_idx = traj_idx
+            yield int(step_num), traj
+
     @property
     def treat_multiples(self):
         """
@@ -1,4 +1,5 @@
 import collections
+import numpy as np
 import openpathsampling as paths
 import pandas as pd
 import scipy.sparse
@@ -110,6 +111,10 @@ class ReplicaNetwork(object):
     def _analysis_from_steps(self, steps=None):
         if steps is None:
             raise RuntimeError("No steps given to analyze!")
+        summary = paths.storage.StepSummary.for_steps(steps)
+        if summary is not None:
+            return self._analysis_from_summary(summary)
+
         n_trials = 0
         analysis = {}
         analysis['n_trials'] = {}
@@ -139,11 +144,41 @@ class ReplicaNetwork(object):
             analysis['n_trials'][key] = n_trials
         return analysis['n_trials'], analysis['n_accepted']
 
+    @staticmethod
+    def _analysis_from_summary(summary):
+        """Fast version of :meth:`._analysis_from_steps` for a
+        :class:`.StepSummary`"""
+        movers = summary.load('pathmovers', summary.mover)
+        is_repex = {idx: mover is not None and mover.is_ensemble_change_mover
+                    for idx, mover in movers.items()}
+        n_trials = 0
+        hop_counts = collections.Counter()
+        for step_idx in range(1, len(summary)):
+            if not is_repex[int(summary.mover[step_idx])]:
+                continue
+            n_trials += 1
+            old = summary.ensembles[step_idx - 1]
+            new = summary.ensembles[step_idx]
+            hopped = (old >= 0) & (new >= 0) & (old != new)
+            hop_counts.update(zip(old[hopped].tolist(),
+                                  new[hopped].tolist()))
+
+        ensembles = summary.load('ensembles',
+                                 [idx for hop in hop_counts for idx in hop])
+        n_accepted = {(ensembles[i], ensembles[j]): count
+                      for (i, j), count in hop_counts.items()}
+        n_trials = {key: n_trials for key in n_accepted}
+        return n_trials, n_accepted
+
 
     def _traces_from_steps(self, steps):
         """
         Calculates all the traces (fixed replica or fixed ensemble).
         """
+        summary = paths.storage.StepSummary.for_steps(steps)
+        if summary is not None:
+            return self._traces_from_summary(summary)
+
         full_traces = collections.defaultdict(list)
         for step in steps:
             for sample in step.active:
@@ -155,6 +190,25 @@ class ReplicaNetwork(object):
         traces = {k: condense_repeats(full_traces[k]) for k in full_traces}
         return traces
 
+    @staticmethod
+    def _traces_from_summary(summary):
+        """Fast version of :meth:`._traces_from_steps` for a
+        :class:`.StepSummary`"""
+        step_idxs, cols = np.nonzero(summary.ensembles >= 0)
+        ens_idxs = summary.ensembles[step_idxs, cols]
+        ensembles = summary.load('ensembles', ens_idxs)
+        traces = {}
+        for col, replica in enumerate(summary.replicas):
+            trace = [ensembles[idx] for idx in ens_idxs[cols == col]]
+            if trace:
+                traces[int(replica)] = condense_repeats(trace)
+
+        for ens_idx, ens in ensembles.items():
+            trace = summary.replicas[cols[ens_idxs == ens_idx]].tolist()
+            traces[ens] = condense_repeats(trace, use_is=False)
+
+        return traces
+
 
     def _transitions_from_traces(self, traces):
         """
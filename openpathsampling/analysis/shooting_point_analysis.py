@@ -1,6 +1,7 @@
 import collections
 import pandas as pd
 import numpy as np
+import scipy.stats
 import warnings
 
 from openpathsampling.progress import SimpleProgress
@@ -77,6 +78,51 @@ class SnapshotByCoordinateDict(TransformedDict):
                                                        *args, **kwargs)
 
 
+def proportion_interval(n_success, n_total, confidence=0.95,
+                        method='wilson'):
+    """Confidence interval for a probability estimated from counts.
+
+    Used for the committor from shooting counts, where ``n_success`` is the
+    number of shots that ended in the state of interest.
+
+    Parameters
+    ----------
+    n_success : int
+        number of successes (e.g., shots that ended in the state)
+    n_total : int
+        total number of trials (shots)
+    confidence : float
+        confidence level of the interval
+    method : str
+        'wilson' for the Wilson score interval of the binomial proportion;
+        'beta' for the equal-tailed credible interval of the Beta posterior
+        from a uniform prior
+
+    Returns
+    -------
+    tuple of float
+        (low, high) bounds of the interval; (0.0, 1.0) if ``n_total`` is 0
+    """
+    if n_total == 0:
+        return (0.0, 1.0)
+    if method == 'wilson':
+        z = scipy.stats.norm.ppf(0.5 + 0.5 * confidence)
+        p = float(n_success) / n_total
+        denominator = 1.0 + z**2 / n_total
+        center = (p + z**2 / (2.0 * n_total)) / denominator
+        half_width = z * np.sqrt(p * (1.0 - p) / n_total
+                                 + z**2 / (4.0 * n_total**2)) / denominator
+        return (max(0.0, center - half_width), min(1.0, center + half_width))
+    elif method == 'beta':
+        tail = 0.5 * (1.0 - confidence)
+        a = n_success + 1
+        b = n_total - n_success + 1
+        return (scipy.stats.beta.ppf(tail, a, b),
+                scipy.stats.beta.ppf(1.0 - tail, a, b))
+    else:
+        raise ValueError("Unknown interval method: " + str(method))
+
+
 class ShootingPointAnalysisError(AssertionError):
     # TODO this should inherit from a different Error type in OPS 2.0
     pass
@@ -273,6 +319,44 @@ class ShootingPointAnalysis(SimpleProgress, SnapshotByCoordinateDict):
             results[out_key] = committor
         return results
 
+    def committor_interval(self, state, confidence=0.95, method='wilson',
+                           label_function=None):
+        """Confidence interval of the (point-by-point) committor.
+
+        The width of the interval depends on the number of shots from each
+        configuration, so configurations with different numbers of shots
+        (e.g., from :meth:`.CommittorSimulation.run_adaptive`) can be
+        compared.
+
+        Parameters
+        ----------
+        state : :class:`.Volume`
+            the committor is 1.0 if 100% of shots enter this state
+        confidence : float
+            confidence level of the interval
+        method : str
+            'wilson' or 'beta'; see :func:`.proportion_interval`
+        label_function : callable
+            the keys for the dictionary that is returned are
+            `label_function(snapshot)`; default `None` gives the snapshot as
+            key.
+
+        Returns
+        -------
+        dict :
+            mapping labels given by label_function to (low, high)
+        """
+        if label_function is None:
+            label_function = lambda s: s
+        results = {}
+        for k in self:
+            counter_k = self[k]
+            n_total = sum([counter_k[s] for s in self.states])
+            results[label_function(k)] = proportion_interval(
+                counter_k[state], n_total, confidence, method
+            )
+        return results
+
     @staticmethod
     def _get_key_dim(key):
         try:
@@ -286,7 +370,8 @@ class ShootingPointAnalysis(SimpleProgress, SnapshotByCoordinateDict):
             raise RuntimeError(err)
         return ndim
 
-    def committor_histogram(self, new_hash, state, bins=10):
+    def committor_histogram(self, new_hash, state, bins=10,
+                            weighting='shots'):
         """Calculate the histogrammed version of the committor.
 
         Parameters
@@ -297,6 +382,11 @@ class ShootingPointAnalysis(SimpleProgress, SnapshotByCoordinateDict):
             the committor is 1.0 if 100% of shots enter this state
         bins : see numpy.histogram
             bins input to numpy.histogram
+        weighting : str
+            'shots' (default) gives the fraction of all shots in a bin that
+            enter ``state``; 'snapshots' gives the average of the
+            per-configuration committors in a bin, so that configurations
+            with more shots don't carry more weight
 
         Returns
         -------
@@ -305,30 +395,44 @@ class ShootingPointAnalysis(SimpleProgress, SnapshotByCoordinateDict):
             count and bins is the bins output from numpy.histogram. 2-tuple
             in the case of 1D histogram, 3-tuple in the case of 2D histogram
         """
-        rehashed = self.rehash(new_hash)
-        r_store = rehashed.store
-        count_all = {k: sum(r_store[k].values()) for k in r_store}
-        count_state = {k: r_store[k][state] for k in r_store}
-        ndim = self._get_key_dim(list(r_store.keys())[0])
+        if weighting == 'shots':
+            rehashed = self.rehash(new_hash)
+            r_store = rehashed.store
+            keys = list(r_store.keys())
+            all_weights = [sum(r_store[k].values()) for k in keys]
+            state_weights = [r_store[k][state] for k in keys]
+        elif weighting == 'snapshots':
+            keys = []
+            all_weights = []
+            state_weights = []
+            for (hashed, counter) in self.store.items():
+                n_total = sum([counter[s] for s in self.states])
+                if n_total == 0:
+                    continue
+                keys.append(new_hash(self.hash_representatives[hashed]))
+                all_weights.append(1.0)
+                state_weights.append(float(counter[state]) / n_total)
+        else:
+            raise ValueError("Unknown weighting: " + str(weighting))
+
+        ndim = self._get_key_dim(keys[0])
         if ndim == 1:
-            (all_hist, b) = np.histogram(list(count_all.keys()),
-                                         weights=list(count_all.values()),
+            (all_hist, b) = np.histogram(keys, weights=all_weights,
                                          bins=bins)
-            (state_hist, b) = np.histogram(list(count_state.keys()),
-                                           weights=list(count_state.values()),
+            (state_hist, b) = np.histogram(keys, weights=state_weights,
                                            bins=bins)
             b_list = [b]
         elif ndim == 2:
             (all_hist, b_x, b_y) = np.histogram2d(
-                x=[k[0] for k in count_all],
-                y=[k[1] for k in count_all],
-                weights=list(count_all.values()),
+                x=[k[0] for k in keys],
+                y=[k[1] for k in keys],
+                weights=all_weights,
                 bins=bins
             )
             (state_hist, b_x, b_y) = np.histogram2d(
-                x=[k[0] for k in count_state],
-                y=[k[1] for k in count_state],
-                weights=list(count_state.values()),
+                x=[k[0] for k in keys],
+                y=[k[1] for k in keys],
+                weights=state_weights,
                 bins=bins
             )
             b_list = [b_x, b_y]
@@ -11,3 +11,6 @@ from .standard_analysis import (
 )
 
 from .misc import PathLengthHistogrammer, ConditionalTransitionProbability
+from .online import OnlineTISAnalysisHook
+from .sharded import ShardedTISAnalysis
+from .interface_placement import InterfacePlacement
@@ -26,6 +26,12 @@ def steps_to_weighted_trajectories(steps, ensembles):
         trajectory associated with that ensemble to its counter of time
         spent in the ensemble.
     """
+    summary = paths.storage.StepSummary.for_steps(steps)
+    if summary is not None:
+        results = _weighted_trajectories_from_summary(summary, ensembles)
+        if results is not None:
+            return results
+
     results = {e: collections.Counter() for e in ensembles}
 
     # loop over blocks # TODO: add blocksize parameter, test various sizes
@@ -43,6 +49,39 @@ def steps_to_weighted_trajectories(steps, ensembles):
     return results
 
 
+def _weighted_trajectories_from_summary(summary, ensembles):
+    """Fast version of :func:`.steps_to_weighted_trajectories`.
+
+    Works on the trajectory indices in a :class:`.StepSummary`, so only
+    the distinct trajectories are loaded. Returns None if some ensemble is
+    not occupied in every step; the caller then uses the full steps.
+    """
+    ensemble_store = summary.storage.ensembles
+    columns = {}
+    for ens in ensembles:
+        ens_idx = ensemble_store.index.get(ens.__uuid__)
+        if ens_idx is None:
+            return None
+        columns[ens] = summary.ensemble_column(ens_idx)
+        if np.any(columns[ens] < 0):
+            return None
+
+    trajectories = summary.load(
+        'trajectories', np.unique(np.concatenate(
+            [col for col in columns.values()] + [np.zeros(0, dtype=int)]
+        ))
+    )
+    results = {}
+    for ens, column in columns.items():
+        counter = collections.Counter()
+        traj_idxs, counts = np.unique(column, return_counts=True)
+        for traj_idx, count in zip(traj_idxs, counts):
+            counter[trajectories[int(traj_idx)]] += int(count)
+        results[ens] = counter
+
+    return results
+
+
 class TransitionDictResults(StorableNamedObject):
     """Analysis result object for properties of a transition.
 
@@ -126,22 +126,15 @@ class MinusMoveFlux(MultiEnsembleSamplingAnalyzer):
                 if s.change.canonical.mover in self.minus_movers
                 and s.change.accepted]
 
-    def trajectory_transition_flux_dict(self, minus_steps):
+    def _flux_pair_mappings(self):
         """
-        Main minus move-based flux analysis routine.
-
-        Parameters
-        ----------
-        minus_steps: list of :class:`.MCStep`
-            steps that used the minus movers
+        Mappings from each flux pair to the objects used to analyze it.
 
         Returns
         -------
-        dict of {(:class:`.Volume, :class:`.Volume`): dict}
-            keys are (state, interface); values are the result dict from
-            :meth:`.TrajectoryTransitionAnalysis.analyze_flux` (keys are
-            strings 'in' and 'out', mapping to
-            :class:`.TrajectorySegmentContainer` with appropriate frames.
+        tuple of dict
+            dicts from flux pair to minus mover, to minus ensemble, and to
+            the :class:`.TrajectoryTransitionAnalysis` for that pair
         """
         # set up a few mappings that make it easier set up other things
         flux_pair_to_transition = {
@@ -168,11 +161,6 @@ class MinusMoveFlux(MultiEnsembleSamplingAnalyzer):
             assert pair in flux_pair_to_minus_mover.keys()
         assert len(self.flux_pairs) == len(minus_mover_to_flux_pair)
 
-        # organize the steps by mover used
-        mover_to_steps = collections.defaultdict(list)
-        for step in minus_steps:
-            mover_to_steps[step.change.canonical.mover].append(step)
-
         # create the actual TrajectoryTransitionAnalysis objects to use
         transition_flux_calculators = {
             k: paths.TrajectoryTransitionAnalysis(
@@ -181,6 +169,33 @@ class MinusMoveFlux(MultiEnsembleSamplingAnalyzer):
             )
             for k in self.flux_pairs
         }
+        return (flux_pair_to_minus_mover, flux_pair_to_minus_ensemble,
+                transition_flux_calculators)
+
+    def trajectory_transition_flux_dict(self, minus_steps):
+        """
+        Main minus move-based flux analysis routine.
+
+        Parameters
+        ----------
+        minus_steps: list of :class:`.MCStep`
+            steps that used the minus movers
+
+        Returns
+        -------
+        dict of {(:class:`.Volume, :class:`.Volume`): dict}
+            keys are (state, interface); values are the result dict from
+            :meth:`.TrajectoryTransitionAnalysis.analyze_flux` (keys are
+            strings 'in' and 'out', mapping to
+            :class:`.TrajectorySegmentContainer` with appropriate frames.
+        """
+        (flux_pair_to_minus_mover, flux_pair_to_minus_ensemble,
+         transition_flux_calculators) = self._flux_pair_mappings()
+
+        # organize the steps by mover used
+        mover_to_steps = collections.defaultdict(list)
+        for step in minus_steps:
+            mover_to_steps[step.change.canonical.mover].append(step)
 
         # do the analysis
         results = {}
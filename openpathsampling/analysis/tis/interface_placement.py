@@ -0,0 +1,408 @@
+import logging
+import math
+
+import numpy as np
+
+import openpathsampling as paths
+
+from .flux import DictFlux
+from .online import OnlineTISAnalysisHook
+from .standard_analysis import StandardTISAnalysis
+
+logger = logging.getLogger(__name__)
+
+
+def _lambda_at_level(xvals, log_probs, level):
+    """First CV value where the log crossing probability reaches ``level``.
+
+    Linear interpolation in the log of the crossing probability, which is
+    non-increasing along ``xvals``.
+    """
+    below = np.nonzero(log_probs <= level)[0]
+    if len(below) == 0:
+        return xvals[-1]
+    idx = below[0]
+    if idx == 0:
+        return xvals[0]
+    (x1, x2) = (xvals[idx - 1], xvals[idx])
+    (y1, y2) = (log_probs[idx - 1], log_probs[idx])
+    return x1 + (level - y1) / (y2 - y1) * (x2 - x1)
+
+
+def propose_lambdas(crossing_probability, first_lambda, last_lambda,
+                    n_interfaces=None, local_crossing_probability=None):
+    """Interface positions with equal local crossing probabilities.
+
+    The local crossing probability of interface ``i`` is the probability
+    to reach interface ``i+1``, given that interface ``i`` was crossed,
+    i.e., ``P(lambda_{i+1}) / P(lambda_i)`` for the total crossing
+    probability ``P``. Equal local crossing probabilities correspond to
+    interfaces that are equally spaced in ``log P``.
+
+    Parameters
+    ----------
+    crossing_probability : :class:`.LookupFunction`
+        total crossing probability as a function of lambda (e.g., from
+        :class:`.TotalCrossingProbability`)
+    first_lambda : float
+        position of the first (innermost) interface; kept as is
+    last_lambda : float
+        position of the last (outermost) interface; kept as is
+    n_interfaces : int
+        number of interfaces, including the first and the last
+    local_crossing_probability : float
+        target local crossing probability; the number of interfaces is the
+        smallest that gives local crossing probabilities of at least this
+        value. Exactly one of ``n_interfaces`` and
+        ``local_crossing_probability`` must be given.
+
+    Returns
+    -------
+    list of float
+        the proposed lambda values, from ``first_lambda`` to
+        ``last_lambda``
+    """
+    if (n_interfaces is None) == (local_crossing_probability is None):
+        raise ValueError("Give exactly one of n_interfaces and "
+                         + "local_crossing_probability")
+
+    xvals = np.asarray(crossing_probability.x, dtype=float)
+    probs = np.asarray(crossing_probability.values(), dtype=float)
+    sampled = (probs > 0) & (xvals >= first_lambda) & (xvals <= last_lambda)
+    xvals = np.concatenate([[first_lambda], xvals[sampled]])
+    probs = np.concatenate([[crossing_probability(first_lambda)],
+                            probs[sampled]])
+    if probs[0] <= 0:
+        raise RuntimeError("No crossing probability at first_lambda="
+                           + str(first_lambda))
+    log_probs = np.log(probs)
+
+    log_last = np.log(crossing_probability(last_lambda)) \
+        if crossing_probability(last_lambda) > 0 else log_probs[-1]
+    if xvals[-1] < last_lambda and log_last == log_probs[-1]:
+        logger.warning("Crossing probability was not sampled up to "
+                       + "last_lambda=" + str(last_lambda) + "; interfaces "
+                       + "are placed up to lambda=" + str(xvals[-1]))
+    total_log_drop = log_probs[0] - log_last
+
+    if n_interfaces is None:
+        log_local = math.log(local_crossing_probability)
+        n_interfaces = 1 + max(1, int(math.ceil(total_log_drop
+                                                / -log_local - 1e-12)))
+    if n_interfaces < 2:
+        raise ValueError("Need at least two interfaces")
+
+    step = total_log_drop / (n_interfaces - 1)
+    lambdas = [first_lambda]
+    for i in range(1, n_interfaces - 1):
+        level = log_probs[0] - i * step
+        lambdas.append(float(_lambda_at_level(xvals, log_probs, level)))
+    lambdas.append(last_lambda)
+    return lambdas
+
+
+def local_crossing_probabilities(crossing_probability, lambdas):
+    """Local crossing probability for each interface but the last.
+
+    Parameters
+    ----------
+    crossing_probability : :class:`.LookupFunction`
+        total crossing probability as a function of lambda
+    lambdas : list of float
+        positions of the interfaces
+
+    Returns
+    -------
+    list of float
+        ``P(lambdas[i+1]) / P(lambdas[i])`` for each interface ``i``
+    """
+    probs = [crossing_probability(lmbda) for lmbda in lambdas]
+    return [p_next / p if p > 0 else float('nan')
+            for (p, p_next) in zip(probs[:-1], probs[1:])]
+
+
+def network_with_interface_sets(network, interface_sets):
+    """Rebuild a TIS network with some interface sets replaced.
+
+    Multiple state outer interfaces are rebuilt from their lambda values
+    with the new interface sets.
+
+    Parameters
+    ----------
+    network : :class:`.MSTISNetwork` or :class:`.MISTISNetwork`
+        the network to rebuild
+    interface_sets : dict of {:class:`.InterfaceSet`: :class:`.InterfaceSet`}
+        maps each interface set to replace to its replacement; others are
+        kept
+
+    Returns
+    -------
+    :class:`.MSTISNetwork` or :class:`.MISTISNetwork`
+        the new network
+    """
+    def replaced(iface_set):
+        return interface_sets.get(iface_set, iface_set)
+
+    if not isinstance(network, (paths.MSTISNetwork, paths.MISTISNetwork)):
+        raise TypeError("Can't rebuild network of type "
+                        + type(network).__name__)
+
+    ms_outers = None
+    if network.ms_outer_objects is not None:
+        ms_outers = []
+        for ms_outer in network.ms_outer_objects:
+            if None in ms_outer.lambdas:
+                raise RuntimeError("Can't rebuild an MS outer interface "
+                                   + "without lambda values")
+            ms_outers.append(paths.MSOuterTISInterface.from_lambdas({
+                replaced(iface_set): lmbda
+                for (iface_set, lmbda) in zip(ms_outer.interface_sets,
+                                              ms_outer.lambdas)
+            }))
+
+    if isinstance(network, paths.MSTISNetwork):
+        trans_info = [(state, replaced(iface_set))
+                      for (state, iface_set) in network.trans_info]
+        return paths.MSTISNetwork(trans_info, ms_outers=ms_outers)
+    else:
+        trans_info = [(state_A, replaced(iface_set), state_B)
+                      for (state_A, iface_set, state_B) in network.trans_info]
+        return paths.MISTISNetwork(trans_info, ms_outers=ms_outers,
+                                   strict_sampling=network.strict_sampling)
+
+
+class InterfacePlacement(object):
+    """
+    Place TIS interfaces based on the crossing probability of a short run.
+
+    The crossing probability comes from the max lambda histograms of each
+    ensemble, combined as in :class:`.StandardTISAnalysis` (WHAM by
+    default). It can be obtained from a short exploratory simulation (see
+    :meth:`.explore`) or from existing steps (see :meth:`.analyze`). New
+    interfaces are placed with equal local crossing probabilities (see
+    :func:`.propose_lambdas`), after which the network can be rebuilt and
+    initial conditions for it can be taken from the trajectories of the
+    exploration.
+
+    Only interface sets with increasing lambdas are supported, since the
+    crossing probability is based on the maximum value of the CV.
+
+    Parameters
+    ----------
+    network : :class:`.MSTISNetwork` or :class:`.MISTISNetwork`
+        the network to place interfaces for
+    hist_parameters : dict
+        histogram parameters for the max lambda histograms; either a single
+        dict for all sampling transitions, or a dict mapping each sampling
+        transition to its parameters
+
+    Attributes
+    ----------
+    analysis : :class:`.StandardTISAnalysis`
+        analysis used for the crossing probabilities (the flux is not
+        calculated)
+    trajectories : list of :class:`.Trajectory`
+        trajectories from the exploration, used to seed initial conditions
+    """
+    def __init__(self, network, hist_parameters):
+        self.network = network
+        transitions = network.sampling_transitions
+        if not set(transitions) <= set(hist_parameters.keys()):
+            hist_parameters = {t: hist_parameters for t in transitions}
+        # the flux doesn't affect interface placement
+        no_flux = DictFlux({(t.stateA, t.interfaces[0]): float('nan')
+                            for t in transitions})
+        self.analysis = StandardTISAnalysis(
+            network=network,
+            flux_method=no_flux,
+            max_lambda_calcs={t: hist_parameters[t] for t in transitions}
+        )
+        self.trajectories = []
+        self._known_trajectories = set()
+
+    @property
+    def interface_sets(self):
+        """list of :class:`.InterfaceSet`: interface sets in the network"""
+        return list(self.analysis.tcp_methods.keys())
+
+    def explore(self, scheme, sample_set, n_steps, storage=None):
+        """Run a short simulation to estimate the crossing probabilities.
+
+        Parameters
+        ----------
+        scheme : :class:`.MoveScheme`
+            move scheme for this network
+        sample_set : :class:`.SampleSet`
+            initial conditions
+        n_steps : int
+            number of steps to run
+        storage : :class:`.Storage` or None
+            where to store the exploration; default None does not store it
+
+        Returns
+        -------
+        dict of {:class:`.InterfaceSet`: :class:`.LookupFunction`}
+            total crossing probability for each interface set
+        """
+        sim = paths.PathSampling(storage=storage, move_scheme=scheme,
+                                 sample_set=sample_set)
+        hook = OnlineTISAnalysisHook(self.analysis, update_frequency=n_steps)
+        sim.attach_hook(hook)
+        sim.attach_hook(self._record_trajectories, 'after_step')
+        self._record_trajectories(sample_set)
+        sim.run(n_steps)
+        if not hook.results:
+            raise RuntimeError("Unable to calculate crossing probabilities "
+                               + "from the exploration")
+        return self.crossing_probabilities()
+
+    def _record_trajectories(self, state=None, **kwargs):
+        known = self._known_trajectories
+        for sample in state:
+            if sample.trajectory not in known:
+                self.trajectories.append(sample.trajectory)
+                known.add(sample.trajectory)
+
+    def analyze(self, steps):
+        """Estimate the crossing probabilities from existing steps.
+
+        Parameters
+        ----------
+        steps : iterable of :class:`.MCStep`
+            steps of a simulation of this network
+
+        Returns
+        -------
+        dict of {:class:`.InterfaceSet`: :class:`.LookupFunction`}
+            total crossing probability for each interface set
+        """
+        self.analysis.calculate(steps)
+        return self.crossing_probabilities()
+
+    def crossing_probabilities(self):
+        """Total crossing probability for each interface set.
+
+        Returns
+        -------
+        dict of {:class:`.InterfaceSet`: :class:`.LookupFunction`}
+            total crossing probability for each interface set
+        """
+        hists = self.analysis._access_cached_result('max_lambda')
+        return {iface_set: tcp_m.from_ensemble_histograms(hists)
+                for (iface_set, tcp_m) in self.analysis.tcp_methods.items()}
+
+    def local_crossing_probabilities(self, interface_set, lambdas=None):
+        """Local crossing probabilities for the interfaces of a set.
+
+        Parameters
+        ----------
+        interface_set : :class:`.InterfaceSet`
+            the interface set
+        lambdas : list of float or None
+            interface positions; default uses those of ``interface_set``
+
+        Returns
+        -------
+        list of float
+            local crossing probability of each interface but the last
+        """
+        if lambdas is None:
+            lambdas = interface_set.lambdas
+        tcp = self.crossing_probabilities()[interface_set]
+        return local_crossing_probabilities(tcp, lambdas)
+
+    def propose_lambdas(self, interface_set, n_interfaces=None,
+                        local_crossing_probability=None, last_lambda=None):
+        """Propose interface positions for one interface set.
+
+        The first interface stays where it is. By default, so does the
+        last, and the number of interfaces is unchanged.
+
+        Parameters
+        ----------
+        interface_set : :class:`.InterfaceSet`
+            the interface set to place new interfaces for
+        n_interfaces : int or None
+            number of interfaces
+        local_crossing_probability : float or None
+            target local crossing probability (instead of ``n_interfaces``)
+        last_lambda : float or None
+            position of the last interface
+
+        Returns
+        -------
+        list of float
+            the proposed lambda values
+        """
+        if interface_set.direction <= 0:
+            raise ValueError("Interface placement requires an interface "
+                             + "set with increasing lambdas")
+        if n_interfaces is None and local_crossing_probability is None:
+            n_interfaces = len(interface_set)
+        if last_lambda is None:
+            last_lambda = interface_set.lambdas[-1]
+        tcp = self.crossing_probabilities()[interface_set]
+        return propose_lambdas(tcp, interface_set.lambdas[0], last_lambda,
+                               n_interfaces, local_crossing_probability)
+
+    def propose_interface_sets(self, **kwargs):
+        """New interface sets for all interface sets in the network.
+
+        Parameters
+        ----------
+        kwargs :
+            passed to :meth:`.propose_lambdas`
+
+        Returns
+        -------
+        dict of {:class:`.InterfaceSet`: :class:`.InterfaceSet`}
+            maps each interface set to its replacement
+        """
+        return {
+            iface_set: iface_set.with_lambdas(
+                self.propose_lambdas(iface_set, **kwargs)
+            )
+            for iface_set in self.interface_sets
+        }
+
+    def rebuild_network(self, interface_sets=None, **kwargs):
+        """Network with the proposed interface sets.
+
+        Parameters
+        ----------
+        interface_sets : dict or None
+            replacements for the interface sets; default uses
+            :meth:`.propose_interface_sets` with ``kwargs``
+
+        Returns
+        -------
+        :class:`.MSTISNetwork` or :class:`.MISTISNetwork`
+            the new network
+        """
+        if interface_sets is None:
+            interface_sets = self.propose_interface_sets(**kwargs)
+        return network_with_interface_sets(self.network, interface_sets)
+
+    def initial_conditions(self, scheme, trajectories=None, **kwargs):
+        """Initial conditions for a scheme on the new network.
+
+        Parameters
+        ----------
+        scheme : :class:`.MoveScheme`
+            move scheme for the new network
+        trajectories : list of :class:`.Trajectory` or None
+            trajectories to use in addition to those from the exploration
+        kwargs :
+            passed to :meth:`.MoveScheme.initial_conditions_from_trajectories`
+
+        Returns
+        -------
+        :class:`.SampleSet`
+            sample set with a sample for each ensemble that can be filled
+            from the trajectories
+        """
+        if trajectories is None:
+            trajectories = []
+        trajectories = list(trajectories) + self.trajectories
+        return scheme.initial_conditions_from_trajectories(trajectories,
+                                                           **kwargs)
@@ -0,0 +1,454 @@
+import collections
+import logging
+
+import numpy as np
+
+import openpathsampling as paths
+from openpathsampling.beta.hooks import PathSimulatorHook
+
+from .core import TransitionDictResults
+from .flux import MinusMoveFlux
+
+logger = logging.getLogger(__name__)
+
+
+class _RunningTISCounts(object):
+    """Running sums for the TIS analysis of a set of steps.
+
+    Trajectories are reduced to the values the analysis needs as soon as
+    they are seen, so the counters only grow with the number of distinct
+    values, not with the number of steps.
+    """
+    def __init__(self, max_lambda_ensembles, sampling_ensembles,
+                 ctp_ensembles, flux_pairs):
+        self.n_steps = 0
+        self.max_lambdas = {ens: collections.Counter()
+                            for ens in max_lambda_ensembles}
+        self.path_lengths = {ens: collections.Counter()
+                             for ens in sampling_ensembles}
+        self.final_states = {ens: collections.Counter()
+                             for ens in ctp_ensembles}
+        self.n_tries = collections.Counter()
+        # flux pair to {'in'/'out': [total time, number of segments]}
+        self.flux_times = {pair: {'in': [0.0, 0], 'out': [0.0, 0]}
+                           for pair in flux_pairs}
+
+    def merge(self, other):
+        """Add the counts of another set of steps (in place).
+
+        Parameters
+        ----------
+        other : :class:`._RunningTISCounts`
+            counts with the same (or relabeled to the same) keys
+
+        Returns
+        -------
+        :class:`._RunningTISCounts`
+            self
+        """
+        self.n_steps += other.n_steps
+        for (mine, theirs) in [(self.max_lambdas, other.max_lambdas),
+                               (self.path_lengths, other.path_lengths),
+                               (self.final_states, other.final_states)]:
+            for (key, counter) in theirs.items():
+                mine.setdefault(key, collections.Counter()).update(counter)
+        self.n_tries.update(other.n_tries)
+        for (pair, times) in other.flux_times.items():
+            running = self.flux_times.setdefault(
+                pair, {'in': [0.0, 0], 'out': [0.0, 0]}
+            )
+            for direction in ['in', 'out']:
+                running[direction][0] += times[direction][0]
+                running[direction][1] += times[direction][1]
+        return self
+
+    def relabel(self, label):
+        """Copy of the counts with each ensemble and state replaced.
+
+        Used to send counts between processes, where the same object is
+        identified by its UUID.
+
+        Parameters
+        ----------
+        label : callable
+            maps each ensemble and state (including those in flux pairs)
+            to its replacement
+
+        Returns
+        -------
+        :class:`._RunningTISCounts`
+            the relabeled counts
+        """
+        counts = _RunningTISCounts([], [], [], [])
+        counts.n_steps = self.n_steps
+        counts.max_lambdas = {label(ens): collections.Counter(counter)
+                              for (ens, counter) in self.max_lambdas.items()}
+        counts.path_lengths = {label(ens): collections.Counter(counter)
+                               for (ens, counter) in self.path_lengths.items()}
+        counts.final_states = {
+            label(ens): collections.Counter({
+                label(state): n for (state, n) in counter.items()
+            })
+            for (ens, counter) in self.final_states.items()
+        }
+        counts.n_tries = collections.Counter({
+            label(ens): n for (ens, n) in self.n_tries.items()
+        })
+        counts.flux_times = {
+            tuple(label(vol) for vol in pair):
+            {direction: list(times[direction]) for direction in times}
+            for (pair, times) in self.flux_times.items()
+        }
+        return counts
+
+    def add_flux_dict(self, flux_pair, flux_dict):
+        for direction in ['in', 'out']:
+            times = flux_dict[direction].times
+            running = self.flux_times[flux_pair][direction]
+            running[0] += sum(times)
+            running[1] += len(times)
+
+    def flux(self, flux_pair):
+        """Minus move flux from the running time sums (NaN if no data)"""
+        means = []
+        for direction in ['in', 'out']:
+            (total, count) = self.flux_times[flux_pair][direction]
+            if count == 0:
+                return float('nan')
+            means.append(total / count)
+        return 1.0 / sum(means)
+
+
+class OnlineTISAnalysisHook(PathSimulatorHook):
+    """
+    Incremental TIS analysis, updated while the simulation runs.
+
+    The hook follows the same route as :class:`.StandardTISAnalysis`, but
+    instead of re-reading all steps, it keeps running counts: the weight
+    of each max lambda value and path length per sampling ensemble, the
+    final states reached in the CTP ensembles, and the summed lengths of
+    the flux segments in accepted minus move trajectories. Values are only
+    calculated when the trajectory of an ensemble changes. Every
+    ``update_frequency`` steps the histograms are rebuilt from those
+    counts and combined (by default with WHAM) into crossing
+    probabilities, transition probabilities, and rates.
+
+    In addition, the steps are split into blocks of ``block_size`` steps.
+    Each completed block is analyzed on its own, and the spread of the
+    block results gives the error estimates in :meth:`.block_statistics`.
+    Failures of scheduled updates (such as insufficient overlap for WHAM
+    early in a run) are logged as warnings and do not stop the simulation.
+
+    Parameters
+    ----------
+    analysis : :class:`.StandardTISAnalysis`
+        the analysis to follow; it defines the max lambda calculations,
+        the combiners, the CTP method and the flux method. Its ``results``
+        are replaced with the online results on each update, so the usual
+        accessors (e.g., ``analysis.rate_matrix()``) can be used during the
+        run.
+    update_frequency : int
+        number of steps between updates of the results
+    block_size : int or None
+        number of steps per block for the error estimates; None (default)
+        disables block analysis
+    path_length_hist_parameters : dict or None
+        histogram parameters for the path length histograms; default uses
+        the defaults of :class:`.PathLengthHistogrammer`
+
+    Attributes
+    ----------
+    results : dict
+        the most recent results, with the same keys as the results of
+        :class:`.StandardTISAnalysis`, plus 'path_length'
+    block_results : list of dict
+        the results of each completed block
+    n_skipped_blocks : int
+        number of completed blocks that could not be analyzed (e.g.,
+        because the ensembles in the block did not overlap enough to be
+        combined); these are not included in the error estimates
+    """
+    implemented_for = ['before_simulation', 'after_step',
+                       'after_simulation']
+
+    def __init__(self, analysis, update_frequency=100, block_size=None,
+                 path_length_hist_parameters=None):
+        super(OnlineTISAnalysisHook, self).__init__()
+        self.analysis = analysis
+        self.update_frequency = update_frequency
+        self.block_size = block_size
+        if path_length_hist_parameters is None:
+            path_length_hist_parameters = \
+                paths.analysis.tis.PathLengthHistogrammer(
+                    ensembles=[]
+                ).hist_parameters
+        self.path_length_hist_parameters = path_length_hist_parameters
+
+        network = analysis.network
+        self._sampling_ensembles = list(network.sampling_ensembles)
+        self._max_lambda_calcs = [tcp_m.max_lambda_calc
+                                  for tcp_m in analysis.tcp_methods.values()]
+        self._max_lambda_f = {}
+        for calc in self._max_lambda_calcs:
+            self._max_lambda_f.update({ens: calc.f for ens in calc.hists})
+
+        flux_method = analysis.flux_method
+        if isinstance(flux_method, MinusMoveFlux):
+            (self._flux_pair_to_minus_mover, self._flux_pair_to_minus_ens,
+             self._flux_calculators) = flux_method._flux_pair_mappings()
+            self._minus_mover_to_flux_pair = {
+                mover: pair
+                for (pair, mover) in self._flux_pair_to_minus_mover.items()
+            }
+            self._flux_pairs = list(flux_method.flux_pairs)
+        else:
+            self._minus_mover_to_flux_pair = {}
+            self._flux_pairs = []
+
+        self._trajectory_values = {}
+        self.reset()
+
+    def reset(self):
+        """Forget all data collected so far."""
+        self._totals = self._new_counts()
+        self._block = self._new_counts() if self.block_size else None
+        self.results = {}
+        self.block_results = []
+        self.n_skipped_blocks = 0
+
+    def _new_counts(self):
+        return _RunningTISCounts(
+            max_lambda_ensembles=list(self._max_lambda_f.keys()),
+            sampling_ensembles=self._sampling_ensembles,
+            ctp_ensembles=self.analysis.ctp_method.ensembles,
+            flux_pairs=self._flux_pairs
+        )
+
+    @property
+    def n_steps(self):
+        """Number of steps included in the running results"""
+        return self._totals.n_steps
+
+    def _values_for(self, ensemble, trajectory):
+        # recalculate only if the ensemble's trajectory changed
+        cached = self._trajectory_values.get(ensemble)
+        if cached is not None and cached[0] is trajectory:
+            return cached[1]
+
+        f = self._max_lambda_f.get(ensemble)
+        max_lambda = f(trajectory) if f is not None else None
+        if ensemble in self._totals.final_states:
+            final_frame = trajectory.get_as_proxy(-1)
+            states = [s for s in self.analysis.ctp_method.states
+                      if s(final_frame)]
+        else:
+            states = []
+        values = (max_lambda, len(trajectory), states)
+        self._trajectory_values[ensemble] = (trajectory, values)
+        return values
+
+    def add_sample_set(self, sample_set):
+        """Add the trajectories in the sampling ensembles to the counts.
+
+        Parameters
+        ----------
+        sample_set : :class:`.SampleSet`
+            the sample set (typically ``step.active``) to add
+        """
+        counts = [c for c in [self._totals, self._block] if c is not None]
+        for ens in self._sampling_ensembles:
+            (max_lambda, length, states) = self._values_for(
+                ens, sample_set[ens].trajectory
+            )
+            for c in counts:
+                if max_lambda is not None:
+                    c.max_lambdas[ens][max_lambda] += 1
+                c.path_lengths[ens][length] += 1
+                if ens in c.final_states:
+                    c.n_tries[ens] += 1
+                    for state in states:
+                        c.final_states[ens][state] += 1
+
+        for c in counts:
+            c.n_steps += 1
+
+        if self._block is not None and self._block.n_steps >= self.block_size:
+            self._finish_block()
+
+    def add_step(self, step):
+        """Add a step to the running analysis.
+
+        Parameters
+        ----------
+        step : :class:`.MCStep`
+            the step to add
+        """
+        change = step.change
+        flux_pair = None
+        if change is not None and change.accepted:
+            flux_pair = self._minus_mover_to_flux_pair.get(
+                change.canonical.mover
+            )
+
+        if flux_pair is not None:
+            (state, innermost) = flux_pair
+            minus_ens = self._flux_pair_to_minus_ens[flux_pair]
+            flux_dict = self._flux_calculators[flux_pair].analyze_flux(
+                trajectories=[step.active[minus_ens].trajectory],
+                state=state,
+                interface=innermost
+            )
+            for c in [self._totals, self._block]:
+                if c is not None:
+                    c.add_flux_dict(flux_pair, flux_dict)
+
+        # last, since this can complete a block
+        self.add_sample_set(step.active)
+
+    def _results_from_counts(self, counts):
+        analysis = self.analysis
+        network = analysis.network
+        results = {}
+
+        max_lambda_hists = {}
+        for calc in self._max_lambda_calcs:
+            for ens in calc.hists:
+                hist = paths.numerics.Histogram(**calc.hist_parameters)
+                data = counts.max_lambdas[ens]
+                hist.histogram(list(data.keys()), list(data.values()))
+                max_lambda_hists[ens] = hist
+        results['max_lambda'] = max_lambda_hists
+
+        path_length_hists = {}
+        for (ens, data) in counts.path_lengths.items():
+            hist = paths.numerics.Histogram(
+                **self.path_length_hist_parameters
+            )
+            hist.histogram(list(data.keys()), list(data.values()))
+            path_length_hists[ens] = hist
+        results['path_length'] = path_length_hists
+
+        tcp_methods = analysis.tcp_methods
+        raw_tcps = {
+            ifaces:
+            tcp_methods[ifaces].from_ensemble_histograms(max_lambda_hists)
+            for ifaces in tcp_methods
+        }
+        tcps = TransitionDictResults(
+            {(trans.stateA, trans.stateB): raw_tcps[trans.interfaces]
+             for trans in network.transitions.values()},
+            network=network
+        )
+        results['total_crossing_probability'] = tcps
+
+        ctps = {
+            ens: {s: float(n) / counts.n_tries[ens]
+                  for (s, n) in counts.final_states[ens].items()}
+            for ens in counts.final_states
+        }
+        results['conditional_transition_probability'] = ctps
+
+        if self._flux_pairs:
+            fluxes = {pair: counts.flux(pair) for pair in self._flux_pairs}
+        else:
+            fluxes = analysis.flux_method.flux_dict
+        results['flux'] = fluxes
+
+        tp_methods = analysis.transition_probability_methods
+        trans_prob = {
+            trans: tp_methods[trans].from_intermediate_results(
+                tcp=tcps[(trans.stateA, trans.stateB)],
+                ctp=ctps
+            )
+            for trans in tp_methods
+        }
+        results['transition_probability'] = TransitionDictResults(
+            {(t.stateA, t.stateB): trans_prob[t] for t in trans_prob},
+            network
+        )
+        rates = {
+            (trans.stateA, trans.stateB):
+            fluxes[(trans.stateA, trans.interfaces[0])] * tp
+            for (trans, tp) in trans_prob.items()
+        }
+        results['rate'] = TransitionDictResults(rates, network)
+        return results
+
+    def update(self):
+        """Recalculate the results from the running counts.
+
+        Returns
+        -------
+        dict
+            the results; also stored in ``self.results`` and in the
+            ``results`` of the analysis object
+        """
+        if self._totals.n_steps == 0:
+            raise RuntimeError("No steps have been added to the analysis")
+        self.results = self._results_from_counts(self._totals)
+        self.analysis.results = self.results
+        return self.results
+
+    def _finish_block(self):
+        try:
+            block_results = self._results_from_counts(self._block)
+        except RuntimeError as err:
+            # typically WHAM without enough overlap within the block
+            logger.warning("Skipping block without results: " + str(err))
+            self.n_skipped_blocks += 1
+        else:
+            self.block_results.append(block_results)
+        self._block = self._new_counts()
+
+    def block_statistics(self, key='rate'):
+        """Mean and standard error of a result over the completed blocks.
+
+        Parameters
+        ----------
+        key : str
+            result to analyze: 'rate', 'transition_probability', or 'flux'
+
+        Returns
+        -------
+        dict
+            maps each key of the result (e.g., ``(stateA, stateB)`` for
+            rates) to a tuple ``(mean, standard error)``. The standard
+            error is NaN with fewer than two blocks.
+        """
+        n_blocks = len(self.block_results)
+        if n_blocks == 0:
+            return {}
+        entries = list(self.block_results[0][key])
+        stats = {}
+        for entry in entries:
+            values = np.array([block[key][entry]
+                               for block in self.block_results],
+                              dtype=float)
+            mean = np.mean(values)
+            if n_blocks > 1:
+                error = np.std(values, ddof=1) / np.sqrt(n_blocks)
+            else:
+                error = float('nan')
+            stats[entry] = (mean, error)
+        return stats
+
+    def before_simulation(self, sim, **kwargs):
+        # the initial sample set is counted, like the initial stored step
+        if self._totals.n_steps == 0:
+            self.add_sample_set(sim.sample_set)
+
+    def after_step(self, sim, step_number, step_info, state, results,
+                   hook_state):
+        self.add_step(results)
+        if self.n_steps % self.update_frequency == 0:
+            self._scheduled_update()
+
+    def after_simulation(self, sim, hook_state):
+        self._scheduled_update()
+
+    def _scheduled_update(self):
+        # don't stop the simulation because the data can't be analyzed yet
+        try:
+            self.update()
+        except RuntimeError as err:
+            logger.warning("Online TIS analysis not updated: " + str(err))
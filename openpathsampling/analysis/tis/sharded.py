@@ -0,0 +1,239 @@
+import functools
+import itertools
+import multiprocessing
+
+import openpathsampling as paths
+
+from .crossing_probability import FullHistogramMaxLambdas
+from .flux import MinusMoveFlux, DictFlux
+from .misc import ConditionalTransitionProbability
+from .online import OnlineTISAnalysisHook
+from .standard_analysis import StandardTISAnalysis
+
+
+def _uuid(obj):
+    return obj.__uuid__
+
+
+def _shard_analysis(storage, spec):
+    """Rebuild the analysis from the objects stored in a shard"""
+    load = storage.load
+    network = load(spec['network'])
+    transitions = {t.__uuid__: t for t in network.sampling_transitions}
+    max_lambda_calcs = {
+        transitions[trans_uuid]: FullHistogramMaxLambdas(
+            transition=transitions[trans_uuid],
+            hist_parameters=hist_parameters,
+            max_lambda_func=load(f_uuid)
+        )
+        for (trans_uuid, (f_uuid, hist_parameters))
+        in spec['max_lambda'].items()
+    }
+    if spec['scheme'] is not None:
+        flux_method = MinusMoveFlux(
+            load(spec['scheme']),
+            flux_pairs=[(load(state), load(interface))
+                        for (state, interface) in spec['flux_pairs']]
+        )
+    else:
+        # fluxes are not taken from the steps
+        flux_method = DictFlux({})
+
+    ctp_method = ConditionalTransitionProbability(
+        ensembles=[load(ens) for ens in spec['ctp_ensembles']],
+        states=[load(state) for state in spec['ctp_states']]
+    )
+    return StandardTISAnalysis(network=network,
+                               flux_method=flux_method,
+                               ctp_method=ctp_method,
+                               max_lambda_calcs=max_lambda_calcs)
+
+
+def _shard_counts(filenames, spec):
+    """
+    Count the steps of some storage files (run in a worker process)
+
+    Parameters
+    ----------
+    filenames : list of str
+        the files to read
+    spec : dict
+        UUIDs of the objects that define the analysis, see
+        :meth:`.ShardedTISAnalysis._spec`
+
+    Returns
+    -------
+    :class:`._RunningTISCounts`
+        the counts for all steps in the files, with ensembles and states
+        replaced by their UUIDs
+    """
+    totals = None
+    for filename in filenames:
+        storage = paths.Storage(filename, mode='r')
+        try:
+            hook = OnlineTISAnalysisHook(_shard_analysis(storage, spec))
+            for step in storage.steps:
+                hook.add_step(step)
+            counts = hook._totals.relabel(_uuid)
+        finally:
+            storage.close()
+
+        if totals is None:
+            totals = counts
+        else:
+            totals.merge(counts)
+
+    return totals
+
+
+class ShardedTISAnalysis(object):
+    """
+    TIS analysis of many storage files, in parallel processes.
+
+    Independent simulations of the same network (e.g., several TIS runs
+    started from the same setup) are often saved to separate files. This
+    splits the files into tasks of ``files_per_task`` files. Each task
+    reads the steps of its files in a worker process and reduces them to
+    the running counts of the :class:`.OnlineTISAnalysisHook` (max lambda
+    and path length counters, final states of the CTP ensembles, and flux
+    segment times). The counts of all tasks are summed and combined into
+    the results of :class:`.StandardTISAnalysis`, as if the analysis had
+    been run on the steps of all files together.
+
+    Workers rebuild the analysis from each file, finding the network, the
+    move scheme (for a :class:`.MinusMoveFlux`), the max lambda functions,
+    and the ensembles and states of the conditional transition probability
+    by their UUIDs. The analysis must therefore be set up with objects that
+    are saved in every file, e.g., the objects loaded from one of them.
+    Max lambda calculations must be :class:`.FullHistogramMaxLambdas`; any
+    other flux method than :class:`.MinusMoveFlux` is used as given.
+
+    Since workers are started with ``spawn`` by default, scripts that use
+    this need the usual ``if __name__ == '__main__':`` guard.
+
+    Parameters
+    ----------
+    analysis : :class:`.StandardTISAnalysis`
+        the analysis to perform; its ``results`` are replaced by the
+        combined results
+    filenames : list of str
+        the storage files
+    files_per_task : int
+        number of files read by a worker per task
+    path_length_hist_parameters : dict or None
+        histogram parameters for the path length histograms; default uses
+        the defaults of :class:`.PathLengthHistogrammer`
+
+    Attributes
+    ----------
+    results : dict
+        the results, with the same keys as the results of
+        :class:`.StandardTISAnalysis`, plus 'path_length'
+    counts : :class:`._RunningTISCounts`
+        the combined counts of all files
+    """
+    def __init__(self, analysis, filenames, files_per_task=1,
+                 path_length_hist_parameters=None):
+        self.analysis = analysis
+        self.filenames = list(filenames)
+        self.files_per_task = files_per_task
+        self._online = OnlineTISAnalysisHook(
+            analysis,
+            path_length_hist_parameters=path_length_hist_parameters
+        )
+        self.counts = None
+        self.results = {}
+
+    def _spec(self):
+        # everything the workers need to rebuild the analysis
+        analysis = self.analysis
+        max_lambda = {}
+        for tcp_method in analysis.tcp_methods.values():
+            calc = tcp_method.max_lambda_calc
+            if not isinstance(calc, FullHistogramMaxLambdas):
+                raise TypeError("Sharded analysis requires "
+                                + "FullHistogramMaxLambdas, not "
+                                + calc.__class__.__name__)
+            max_lambda[calc.transition.__uuid__] = (calc.f.__uuid__,
+                                                    calc.hist_parameters)
+
+        flux_method = analysis.flux_method
+        if isinstance(flux_method, MinusMoveFlux):
+            scheme = flux_method.scheme.__uuid__
+            flux_pairs = [(state.__uuid__, interface.__uuid__)
+                          for (state, interface) in flux_method.flux_pairs]
+        else:
+            scheme = None
+            flux_pairs = []
+
+        return {
+            'network': analysis.network.__uuid__,
+            'scheme': scheme,
+            'flux_pairs': flux_pairs,
+            'ctp_ensembles': [ens.__uuid__
+                              for ens in analysis.ctp_method.ensembles],
+            'ctp_states': [state.__uuid__
+                           for state in analysis.ctp_method.states],
+            'max_lambda': max_lambda
+        }
+
+    def _labels(self):
+        # UUID to object in this process, for all keys of the counts
+        analysis = self.analysis
+        objects = itertools.chain(
+            analysis.network.sampling_ensembles,
+            analysis.ctp_method.ensembles,
+            analysis.ctp_method.states,
+            *self._online._flux_pairs
+        )
+        return {obj.__uuid__: obj for obj in objects}
+
+    def _tasks(self):
+        n_files = self.files_per_task
+        return [self.filenames[i:i + n_files]
+                for i in range(0, len(self.filenames), n_files)]
+
+    def calculate(self, n_workers=None, mp_context='spawn'):
+        """Analyze all files and combine the results.
+
+        Parameters
+        ----------
+        n_workers : int or None
+            number of worker processes; None uses the number of CPUs and 1
+            reads the files in this process
+        mp_context : str
+            start method of the worker processes, see
+            :func:`multiprocessing.get_context`
+
+        Returns
+        -------
+        dict
+            the results; also stored in ``self.results`` and in the
+            ``results`` of the analysis object
+        """
+        spec = self._spec()
+        tasks = self._tasks()
+        labels = self._labels()
+        counts = self._online._new_counts()
+
+        if n_workers == 1:
+            for task in tasks:
+                counts.merge(_shard_counts(task, spec).relabel(labels.get))
+        else:
+            context = multiprocessing.get_context(mp_context)
+            pool = context.Pool(n_workers)
+            try:
+                worker = functools.partial(_shard_counts, spec=spec)
+                for task_counts in pool.imap_unordered(worker, tasks):
+                    counts.merge(task_counts.relabel(labels.get))
+            finally:
+                pool.terminate()
+                pool.join()
+
+        if counts.n_steps == 0:
+            raise RuntimeError("No steps found in the storage files")
+
+        self.counts = counts
+        self.results = self._online._results_from_counts(counts)
+        self.analysis.results = self.results
+        return self.results
@@ -204,6 +204,8 @@ class StandardTISAnalysis(TISAnalysis):
                         ensembles=outermost_ensembles,
                         states=network.all_states
                     )
+        else:
+            self.ctp_method = ctp_method
 
         trans_prob_methods = {
             trans: StandardTransitionProbability(
@@ -1,6 +1,205 @@
+import itertools
+
 import openpathsampling as paths
 import numpy as np
 
+
+def _iter_chunks(trajectory, chunksize):
+    """Lists of at most ``chunksize`` consecutive frames (as proxies)"""
+    frames = getattr(trajectory, 'iter_proxies', trajectory.__iter__)()
+    while True:
+        chunk = list(itertools.islice(frames, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _volume_masks(volumes, frames):
+    """Boolean array of shape (len(volumes), len(frames)).
+
+    Each volume is evaluated once per frame; the mask of a negated volume
+    is the negation of the mask of the original volume.
+    """
+    masks = {}
+
+    def mask(volume):
+        if volume not in masks:
+            if isinstance(volume, paths.volume.NegatedVolume):
+                masks[volume] = ~mask(volume.volume)
+            else:
+                masks[volume] = np.fromiter(
+                    (bool(volume(frame)) for frame in frames),
+                    dtype=bool, count=len(frames)
+                )
+        return masks[volume]
+
+    return np.array([mask(volume) for volume in volumes])
+
+
+def _mask_runs(masks):
+    """Run-length encoding of frames that are in the same volumes.
+
+    Parameters
+    ----------
+    masks : np.ndarray of bool
+        shape (n_volumes, n_frames), see :func:`._volume_masks`
+
+    Returns
+    -------
+    list of tuple (int, int, np.ndarray of bool)
+        for each run of frames with the same mask values: index of the
+        first frame, number of frames, and the mask values
+    """
+    n_frames = masks.shape[1]
+    if n_frames == 0:
+        return []
+    changes = np.any(masks[:, 1:] != masks[:, :-1], axis=0)
+    starts = np.append(0, np.flatnonzero(changes) + 1)
+    lengths = np.diff(np.append(starts, n_frames))
+    return [(start, length, masks[:, start])
+            for (start, length) in zip(starts.tolist(), lengths.tolist())]
+
+
+class _ContinuousRuns(object):
+    """Maximal runs of frames in a volume (as ``AllInXEnsemble.split``).
+
+    Trackers like this one are fed the runs of :func:`._mask_runs` in
+    trajectory order (runs that continue across chunks are fed twice),
+    and collect the ``(start, stop)`` frame indices of their segments.
+    """
+    def __init__(self, volume):
+        self.volume = volume
+        self.segments = []
+        self._start = None
+
+    def add_run(self, start, length, inside):
+        if inside[self.volume]:
+            if self._start is None:
+                self._start = start
+        elif self._start is not None:
+            self.segments.append((self._start, start))
+            self._start = None
+
+    def finish(self, n_frames):
+        if self._start is not None:
+            self.segments.append((self._start, n_frames))
+            self._start = None
+
+
+class _TransitionRuns(object):
+    """Frames between leaving one volume and entering another.
+
+    Segments are the frames strictly between a frame in ``from_vol`` and
+    the next frame in ``to_vol``, if no frame between them is in either
+    volume.
+    """
+    def __init__(self, from_vol, to_vol):
+        self.from_vol = from_vol
+        self.to_vol = to_vol
+        self.segments = []
+        self._last_from = None
+
+    def add_run(self, start, length, inside):
+        end = start + length
+        if inside[self.to_vol]:
+            if self._last_from is not None:
+                self.segments.append((self._last_from + 1, start))
+            if inside[self.from_vol]:
+                # each frame is the start of a transition to the next
+                self.segments.extend((idx, idx) for idx in range(start + 1,
+                                                                 end))
+                self._last_from = end - 1
+            else:
+                self._last_from = None
+        elif inside[self.from_vol]:
+            self._last_from = end - 1
+
+    def finish(self, n_frames):
+        self._last_from = None
+
+
+class _LifetimeRuns(object):
+    """Segments of :meth:`.TrajectoryTransitionAnalysis.get_lifetime_segments`
+
+    Between two consecutive frames in ``to_vol``, where neither these
+    frames nor any frame between them is in ``forbidden`` and at least one
+    frame between them is in ``from_vol``, the segment runs from the first
+    of these frames that is in ``from_vol`` to (and including) the second
+    frame in ``to_vol``, and ``padding`` is applied to it.
+    """
+    def __init__(self, from_vol, to_vol, forbidden=None, padding=(0, -1)):
+        self.from_vol = from_vol
+        self.to_vol = to_vol
+        self.forbidden = forbidden
+        self.padding = slice(*padding)
+        self.segments = []
+        self._last_to = None
+        self._first_from = None
+        self._visited_from = False
+        self._blocked = False
+
+    def add_run(self, start, length, inside):
+        in_from = inside[self.from_vol]
+        in_forbidden = (self.forbidden is not None
+                        and inside[self.forbidden])
+        if inside[self.to_vol]:
+            if (self._last_to is not None and self._visited_from
+                    and not self._blocked and not in_forbidden):
+                self._add_segment(self._first_from, start + 1)
+            # only the last frame of the run can start a new segment
+            last = start + length - 1
+            self._last_to = last
+            self._first_from = last if in_from else None
+            self._visited_from = False
+            self._blocked = in_forbidden
+        elif self._last_to is not None:
+            self._blocked = self._blocked or in_forbidden
+            if in_from:
+                self._visited_from = True
+                if self._first_from is None:
+                    self._first_from = start
+
+    def _add_segment(self, start, stop):
+        (first, last, _) = self.padding.indices(stop - start)
+        self.segments.append((start + first, start + max(first, last)))
+
+    def finish(self, n_frames):
+        self._last_to = None
+
+
+def _segment_trajectory(trajectory, volumes, trackers, chunksize):
+    """Feed the runs of a trajectory to trackers in a single pass.
+
+    Parameters
+    ----------
+    trajectory : :class:`.Trajectory`
+        the trajectory to analyze
+    volumes : list of :class:`.Volume`
+        the volumes; trackers refer to them by index in this list
+    trackers : list
+        objects with ``add_run(start, length, inside)`` and
+        ``finish(n_frames)`` methods, such as :class:`._ContinuousRuns`
+    chunksize : int
+        number of frames for which the volumes are evaluated at once
+
+    Returns
+    -------
+    list
+        the trackers
+    """
+    n_frames = 0
+    for chunk in _iter_chunks(trajectory, chunksize):
+        for (start, length, inside) in _mask_runs(_volume_masks(volumes,
+                                                                chunk)):
+            for tracker in trackers:
+                tracker.add_run(n_frames + start, length, inside)
+        n_frames += len(chunk)
+
+    for tracker in trackers:
+        tracker.finish(n_frames)
+    return trackers
+
+
 class TrajectorySegmentContainer(object):
     """Container object to analyze lists of trajectories (or segments).
 
@@ -74,6 +273,22 @@ class TrajectorySegmentContainer(object):
 class TrajectoryTransitionAnalysis(object):
     """Analyze a trajectory or set of trajectories for transition properties.
 
+    Trajectories are read in a single pass, in chunks of frames. For each
+    chunk, the state (and interface) volumes are evaluated once per frame
+    into boolean masks, and the runs of frames with the same mask values
+    are used to find the segments. Long trajectories, e.g., from a
+    :class:`.DirectSimulation`, can be analyzed in time linear in their
+    length.
+
+    Parameters
+    ----------
+    transition : :class:`.Transition`
+        the transition with the states to analyze
+    dt : float
+        time step between frames
+    chunksize : int
+        number of frames for which the volumes are evaluated at once
+
     Attributes
     ----------
     dt : float
@@ -99,9 +314,10 @@ class TrajectoryTransitionAnalysis(object):
         As with transition_frames, but durations multiplied by self.dt
 
     """
-    def __init__(self, transition, dt=None):
+    def __init__(self, transition, dt=None, chunksize=10000):
         self.transition = transition
         self.dt = dt
+        self.chunksize = chunksize
         self.stateA = transition.stateA
         self.stateB = transition.stateB - transition.stateA
         self.reset_analysis()
@@ -171,13 +387,19 @@ class TrajectoryTransitionAnalysis(object):
             state volume to characterize. Must be one of the states in the
             transition
         """
-        ensemble = paths.AllInXEnsemble(state)
-        segments = ensemble.split(trajectory, overlap=0)
-        return TrajectorySegmentContainer(segments, self.dt)
+        (tracker,) = _segment_trajectory(trajectory, [state],
+                                         [_ContinuousRuns(0)],
+                                         self.chunksize)
+        return self._container(trajectory, tracker)
+
+    def _container(self, trajectory, tracker):
+        return TrajectorySegmentContainer.from_trajectory_and_indices(
+            trajectory, tracker.segments, self.dt
+        )
 
     @staticmethod
     def get_lifetime_segments(trajectory, from_vol, to_vol, forbidden=None,
-                              padding=[0, -1]):
+                              padding=[0, -1], chunksize=10000):
         """General script to get lifetimes.
 
         Lifetimes for a transition between volumes are used in several other
@@ -210,6 +432,8 @@ class TrajectoryTransitionAnalysis(object):
             as output, use `padding=[None, None]`. The default is to remove
             the final frame (`padding=[0, -1]`) so that it doesn't include
             the frame in `to_vol`.
+        chunksize : int
+            number of frames for which the volumes are evaluated at once
 
         Returns
         -------
@@ -219,21 +443,14 @@ class TrajectoryTransitionAnalysis(object):
             `to_vol`, with no frames in `forbidden`, and with frames removed
             from the ends according to `padding`
         """
-        if forbidden is None:
-            forbidden = paths.EmptyVolume()
-        ensemble_BAB = paths.SequentialEnsemble([
-            paths.LengthEnsemble(1) & paths.AllInXEnsemble(to_vol),
-            paths.AllOutXEnsemble(to_vol) & paths.PartInXEnsemble(from_vol),
-            paths.LengthEnsemble(1) & paths.AllInXEnsemble(to_vol)
-        ]) & paths.AllOutXEnsemble(forbidden)
-        ensemble_AB = paths.SequentialEnsemble([
-            paths.LengthEnsemble(1) & paths.AllInXEnsemble(from_vol),
-            paths.OptionalEnsemble(paths.AllOutXEnsemble(to_vol)),
-            paths.LengthEnsemble(1) & paths.AllInXEnsemble(to_vol)
-        ])
-        BAB_split = ensemble_BAB.split(trajectory)
-        AB_split = [ensemble_AB.split(part)[0] for part in BAB_split]
-        return [subtraj[padding[0]:padding[1]] for subtraj in AB_split]
+        volumes = [from_vol, to_vol]
+        if forbidden is not None:
+            volumes.append(forbidden)
+            tracker = _LifetimeRuns(0, 1, 2, padding)
+        else:
+            tracker = _LifetimeRuns(0, 1, padding=padding)
+        _segment_trajectory(trajectory, volumes, [tracker], chunksize)
+        return [trajectory[start:stop] for (start, stop) in tracker.segments]
 
 
     def analyze_lifetime(self, trajectory, state):
@@ -257,7 +474,8 @@ class TrajectoryTransitionAnalysis(object):
         segments = self.get_lifetime_segments(
             trajectory=trajectory,
             from_vol=state,
-            to_vol=other_state
+            to_vol=other_state,
+            chunksize=self.chunksize
         )
         return TrajectorySegmentContainer(segments, self.dt)
 
@@ -278,17 +496,12 @@ class TrajectoryTransitionAnalysis(object):
         :class:`.TrajectorySegmentContainer`
             transitions from `stateA` to `stateB` within `trajectory`
         """
-        # we define the transitions ensemble just in case the transition is,
-        # e.g., fixed path length TPS. We want flexible path length ensemble
-        transition_ensemble = paths.SequentialEnsemble([
-            paths.AllInXEnsemble(stateA) & paths.LengthEnsemble(1),
-            paths.OptionalEnsemble( # optional to allow instantaneous hops
-                paths.AllOutXEnsemble(stateA) & paths.AllOutXEnsemble(stateB)
-            ),
-            paths.AllInXEnsemble(stateB) & paths.LengthEnsemble(1)
-        ])
-        segments = [seg[1:-1] for seg in transition_ensemble.split(trajectory)]
-        return TrajectorySegmentContainer(segments, self.dt)
+        # flexible path length, even if the transition is, e.g., fixed path
+        # length TPS; instantaneous hops give empty segments
+        (tracker,) = _segment_trajectory(trajectory, [stateA, stateB],
+                                         [_TransitionRuns(0, 1)],
+                                         self.chunksize)
+        return self._container(trajectory, tracker)
 
     def analyze_flux(self, trajectories, state, interface=None):
         """Analysis to obtain flux segments for given state.
@@ -330,23 +543,17 @@ class TrajectoryTransitionAnalysis(object):
 
     def _analyze_flux_single_traj(self, trajectory, state, interface):
         other = list(set([self.stateA, self.stateB]) - set([state]))[0]
-        out_segments = self.get_lifetime_segments(
-            trajectory=trajectory,
-            from_vol=~interface,
-            to_vol=state,
-            forbidden=other,
-            padding=[None, -1]
-        )
-        out_container = TrajectorySegmentContainer(out_segments, self.dt)
-        in_segments = self.get_lifetime_segments(
-            trajectory=trajectory,
-            from_vol=state,
-            to_vol=~interface,
-            forbidden=other,
-            padding=[None, -1]
-        )
-        in_container = TrajectorySegmentContainer(in_segments, self.dt)
-        return {'in': in_container, 'out': out_container}
+        # 'in' is the lifetime of the state, ending outside the interface;
+        # 'out' is the lifetime of outside the interface, ending in state
+        volumes = [state, ~interface, other]
+        trackers = {
+            'in': _LifetimeRuns(0, 1, 2, padding=[None, -1]),
+            'out': _LifetimeRuns(1, 0, 2, padding=[None, -1])
+        }
+        _segment_trajectory(trajectory, volumes, list(trackers.values()),
+                            self.chunksize)
+        return {key: self._container(trajectory, tracker)
+                for (key, tracker) in trackers.items()}
 
     def flux(self, trajectories, state, interface=None):
         if self.dt is None:
@@ -373,26 +580,33 @@ class TrajectoryTransitionAnalysis(object):
         if isinstance(trajectories, paths.Trajectory):
             trajectories = [trajectories]
 
-        # shortcuts for readability
-        c_segs = self.continuous_segments
-        l_segs = self.lifetime_segments
-        t_segs = self.transition_segments
-        f_dicts = self.flux_segments
+        # all segments come from one pass over each trajectory; the masks
+        # of the flux volumes (the negated states) are derived from the
+        # state masks
+        (stateA, stateB) = (self.stateA, self.stateB)
+        volumes = [stateA, stateB, ~stateA, ~stateB]
         for traj in trajectories:
-            for state in [self.stateA, self.stateB]:
-                c_segs[state] += self.analyze_continuous_time(traj, state)
-                l_segs[state] += self.analyze_lifetime(traj, state)
-                f_dict = self.analyze_flux(traj, state)
-                f_dicts[state]['in'] += f_dict['in']
-                f_dicts[state]['out'] += f_dict['out']
-            t_duration_AB = self.analyze_transition_duration(traj,
-                                                             self.stateA,
-                                                             self.stateB)
-            t_duration_BA = self.analyze_transition_duration(traj,
-                                                             self.stateB,
-                                                             self.stateA)
-            t_segs[(self.stateA, self.stateB)] += t_duration_AB
-            t_segs[(self.stateB, self.stateA)] += t_duration_BA
+            results = [
+                (self.continuous_segments,
+                 {stateA: _ContinuousRuns(0), stateB: _ContinuousRuns(1)}),
+                (self.lifetime_segments,
+                 {stateA: _LifetimeRuns(0, 1), stateB: _LifetimeRuns(1, 0)}),
+                (self.transition_segments,
+                 {(stateA, stateB): _TransitionRuns(0, 1),
+                  (stateB, stateA): _TransitionRuns(1, 0)}),
+                (self.flux_segments[stateA],
+                 {'in': _LifetimeRuns(0, 2, 1, padding=[None, -1]),
+                  'out': _LifetimeRuns(2, 0, 1, padding=[None, -1])}),
+                (self.flux_segments[stateB],
+                 {'in': _LifetimeRuns(1, 3, 0, padding=[None, -1]),
+                  'out': _LifetimeRuns(3, 1, 0, padding=[None, -1])})
+            ]
+            trackers = [tracker for (_, trackers) in results
+                        for tracker in trackers.values()]
+            _segment_trajectory(traj, volumes, trackers, self.chunksize)
+            for (segments, trackers) in results:
+                for (key, tracker) in trackers.items():
+                    segments[key] += self._container(traj, tracker)
         # return self so we can init and analyze in one line
         return self
 
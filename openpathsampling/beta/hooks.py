@@ -449,3 +449,119 @@ class GraciousKillHook(PathSimulatorHook):
                                     + "({:s})".format(self.max_walltime)
                                     + " reached."
                                     )
+
+
+class DecorrelationHook(PathSimulatorHook):
+    """
+    Track decorrelation of the replicas from their initial trajectories.
+
+    "Decorrelated" is meant in the sense commonly used in one-way shooting:
+    a replica is decorrelated once its trajectory no longer contains any
+    configuration from the trajectory it started from. The snapshot UUIDs
+    of the initial trajectories are collected once, and after each step
+    only the replicas whose trajectory changed are checked again.
+
+    Parameters
+    ----------
+    time_reversal : bool
+        if `True` (default), the time-reversed copy of an original snapshot
+        also counts as the original configuration
+
+    Attributes
+    ----------
+    correlated : set of int
+        replicas that still share a configuration with their initial
+        trajectory
+    decorrelation_steps : dict
+        replica to the step number at which that replica was first found
+        to be decorrelated
+    """
+    implemented_for = ['before_simulation', 'after_step']
+
+    def __init__(self, time_reversal=True):
+        self.time_reversal = time_reversal
+        self.reset()
+
+    def reset(self, sample_set=None, step_number=None):
+        """Use the trajectories in ``sample_set`` as the originals.
+
+        Parameters
+        ----------
+        sample_set : :class:`.SampleSet` or None
+            the sample set with the initial trajectories; if None, the
+            initial trajectories are taken from the simulation's sample set
+            at the beginning of the next simulation
+        step_number : int or None
+            step number of ``sample_set``, used for replicas that are
+            decorrelated from the start
+        """
+        self._originals = None
+        self._trajectories = {}
+        self.correlated = set([])
+        self.decorrelation_steps = {}
+        if sample_set is None:
+            return
+
+        self._originals = {}
+        for sample in sample_set:
+            uuids = set(snap.__uuid__
+                        for snap in sample.trajectory.iter_proxies())
+            if self.time_reversal:
+                uuids |= set(paths.netcdfplus.StorableObject.ruuid(uuid)
+                             for uuid in uuids)
+            self._originals[sample.replica] = uuids
+
+        self.update(sample_set, step_number)
+
+    @property
+    def n_replicas(self):
+        """Number of replicas that are tracked"""
+        return len(self._originals) if self._originals is not None else 0
+
+    @property
+    def n_correlated(self):
+        """Number of replicas that are still correlated"""
+        return len(self.correlated)
+
+    @property
+    def all_decorrelated(self):
+        """True if no replica is correlated with its initial trajectory"""
+        return self._originals is not None and not self.correlated
+
+    def update(self, sample_set, step_number=None):
+        """Check the replicas whose trajectory changed in ``sample_set``.
+
+        Parameters
+        ----------
+        sample_set : :class:`.SampleSet`
+            the current sample set
+        step_number : int or None
+            the current step number, recorded in ``decorrelation_steps``
+        """
+        for sample in sample_set:
+            replica = sample.replica
+            originals = self._originals.get(replica)
+            if originals is None:
+                continue
+
+            trajectory = sample.trajectory
+            if trajectory is self._trajectories.get(replica):
+                continue
+
+            self._trajectories[replica] = trajectory
+            is_correlated = any(snap.__uuid__ in originals
+                                for snap in trajectory.iter_proxies())
+            if is_correlated:
+                self.correlated.add(replica)
+            else:
+                self.correlated.discard(replica)
+                if replica not in self.decorrelation_steps:
+                    self.decorrelation_steps[replica] = step_number
+
+    def before_simulation(self, sim, **kwargs):
+        if self._originals is None:
+            self.reset(sim.sample_set, sim.step)
+
+    def after_step(self, sim, step_number, step_info, state, results,
+                   hook_state):
+        self.update(state, step_number)
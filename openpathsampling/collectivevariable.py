@@ -1,6 +1,8 @@
 import openpathsampling as paths
 import openpathsampling.netcdfplus.chaindict as cd
-from openpathsampling.integration_tools import md, error_if_no_mdtraj
+from openpathsampling.integration_tools import (
+    md, error_if_no_mdtraj, openmm, unit, is_simtk_quantity
+)
 from openpathsampling.engines.openmm.tools import trajectory_to_mdtraj
 from openpathsampling.netcdfplus import WeakKeyCache, \
     ObjectJSON, create_to_dict, ObjectStore, PseudoAttribute
@@ -8,6 +10,8 @@ from openpathsampling.netcdfplus import WeakKeyCache, \
 from openpathsampling.deprecations import (has_deprecations, deprecate,
                                            MSMBUILDER)
 
+import numpy as np
+
 import sys
 if sys.version_info > (3, ):
     get_code = lambda func: func.__code__
@@ -586,6 +590,112 @@ class MDTrajFunctionCV(CoordinateFunctionCV):
         }
 
 
+def _geometric_value(snapshot, terms):
+    coordinates = snapshot.coordinates
+    if is_simtk_quantity(coordinates):
+        coordinates = coordinates.value_in_unit(unit.nanometers)
+    coordinates = np.asarray(coordinates)
+
+    value = 0.0
+    for coefficient, atoms in terms:
+        points = coordinates[list(atoms)]
+        if len(atoms) == 2:
+            term = np.linalg.norm(points[1] - points[0])
+        elif len(atoms) == 3:
+            vec_a = points[0] - points[1]
+            vec_b = points[2] - points[1]
+            cos_theta = np.dot(vec_a, vec_b) / (np.linalg.norm(vec_a)
+                                                * np.linalg.norm(vec_b))
+            term = np.arccos(np.clip(cos_theta, -1.0, 1.0))
+        else:
+            b1, b2, b3 = np.diff(points, axis=0)
+            n1 = np.cross(b1, b2)
+            n2 = np.cross(b2, b3)
+            term = np.arctan2(np.linalg.norm(b2) * np.dot(b1, n2),
+                              np.dot(n1, n2))
+        value += coefficient * term
+
+    return float(value)
+
+
+class GeometricCV(CoordinateFunctionCV):
+    """Linear combination of distances, angles, and torsions.
+
+    Each term is a pair ``(coefficient, atoms)``. Two atoms give a distance
+    (in nm), three atoms an angle and four atoms a torsion (in radians).
+    Periodic boundary conditions are not taken into account.
+
+    Besides being evaluated on snapshots like any other CV, this CV can be
+    compiled into OpenMM forces, which lets the
+    :class:`.OpenMMEngine` evaluate it inside the context (see
+    :meth:`.OpenMMEngine.set_stop_volumes`).
+
+    Examples
+    --------
+    >>> # psi in alanine dipeptide
+    >>> psi = GeometricCV("psi", [(1.0, [6, 8, 14, 16])])
+    >>> # difference of two distances
+    >>> dd = GeometricCV("dd", [(1.0, [0, 5]), (-1.0, [0, 9])])
+    """
+
+    def __init__(self, name, terms):
+        """
+        Parameters
+        ----------
+        name : str
+        terms : list of (float, list of int)
+            the coefficient and atom indices of each term
+        """
+        terms = [(float(coefficient), [int(atom) for atom in atoms])
+                 for coefficient, atoms in terms]
+        for _, atoms in terms:
+            if len(atoms) not in [2, 3, 4]:
+                raise ValueError("Terms must have 2, 3, or 4 atoms, not "
+                                 + str(len(atoms)))
+
+        super(GeometricCV, self).__init__(
+            name,
+            _geometric_value,
+            terms=terms
+        )
+
+    @property
+    def terms(self):
+        return self.kwargs['terms']
+
+    def openmm_forces(self):
+        """OpenMM forces with an energy equal to each term
+
+        Returns
+        -------
+        list of (float, :class:`openmm.Force`)
+            the coefficient and the force for each term
+        """
+        force_classes = {
+            2: (openmm.CustomBondForce, 'r', 'addBond'),
+            3: (openmm.CustomAngleForce, 'theta', 'addAngle'),
+            4: (openmm.CustomTorsionForce, 'theta', 'addTorsion'),
+        }
+        forces = []
+        for coefficient, atoms in self.terms:
+            force_class, energy, add_term = force_classes[len(atoms)]
+            force = force_class(energy)
+            getattr(force, add_term)(*(atoms + [[]]))
+            forces.append((coefficient, force))
+
+        return forces
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'terms': self.terms
+        }
+
+    @classmethod
+    def from_dict(cls, dct):
+        return cls(**dct)
+
+
 @has_deprecations
 @deprecate(MSMBUILDER)
 class MSMBFeaturizerCV(CoordinateGeneratorCV):
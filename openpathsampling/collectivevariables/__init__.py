@@ -2,6 +2,7 @@ from openpathsampling.collectivevariable import (
     CollectiveVariable, FunctionCV, CoordinateFunctionCV, GeneratorCV,
     CoordinateGeneratorCV, InVolumeCV, CallableCV,
     MDTrajFunctionCV,
+    GeometricCV,
     PyEMMAFeaturizerCV,
     MSMBFeaturizerCV,
 )
@@ -1,5 +1,5 @@
 from .snapshot import BaseSnapshot, SnapshotFactory, SnapshotDescriptor
-from .trajectory import Trajectory
+from .trajectory import Trajectory, ReversedTrajectoryView
 
 from .topology import Topology, MDTrajTopology
 
@@ -9,6 +9,8 @@ from .dynamics_engine import (
     DynamicsEngine, NoEngine, EngineError,
     EngineNaNError, EngineMaxLengthError)
 
+from .continue_conditions import ContinueConditionScheduler, must_evaluate
+
 from .external_engine import ExternalEngine
 
 from . import external_snapshots
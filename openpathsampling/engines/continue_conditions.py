@@ -0,0 +1,91 @@
+"""
+Cost-aware ordering and short-circuiting of continue conditions.
+
+Used by :meth:`.DynamicsEngine.stop_conditions` if the engine option
+``short_circuit_conditions`` is set.
+"""
+import time
+
+
+def must_evaluate(condition):
+    """Whether a continue condition has to be evaluated for every frame.
+
+    This is the ``must_evaluate`` attribute of the condition or, for bound
+    methods such as ``ensemble.can_append``, of the object it belongs to.
+    """
+    owner = getattr(condition, '__self__', condition)
+    return bool(getattr(condition, 'must_evaluate',
+                        getattr(owner, 'must_evaluate', False)))
+
+
+class ContinueConditionScheduler(object):
+    """Evaluate continue conditions in order of measured cost and selectivity.
+
+    The trajectory stops as soon as one condition returns False, so the
+    remaining conditions need not be evaluated. Each condition's average
+    time per call and the fraction of calls in which it stopped the
+    trajectory are recorded, and conditions are evaluated in increasing
+    order of time divided by stopping probability (conditions that have
+    not been measured yet come first). Conditions marked with
+    ``must_evaluate`` (see :func:`.must_evaluate`) are always evaluated,
+    before all others.
+
+    Attributes
+    ----------
+    statistics : dict
+        maps each condition to ``[n_calls, n_stops, total_time]``
+    """
+    def __init__(self):
+        self.statistics = {}
+
+    def rank(self, condition):
+        """Expected time spent on the condition per stop; lower is first"""
+        n_calls, n_stops, total_time = self.statistics.get(condition,
+                                                           [0, 0, 0.0])
+        if n_calls == 0:
+            return 0.0
+        # add-one smoothing: a condition that never stopped is not ruled out
+        stop_probability = (n_stops + 1.0) / (n_calls + 2.0)
+        return total_time / n_calls / stop_probability
+
+    def _evaluate(self, condition, trajectory, trusted):
+        start = time.perf_counter()
+        result = condition(trajectory, trusted)
+        elapsed = time.perf_counter() - start
+        stats = self.statistics.setdefault(condition, [0, 0, 0.0])
+        stats[0] += 1
+        stats[1] += int(not result)
+        stats[2] += elapsed
+        return result
+
+    def stop(self, conditions, trajectory, trusted=True):
+        """Whether any of the conditions stops the trajectory
+
+        Parameters
+        ----------
+        conditions : list of function(Trajectory, bool)
+            the continue conditions
+        trajectory : :class:`.Trajectory`
+            the trajectory generated so far
+        trusted : bool
+            passed to the conditions
+
+        Returns
+        -------
+        bool
+            True if one of the conditions returned False
+        """
+        required = [c for c in conditions if must_evaluate(c)]
+        optional = [c for c in conditions if not must_evaluate(c)]
+
+        stop = False
+        for condition in required:
+            stop = (not self._evaluate(condition, trajectory, trusted)) \
+                or stop
+
+        for condition in sorted(optional, key=self.rank):
+            if stop:
+                break
+            stop = not self._evaluate(condition, trajectory, trusted)
+
+        return stop
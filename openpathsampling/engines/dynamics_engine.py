@@ -12,9 +12,10 @@ from openpathsampling.netcdfplus import StorableNamedObject
 from openpathsampling.integration_tools import is_simtk_unit_type
 
 from .snapshot import BaseSnapshot
-from .trajectory import Trajectory
+from .trajectory import Trajectory, ReversedTrajectoryView
 
 from .delayedinterrupt import DelayedInterrupt
+from .continue_conditions import ContinueConditionScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +82,14 @@ class DynamicsEngine(StorableNamedObject):
         3.  `retry` will rerun the trajectory in engine.generate, these moves
             do not satisfy detailed balance
 
+    short_circuit_conditions : bool, default: False
+        if `True`, the continue conditions are ordered by their measured
+        cost and selectivity, and evaluation stops at the first one that
+        stops the trajectory (see :class:`.ContinueConditionScheduler`).
+        Conditions with side effects that must happen for every frame can
+        be marked with a `must_evaluate = True` attribute (on the ensemble
+        for ensemble methods like `can_append`).
+
     retries_when_nan : int, default: 2
         the number of retries (if chosen) before an exception is raised
 
@@ -118,7 +127,8 @@ class DynamicsEngine(StorableNamedObject):
         'retries_when_error': 0,
         'retries_when_max_length': 0,
         'on_retry': 'full',
-        'on_error': 'fail'
+        'on_error': 'fail',
+        'short_circuit_conditions': False
     }
 
     #units = {
@@ -355,6 +365,17 @@ class DynamicsEngine(StorableNamedObject):
         when you hit a stop condition."""
         pass
 
+    @property
+    def condition_scheduler(self):
+        """:class:`.ContinueConditionScheduler` : used with the
+        `short_circuit_conditions` option; keeps its statistics for the
+        lifetime of the engine"""
+        scheduler = self.__dict__.get('_condition_scheduler')
+        if scheduler is None:
+            scheduler = ContinueConditionScheduler()
+            self._condition_scheduler = scheduler
+        return scheduler
+
     def stop_conditions(self, trajectory, continue_conditions=None,
                         trusted=True):
         """
@@ -381,6 +402,10 @@ class DynamicsEngine(StorableNamedObject):
         if callable(continue_conditions):
             continue_conditions = [continue_conditions]
 
+        if self.short_circuit_conditions:
+            return self.condition_scheduler.stop(continue_conditions,
+                                                 trajectory, trusted)
+
         for condition in continue_conditions:
             stop = (not condition(trajectory, trusted)) or stop
             # TODO: Consider short-circuit logic (uncomment code below).
@@ -492,11 +517,18 @@ class DynamicsEngine(StorableNamedObject):
         else:
             initial = Trajectory([initial])
 
+        # backward trajectories are built in generation order, so that
+        # adding a frame does not shift all previous frames
+        if direction > 0:
+            make_trajectory = Trajectory
+        else:
+            make_trajectory = ReversedTrajectoryView
+
         valid = False
         attempt_nan = 0
         attempt_error = 0
         attempt_max_length = 0
-        trajectory = initial
+        trajectory = make_trajectory(initial)
 
         final_error = None
         errors = []
@@ -505,7 +537,7 @@ class DynamicsEngine(StorableNamedObject):
             if attempt_nan + attempt_error > 1:
                 # let's get a new initial trajectory the way the user wants to
                 if self.on_retry == 'full':
-                    trajectory = initial
+                    trajectory = make_trajectory(initial)
                 elif self.on_retry == 'remove_interval':
                     trajectory = \
                         trajectory[:max(
@@ -519,8 +551,13 @@ class DynamicsEngine(StorableNamedObject):
                                 len(initial),
                                 int(len(trajectory) / 2)))]
                 elif hasattr(self.on_retry, '__call__'):
+                    if direction < 0:
+                        trajectory = trajectory.materialize()
                     trajectory = self.on_retry(trajectory)
 
+                if type(trajectory) is not make_trajectory:
+                    trajectory = make_trajectory(trajectory)
+
             """ Case of run dying before first output"""
             if len(trajectory) >= 1:
                 if direction > 0:
@@ -545,9 +582,13 @@ class DynamicsEngine(StorableNamedObject):
 
             while not stop:
                 if intervals > 0 and frame % intervals == 0:
-                    # return the current status
+                    # return the current status; the caller may keep or
+                    # save it, so backward trajectories are copied
                     logger.info("Through frame: %d", frame)
-                    yield trajectory
+                    if direction > 0:
+                        yield trajectory
+                    else:
+                        yield trajectory.materialize()
 
                 elif frame % log_rate == 0:
                     logger.info("Through frame: %d", frame)
@@ -593,12 +634,15 @@ class DynamicsEngine(StorableNamedObject):
                 if direction > 0:
                     trajectory.append(snapshot)
                 elif direction < 0:
-                    trajectory.insert(0, snapshot.reversed)
+                    trajectory.prepend(snapshot.reversed)
 
                 if 0 < max_length < len(trajectory):
-                    # hit the max length criterion
+                    # hit the max length criterion; drop the newest frame
                     on = self.on_max_length
-                    del trajectory[-1]
+                    if direction > 0:
+                        del trajectory[-1]
+                    else:
+                        trajectory.pop_first()
 
                     if on == 'fail':
                         final_error = EngineMaxLengthError(
@@ -659,6 +703,11 @@ class DynamicsEngine(StorableNamedObject):
 
             self.stop(trajectory)
 
+        if direction < 0:
+            trajectory = trajectory.materialize()
+            if isinstance(final_error, EngineError):
+                final_error.last_trajectory = trajectory
+
         if errors:
             logger.info('Errors occurred during generation :')
             for no, e in enumerate(errors):
@@ -25,9 +25,73 @@ def unmask_quantity(quantity):
     except AttributeError:
         # no units
         return quantity
+    value = quantity._value
+    if type(value) is np.ndarray and not value.flags.writeable:
+        return quantity  # shared read-only data; see UnitFreeStaticContainer
     return np.array(quantity.value_in_unit(q_unit)) * q_unit
 
 
+def read_only_array(value, in_place=False):
+    """Make the array (or quantity wrapping an array) read-only.
+
+    Unit-free containers keep their data in read-only arrays, which can be
+    shared between copies instead of being deep-copied (copy-on-write:
+    anything that wants to change the data has to make its own copy).
+
+    Parameters
+    ----------
+    value : np.ndarray or openmm.unit.Quantity wrapping np.ndarray
+        the input data; other types (or None) are deep-copied
+    in_place : bool
+        if False (default), writable arrays are copied before being made
+        read-only; if True, they are made read-only in place (only use
+        this for new arrays that nothing else will write to)
+
+    Returns
+    -------
+    np.ndarray or openmm.unit.Quantity
+        read-only version of the input, wrapping a regular numpy array
+    """
+    try:
+        q_unit = value.unit
+    except AttributeError:
+        q_unit = None
+        array = value
+    else:
+        array = value._value
+
+    if not isinstance(array, np.ndarray):
+        return copy.deepcopy(value)
+
+    if type(array) is not np.ndarray:
+        # masked arrays (from netCDF) and other subclasses
+        array = np.array(array)
+    elif not array.flags.writeable:
+        return value  # already read-only: share it
+    elif not in_place:
+        array = np.array(array)
+
+    array.flags.writeable = False
+    if q_unit is not None:
+        return unit.Quantity(array, q_unit)
+    return array
+
+
+def _md_unit_array(value, md_unit, in_place=False):
+    """Read-only plain array of the value in the given (MD) unit.
+
+    Values without units are assumed to be in that unit already; None
+    stays None.
+    """
+    if value is None:
+        return None
+    try:
+        value = value.value_in_unit(md_unit)
+    except AttributeError:
+        pass
+    return read_only_array(value, in_place=in_place)
+
+
 # =============================================================================
 # SIMULATION CONFIGURATION
 # =============================================================================
@@ -87,6 +151,64 @@ class StaticContainer(StorableObject):
         }
 
 
+class UnitFreeStaticContainer(StaticContainer):
+    """
+    StaticContainer that keeps plain arrays in the MD unit system (nm).
+
+    The arrays are read-only and shared by copies of the container instead
+    of being deep-copied. The ``coordinates`` and ``box_vectors``
+    attributes wrap them in :class:`openmm.unit.Quantity` objects (without
+    copying), so this can be used everywhere a StaticContainer is used;
+    it is stored and loaded as a normal StaticContainer.
+
+    Parameters
+    ----------
+    coordinates : Nx3 np array or openmm.unit.Quantity wrapping one
+        atomic coordinates; plain arrays must be in nm
+    box_vectors : periodic box vectors
+        the periodic box vectors; plain arrays must be in nm
+    engine : :class:`.DynamicsEngine`
+        the engine that creating this data
+    in_place : bool
+        if True, writable input arrays are made read-only and used instead
+        of being copied (only for new arrays that nothing else writes to)
+    """
+
+    def __init__(self, coordinates, box_vectors, engine=None,
+                 in_place=False):
+        StorableObject.__init__(self)
+        self.coordinates_array = _md_unit_array(coordinates, unit.nanometer,
+                                                in_place)
+        self.box_vectors_array = _md_unit_array(box_vectors, unit.nanometer,
+                                                in_place)
+        self.engine = engine
+
+    @property
+    def coordinates(self):
+        return unit.Quantity(self.coordinates_array, unit.nanometer)
+
+    @property
+    def box_vectors(self):
+        if self.box_vectors_array is None:
+            return None
+        return unit.Quantity(self.box_vectors_array, unit.nanometer)
+
+    def copy(self):
+        """
+        Returns a copy of the instance itself, which shares the (read-only)
+        arrays. If this object is saved it will be stored as a separate
+        object and consume additional memory.
+
+        Returns
+        -------
+        UnitFreeStaticContainer()
+            the copy
+        """
+        return UnitFreeStaticContainer(coordinates=self.coordinates_array,
+                                       box_vectors=self.box_vectors_array,
+                                       engine=self.engine)
+
+
 class StaticContainerStore(ObjectStore):
     """
     An ObjectStore for Configuration. Allows to store Configuration() instances in a netcdf file.
@@ -213,6 +335,50 @@ class KineticContainer(StorableObject):
         }
 
 
+class UnitFreeKineticContainer(KineticContainer):
+    """
+    KineticContainer that keeps a plain array in the MD unit system (nm/ps).
+
+    See :class:`.UnitFreeStaticContainer`.
+
+    Parameters
+    ----------
+    velocities : Nx3 np array or openmm.unit.Quantity wrapping one
+        atomic velocities; plain arrays must be in nm/ps
+    engine : :class:`.DynamicsEngine`
+        the engine that creating this data
+    in_place : bool
+        if True, a writable input array is made read-only and used instead
+        of being copied (only for new arrays that nothing else writes to)
+    """
+
+    def __init__(self, velocities, engine=None, in_place=False):
+        StorableObject.__init__(self)
+        self.velocities_array = _md_unit_array(
+            velocities, unit.nanometer / unit.picosecond, in_place
+        )
+        self.engine = engine
+
+    @property
+    def velocities(self):
+        return unit.Quantity(self.velocities_array,
+                             unit.nanometer / unit.picosecond)
+
+    def copy(self):
+        """
+        Returns a copy of the instance itself, which shares the (read-only)
+        array. If saved this object will be stored as a separate object and
+        consume additional memory.
+
+        Returns
+        -------
+        UnitFreeKineticContainer()
+            the copy
+        """
+        return UnitFreeKineticContainer(velocities=self.velocities_array,
+                                        engine=self.engine)
+
+
 class KineticContainerStore(ObjectStore):
     """
     An ObjectStore for Momenta. Allows to store Momentum() instances in a netcdf file.
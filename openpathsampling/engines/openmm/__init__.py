@@ -5,6 +5,7 @@ from openpathsampling.integration_tools import HAS_OPENMM
 
 if not HAS_OPENMM:
     Engine = missing_openmm
+    EnginePool = missing_openmm
     empty_snapshot_from_openmm_topology = missing_openmm
     snapshot_from_pdb = missing_openmm
     snapshot_from_testsystem = missing_openmm
@@ -15,6 +16,7 @@ if not HAS_OPENMM:
     MDSnapshot = missing_openmm
 else:
     from .engine import OpenMMEngine as Engine
+    from .engine_pool import OpenMMEnginePool as EnginePool
     from .tools import (
         empty_snapshot_from_openmm_topology,
         snapshot_from_pdb,
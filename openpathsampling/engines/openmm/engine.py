@@ -5,6 +5,9 @@ from openpathsampling.integration_tools import unit as u
 
 from openpathsampling.engines import DynamicsEngine, SnapshotDescriptor
 from openpathsampling.engines.openmm import tools
+from openpathsampling.engines.features.shared import (
+    UnitFreeStaticContainer, UnitFreeKineticContainer
+)
 from .snapshot import Snapshot
 import numpy as np
 
@@ -51,6 +54,14 @@ def restore_custom_integrator_interface(integrator):
     return integrator
 
 
+def _copy_integrator(integrator):
+    # an integrator can only be bound to one context, even after that
+    # context is deleted
+    xml = openmm.XmlSerializer.serialize(integrator)
+    copied = openmm.XmlSerializer.deserialize(xml)
+    return restore_custom_integrator_interface(copied)
+
+
 class OpenMMEngine(DynamicsEngine):
     """OpenMM dynamics engine based on OpenMM system and integrator.
 
@@ -68,6 +79,7 @@ class OpenMMEngine(DynamicsEngine):
     _default_options = {
         'n_steps_per_frame': 10,
         'n_frames_max': 5000,
+        'unit_free_snapshots': False,
     }
 
     base_snapshot_type = Snapshot
@@ -105,6 +117,13 @@ class OpenMMEngine(DynamicsEngine):
                 'n_frames_max' : int, default: 5000,
                     the maximal number of frames allowed for a returned
                     trajectory object
+                'unit_free_snapshots' : bool, default: False
+                    if True, new snapshots keep plain, read-only arrays in
+                    MD units (nm, nm/ps) that are shared by copies instead
+                    of deep-copied unit-wrapped arrays; the arrays are only
+                    wrapped in units when accessed, e.g., as
+                    ``snapshot.coordinates``. See
+                    :class:`.UnitFreeStaticContainer`.
 
         Notes
         -----
@@ -146,6 +165,17 @@ class OpenMMEngine(DynamicsEngine):
 
         self._simulation = None
         self._n_dofs = None
+        # engine to attach to new snapshots; other than self for engines in
+        # an OpenMMEnginePool
+        self._snapshot_engine = self
+
+        # stop volumes evaluated in the context; see set_stop_volumes
+        self._stop_volumes = []
+        self._stop_coefficients = []
+        self._stop_system = None
+        self._stop_force = None
+        self._stop_volumes_inside = None
+        self._stop_volumes_crossed = True
 
     def from_new_options(
             self,
@@ -280,7 +310,7 @@ class OpenMMEngine(DynamicsEngine):
             if type(platform) is str:
                 self._simulation = openmm.app.Simulation(
                     topology=self.topology.mdtraj.to_openmm(),
-                    system=self.system,
+                    system=self._simulation_system,
                     integrator=self.integrator,
                     platform=openmm.Platform.getPlatformByName(platform),
                     platformProperties=self.openmm_properties
@@ -288,14 +318,14 @@ class OpenMMEngine(DynamicsEngine):
             elif platform is None:
                 self._simulation = openmm.app.Simulation(
                     topology=self.topology.mdtraj.to_openmm(),
-                    system=self.system,
+                    system=self._simulation_system,
                     integrator=self.integrator,
                     platformProperties=self.openmm_properties
                 )
             else:
                 self._simulation = openmm.app.Simulation(
                     topology=self.topology.mdtraj.to_openmm(),
-                    system=self.system,
+                    system=self._simulation_system,
                     integrator=self.integrator,
                     platform=platform,
                     platformProperties=self.openmm_properties
@@ -305,6 +335,99 @@ class OpenMMEngine(DynamicsEngine):
                 'Initialized OpenMM engine using platform `%s`' %
                 self.platform)
 
+            if self._stop_system is not None:
+                self._stop_force = self._stop_system.getForce(
+                    self._stop_system.getNumForces() - 1
+                )
+
+    @property
+    def _simulation_system(self):
+        if self._stop_system is not None:
+            return self._stop_system
+        return self.system
+
+    def set_stop_volumes(self, volumes):
+        """Evaluate entering or leaving the given volumes inside the context.
+
+        The CVs of the volumes are added to (a copy of) the system as a
+        :class:`openmm.CustomCVForce` that contributes no energy. After
+        each frame, the engine reads only these CV values from the context,
+        and the stopping conditions of the trajectory are only evaluated if
+        the new frame has entered or left one of the volumes. This saves
+        the evaluation of (Python) CVs and ensembles on all other frames.
+
+        This is only valid if the stopping conditions can only change when
+        the trajectory enters or leaves one of the volumes, e.g., if the
+        volumes are the states of a TIS ensemble. Frames are generated as
+        usual, every ``n_steps_per_frame`` steps, and the maximum length of
+        the trajectory is still enforced.
+
+        The stop volumes are not saved with the engine. Setting them
+        recreates the simulation (on the same platform, if it existed),
+        with a copy of the integrator, since OpenMM binds an integrator to
+        its first context.
+
+        Parameters
+        ----------
+        volumes : list of :class:`.CVDefinedVolume`
+            the volumes to check; their CVs must be
+            :class:`.GeometricCV` objects. An empty list switches the
+            checks off.
+        """
+        coefficients = []
+        cv_force = openmm.CustomCVForce("0")
+        for volume_idx, volume in enumerate(volumes):
+            cv = getattr(volume, 'collectivevariable', None)
+            if not (hasattr(cv, 'openmm_forces')
+                    and hasattr(volume, '_contains_value')):
+                raise TypeError("Volume '" + str(volume) + "' is not a "
+                                "CVDefinedVolume based on a GeometricCV")
+            volume_coefficients = []
+            for term_idx, (coefficient, force) in \
+                    enumerate(cv.openmm_forces()):
+                cv_force.addCollectiveVariable(
+                    "cv{}_{}".format(volume_idx, term_idx), force
+                )
+                volume_coefficients.append(coefficient)
+            coefficients.append(np.array(volume_coefficients))
+
+        platform = self.platform
+        snapshot = self._current_snapshot
+        self.unload_context()
+        self.integrator = _copy_integrator(self.integrator)
+
+        self._stop_volumes = list(volumes)
+        self._stop_coefficients = coefficients
+        self._stop_force = None
+        self._stop_volumes_inside = None
+        self._stop_volumes_crossed = True
+        if self._stop_volumes:
+            system_xml = openmm.XmlSerializer.serialize(self.system)
+            self._stop_system = openmm.XmlSerializer.deserialize(system_xml)
+            self._stop_system.addForce(cv_force)
+        else:
+            self._stop_system = None
+
+        self._current_snapshot = None
+        if platform is not None:
+            self.initialize(platform)
+            if snapshot is not None:
+                self.current_snapshot = snapshot
+
+    def _in_stop_volumes(self):
+        values = np.array(self._stop_force.getCollectiveVariableValues(
+            self.simulation.context
+        ))
+        result = []
+        start = 0
+        for volume, coefficients in zip(self._stop_volumes,
+                                        self._stop_coefficients):
+            end = start + len(coefficients)
+            value = float(np.dot(coefficients, values[start:end]))
+            result.append(volume._contains_value(value))
+            start = end
+        return result
+
     @staticmethod
     def available_platforms():
         return [
@@ -385,25 +508,50 @@ class OpenMMEngine(DynamicsEngine):
     def _build_current_snapshot(self):
         # TODO: Add caching for this and mark if changed
 
+        # energies aren't part of the snapshot, so don't ask OpenMM to
+        # calculate them
         state = self.simulation.context.getState(getPositions=True,
-                                                 getVelocities=True,
-                                                 getEnergy=True)
-
-        snapshot = Snapshot.construct(
-            coordinates=state.getPositions(asNumpy=True),
-            box_vectors=state.getPeriodicBoxVectors(asNumpy=True),
-            velocities=state.getVelocities(asNumpy=True),
-            engine=self
-        )
+                                                 getVelocities=True)
+
+        coordinates = state.getPositions(asNumpy=True)
+        box_vectors = state.getPeriodicBoxVectors(asNumpy=True)
+        velocities = state.getVelocities(asNumpy=True)
+        engine = self._snapshot_engine
+        if self.unit_free_snapshots:
+            # the state's arrays are new, so the snapshot can take them over
+            # (read-only) instead of copying them
+            snapshot = Snapshot.construct(
+                statics=UnitFreeStaticContainer(
+                    coordinates=coordinates._value,
+                    box_vectors=box_vectors._value,
+                    engine=engine,
+                    in_place=True
+                ),
+                kinetics=UnitFreeKineticContainer(
+                    velocities=velocities._value,
+                    engine=engine,
+                    in_place=True
+                ),
+                engine=engine
+            )
+        else:
+            snapshot = Snapshot.construct(
+                coordinates=coordinates,
+                box_vectors=box_vectors,
+                velocities=velocities,
+                engine=engine
+            )
 
         return snapshot
 
     @staticmethod
     def is_valid_snapshot(snapshot):
-        if np.isnan(np.min(snapshot.coordinates._value)):
+        # check the stored arrays directly: avoids creating reversed
+        # velocities, and the unit doesn't matter for NaN checks
+        if np.isnan(np.min(snapshot.statics.coordinates._value)):
             return False
 
-        if np.isnan(np.min(snapshot.velocities._value)):
+        if np.isnan(np.min(snapshot.kinetics.velocities._value)):
             return False
 
         return True
@@ -436,8 +584,11 @@ class OpenMMEngine(DynamicsEngine):
             # if snapshot.velocities is not None:
             self.simulation.context.setVelocities(snapshot.velocities)
 
+            if self._stop_volumes:
+                self._stop_volumes_inside = self._in_stop_volumes()
+
             # After the updates cache the new snapshot
-            if snapshot.engine is self:
+            if snapshot.engine is self._snapshot_engine:
                 # no need for copy if this snap is from this engine
                 self._current_snapshot = snapshot
             else:
@@ -445,9 +596,26 @@ class OpenMMEngine(DynamicsEngine):
 
     def generate_next_frame(self):
         self.simulation.step(self.n_steps_per_frame)
+        if self._stop_volumes:
+            is_inside = self._in_stop_volumes()
+            self._stop_volumes_crossed = \
+                is_inside != self._stop_volumes_inside
+            self._stop_volumes_inside = is_inside
         self._current_snapshot = None
         return self.current_snapshot
 
+    def stop_conditions(self, trajectory, continue_conditions=None,
+                        trusted=True):
+        # docstring inherited from DynamicsEngine
+        if trusted and self._stop_volumes \
+                and not self._stop_volumes_crossed:
+            # see set_stop_volumes: nothing can have changed
+            return False
+
+        return super(OpenMMEngine, self).stop_conditions(
+            trajectory, continue_conditions, trusted
+        )
+
     def minimize(self):
         self.simulation.minimizeEnergy()
         # make sure that we get the minimized structure on request
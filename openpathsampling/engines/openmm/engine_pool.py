@@ -0,0 +1,157 @@
+"""
+Pool of OpenMM engines for running several trajectories at once.
+
+Each engine in the pool has its own OpenMM context; on the CPU platform
+each context gets its own share of the CPU threads. OpenMM releases the
+GIL while integrating, so the engines can run in parallel threads.
+"""
+import contextlib
+import logging
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from openpathsampling.engines.delayedinterrupt import EmptyContext
+from openpathsampling.integration_tools import openmm
+from .engine import _copy_integrator
+
+logger = logging.getLogger(__name__)
+
+
+class OpenMMEnginePool(object):
+    """Pool of copies of an OpenMM engine, each with its own context.
+
+    The engines in the pool give their snapshots the ``engine`` of the
+    template, so snapshots are interchangeable between the engines in the
+    pool (and the template engine), and only the template engine is saved
+    with them. Stop volumes of the template (see
+    :meth:`.OpenMMEngine.set_stop_volumes`) are set on all engines.
+
+    Example
+    -------
+    >>> pool = OpenMMEnginePool(engine, n_engines=4)
+    >>> trajectories = pool.map(
+    ...     lambda eng, snap: eng.generate(snap, [ensemble.can_append]),
+    ...     snapshots
+    ... )
+
+    Parameters
+    ----------
+    engine : :class:`.OpenMMEngine`
+        template engine
+    n_engines : int
+        number of engines (contexts) in the pool
+    threads_per_engine : int or None
+        number of CPU threads for each context; default (None) divides the
+        available CPUs evenly between the engines. Only used on the CPU
+        platform.
+    platform : str
+        name of the OpenMM platform to use; default 'CPU'
+    """
+    def __init__(self, engine, n_engines, threads_per_engine=None,
+                 platform='CPU'):
+        self.template = engine
+        self.n_engines = n_engines
+        self.platform = platform
+        if threads_per_engine is None:
+            threads_per_engine = max(1, (os.cpu_count() or 1) // n_engines)
+        self.threads_per_engine = threads_per_engine
+
+        # properties of another platform (e.g., CUDA of the template) are
+        # not accepted by this one
+        names = openmm.Platform.getPlatformByName(platform).getPropertyNames()
+        properties = {key: value
+                      for (key, value) in engine.openmm_properties.items()
+                      if key in names}
+        if platform == 'CPU':
+            properties['Threads'] = str(threads_per_engine)
+
+        self.engines = []
+        self._available = queue.Queue()
+        for _ in range(n_engines):
+            new_engine = engine.from_new_options(
+                integrator=_copy_integrator(engine.integrator),
+                openmm_properties=properties
+            )
+            new_engine._snapshot_engine = engine
+            # signal handlers can only be set in the main thread; signals
+            # are handled there while the pool threads run
+            new_engine.interrupter = EmptyContext
+            if engine._stop_volumes:
+                new_engine.set_stop_volumes(engine._stop_volumes)
+            self.engines.append(new_engine)
+            self._available.put(new_engine)
+
+        logger.info("Created pool of %d OpenMM engines (%s, %s threads "
+                    "each)", n_engines, platform, threads_per_engine)
+
+    def initialize(self):
+        """Create the contexts for all engines in the pool.
+
+        This is otherwise done when each engine is first used.
+        """
+        for engine in self.engines:
+            engine.initialize(self.platform)
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Context manager to use an engine from the pool.
+
+        Blocks until an engine is available; the engine is returned to
+        the pool at the end of the ``with`` block.
+        """
+        engine = self._available.get()
+        try:
+            engine.initialize(self.platform)  # no-op if already done
+            yield engine
+        finally:
+            self._available.put(engine)
+
+    def map(self, function, items):
+        """Apply a function to each item, in parallel over the pool.
+
+        Parameters
+        ----------
+        function : Callable[[:class:`.OpenMMEngine`, Any], Any]
+            function of an engine from the pool and an item
+        items : Iterable
+            the items
+
+        Returns
+        -------
+        list
+            results of ``function`` for each item, in order
+        """
+        def run(item):
+            with self.acquire() as engine:
+                return function(engine, item)
+
+        with ThreadPoolExecutor(max_workers=self.n_engines) as executor:
+            return list(executor.map(run, items))
+
+    def generate(self, snapshots, running=None, direction=+1):
+        """Generate a trajectory from each snapshot, in parallel.
+
+        Parameters
+        ----------
+        snapshots : Iterable[:class:`.Snapshot`]
+            initial snapshots
+        running : list of callables
+            stopping conditions; see :meth:`.DynamicsEngine.generate`
+        direction : +1 or -1
+            direction of the trajectories
+
+        Returns
+        -------
+        list of :class:`.Trajectory`
+            one trajectory for each initial snapshot
+        """
+        return self.map(
+            lambda engine, snap: engine.generate(snap, running, direction),
+            snapshots
+        )
+
+    def close(self):
+        """Remove the contexts of all engines in the pool."""
+        for engine in self.engines:
+            engine.unload_context()
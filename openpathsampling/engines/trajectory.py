@@ -40,13 +40,13 @@ class Trajectory(list, StorableObject):
         StorableObject.__init__(self)
 
         if trajectory is not None:
-            if type(trajectory) is Trajectory:
+            if isinstance(trajectory, Trajectory):
                 self.extend(trajectory.iter_proxies())
             else:
                 self.extend(trajectory)
 
     def extend(self, iterable):
-        if type(iterable) is Trajectory:
+        if isinstance(iterable, Trajectory):
             list.extend(self, iterable.iter_proxies())
         else:
             list.extend(self, iterable)
@@ -84,7 +84,7 @@ class Trajectory(list, StorableObject):
 
         if allow_fast:
             try:
-                return [fnc(frame) for frame in list.__iter__(self)]
+                return [fnc(frame) for frame in self.iter_proxies()]
             except:
                 pass
 
@@ -189,8 +189,7 @@ class Trajectory(list, StorableObject):
             return hash(tuple())
         else:
             return hash(
-                (list.__getitem__(self, 0), len(self),
-                 list.__getitem__(self, -1)))
+                (self.get_as_proxy(0), len(self), self.get_as_proxy(-1)))
 
     # this might be faster, but does not allow to compare arbitrary
     # trajectories as one might expect. hash(Trajectory(traj)) != hash(traj)
@@ -359,8 +358,8 @@ class Trajectory(list, StorableObject):
         last_vol = None
         count = 0
         segment_labels = []
-        # list.__iter__ for speed
-        for frame in list.__iter__(self):
+        # iterate proxies for speed
+        for frame in self.iter_proxies():
             in_state = []
             for key in label_dict.keys():
                 vol = label_dict[key]
@@ -598,3 +597,107 @@ class Trajectory(list, StorableObject):
             return paths.Trajectory([trajectories])
 
         return trajectories
+
+
+class ReversedTrajectoryView(Trajectory):
+    """
+    Trajectory that keeps its frames in reversed order internally.
+
+    This is used to build trajectories backward in time: the underlying list
+    holds the frames in the order in which they were generated (last frame
+    first), so that adding a frame at the beginning of the trajectory is an
+    O(1) append instead of an O(n) insert. All :class:`.Trajectory` methods
+    see the frames in the usual order.
+
+    Only the methods overridden here take the reversed order into account;
+    other list methods (e.g., ``pop`` or ``__setitem__``) and storage see
+    the internal order. Views should therefore not leave the code that
+    builds them: use :meth:`.materialize` to create a plain
+    :class:`.Trajectory` to hand out.
+    """
+
+    def __init__(self, trajectory=None):
+        super(ReversedTrajectoryView, self).__init__()
+        if trajectory is not None:
+            if isinstance(trajectory, Trajectory):
+                frames = trajectory.as_proxies()
+            else:
+                frames = list(trajectory)
+            list.extend(self, reversed(frames))
+
+    def _internal_index(self, index):
+        n_frames = len(self)
+        if index < 0:
+            index += n_frames
+        if not 0 <= index < n_frames:
+            raise IndexError('trajectory index out of range')
+        return n_frames - 1 - index
+
+    def prepend(self, snapshot):
+        """Add a snapshot at the beginning of the trajectory in O(1)"""
+        list.append(self, snapshot)
+
+    def pop_first(self):
+        """Remove and return the first snapshot of the trajectory in O(1)"""
+        return list.pop(self)
+
+    def materialize(self):
+        """
+        Plain copy of this trajectory
+
+        Returns
+        -------
+        :class:`openpathsampling.trajectory.Trajectory`
+            trajectory with the same frames in a normal list
+        """
+        return Trajectory(self.as_proxies())
+
+    def get_as_proxy(self, item):
+        return list.__getitem__(self, self._internal_index(item))
+
+    def iter_proxies(self):
+        return list.__reversed__(self)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            index = range(len(self))[index]
+
+        if hasattr(index, '__iter__'):
+            return Trajectory([self.get_as_proxy(i) for i in index])
+
+        ret = self.get_as_proxy(index)
+        if type(ret) is LoaderProxy:
+            ret = ret.__subject__
+
+        return ret
+
+    def __delitem__(self, index):
+        list.__delitem__(self, self._internal_index(index))
+
+    def __eq__(self, other):
+        if isinstance(other, Trajectory):
+            other = other.as_proxies()
+        return self.as_proxies() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = Trajectory.__hash__
+
+    def append(self, snapshot):
+        list.insert(self, 0, snapshot)
+
+    def extend(self, iterable):
+        if isinstance(iterable, Trajectory):
+            iterable = iterable.iter_proxies()
+        for snapshot in iterable:
+            self.append(snapshot)
+
+    def insert(self, index, snapshot):
+        n_frames = len(self)
+        if index < 0:
+            index = max(index + n_frames, 0)
+        list.insert(self, n_frames - min(index, n_frames), snapshot)
+
+    def index(self, value, *args):
+        return self.as_proxies().index(value, *args)
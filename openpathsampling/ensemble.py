@@ -5,9 +5,12 @@ Created on 03.09.2014
 """
 
 import abc
+import collections
 import logging
 import itertools
 
+import numpy as np
+
 from openpathsampling.netcdfplus import StorableNamedObject
 import openpathsampling as paths
 
@@ -71,6 +74,97 @@ def _get_list_traj(trajectory):
     return list(itraj())
 
 
+def _frame_mask(volumes, frames):
+    """Boolean mask of frames that are in all of the volumes.
+
+    Volumes are only evaluated for frames that are in all previous volumes,
+    as with the short-circuit logic of intersections.
+
+    Parameters
+    ----------
+    volumes : list of :class:`.Volume`
+    frames : list of :class:`.BaseSnapshot`
+
+    Returns
+    -------
+    np.ndarray of bool
+    """
+    mask = np.ones(len(frames), dtype=bool)
+    for volume in volumes:
+        for idx in np.flatnonzero(mask):
+            mask[idx] = bool(volume(frames[idx]))
+    return mask
+
+
+def _iter_frame_local_slices(mask, length_bounds, max_length, min_length,
+                             overlap):
+    """Forward search of :meth:`.Ensemble.iter_valid_slices` on a mask.
+
+    This gives the same slices as the frame-by-frame search for ensembles
+    where a subtrajectory is valid if all of its frames are in the mask and
+    its length is within the bounds. Instead of testing each candidate
+    subtrajectory, the end of the run of allowed frames that begins at a
+    given start frame is looked up directly.
+
+    Parameters
+    ----------
+    mask : np.ndarray of bool
+        whether each frame of the trajectory is allowed
+    length_bounds : tuple (lo, hi, append_max)
+        a subtrajectory of length ``n`` is valid if ``lo <= n < hi`` and
+        can be appended if ``n < append_max``
+    max_length : int
+    min_length : int
+    overlap : int
+        see :meth:`.Ensemble.iter_valid_slices`
+
+    Yields
+    ------
+    tuple (int, int)
+        start and end index of each valid subtrajectory
+    """
+    length = len(mask)
+    lo, hi, append_max = length_bounds
+    # index of the first forbidden frame at or after each frame
+    forbidden = np.append(np.flatnonzero(~mask), length)
+    run_end = forbidden[np.searchsorted(forbidden, np.arange(length))]
+
+    def in_ensemble(start, end):
+        return end <= run_end[start] and lo <= end - start < hi
+
+    start = 0
+    end = start + min_length
+    while start <= length - min_length and end <= length:
+        # largest end for which the subtrajectory can still be appended
+        last_appendable = min(run_end[start], start + append_max - 1)
+        if end < length and end <= last_appendable:
+            new_end = min(length, last_appendable + 1)
+            if new_end >= max(end + 1, start + max_length + 2):
+                start += 1
+                end = start + min_length
+                continue
+            end = new_end
+
+        if end - start <= max_length and in_ensemble(start, end):
+            yield start, end
+            pad = min(overlap, end - start - 1)
+            start = end - pad
+            if end == length:
+                start = length
+        elif end - start >= min_length + 1 and in_ensemble(start, end - 1):
+            yield start, end - 1
+            pad = min(overlap + 1, end - start - 2)
+            start = end - pad
+        else:
+            start += 1
+        end = start + min_length
+
+
+# length bounds (lo, hi, append_max) of frame-local ensembles without a
+# length restriction; see _iter_frame_local_slices
+_UNBOUNDED_LENGTH = (0, float('inf'), float('inf'))
+
+
 # note: the cache is not storable, because that would just be silly!
 class EnsembleCache(object):
     """Object used by ensembles to enable fast algorithms for basic functions.
@@ -225,6 +319,170 @@ class EnsembleCache(object):
         return reset
 
 
+class EnsembleVerdictCache(object):
+    """LRU memo of the results of ``ensemble(trajectory)``.
+
+    The same trajectory is often checked against the same ensemble several
+    times in an MC step (acceptance, sanity checks, analysis). Ensembles
+    and trajectories don't change once they are created, so the result
+    can be stored using the UUIDs of both as key. The length of the
+    trajectory and the UUIDs of its first and last frames are part of the
+    key, so that a trajectory that is still being extended (at either end)
+    is not answered from the cache.
+
+    Trajectories that are checked with the cache must not be changed in
+    any other way: replacing frames inside the trajectory while keeping
+    its length and end frames returns the result for the old frames.
+
+    Use :meth:`.Ensemble.enable_verdict_cache` to activate the global
+    cache, which is used by :meth:`.Ensemble.check`.
+
+    Parameters
+    ----------
+    maxsize : int
+        maximal number of results to keep; the least recently used results
+        are removed first
+
+    Attributes
+    ----------
+    hits : int
+        number of results returned from the cache
+    misses : int
+        number of results that had to be calculated
+    evictions : int
+        number of results removed because the cache was full
+    """
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._verdicts = collections.OrderedDict()
+        # keys of the stored results by ensemble and trajectory UUID, for
+        # targeted invalidation
+        self._keys_by_ensemble = collections.defaultdict(set)
+        self._keys_by_trajectory = collections.defaultdict(set)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(ensemble, trajectory, candidate):
+        traj_uuid = trajectory.__uuid__
+        n_frames = len(trajectory)
+        if n_frames > 0:
+            ends = (trajectory.get_as_proxy(0).__uuid__,
+                    trajectory.get_as_proxy(-1).__uuid__)
+        else:
+            ends = None
+        return (ensemble.__uuid__, traj_uuid, n_frames, ends,
+                bool(candidate))
+
+    def __len__(self):
+        return len(self._verdicts)
+
+    def __call__(self, ensemble, trajectory, candidate=False):
+        """Return ``ensemble(trajectory, False, candidate)``, memoized.
+
+        Parameters
+        ----------
+        ensemble : :class:`.Ensemble`
+            the ensemble to check against
+        trajectory : :class:`.Trajectory`
+            the trajectory to check
+        candidate : bool
+            whether the trajectory is a candidate; candidate and full
+            checks are stored separately
+
+        Returns
+        -------
+        bool
+            whether the trajectory is in the ensemble
+        """
+        try:
+            key = self._key(ensemble, trajectory, candidate)
+        except AttributeError:
+            # not a storable trajectory (e.g., a plain list of snapshots)
+            return ensemble(trajectory, trusted=False, candidate=candidate)
+
+        verdicts = self._verdicts
+        try:
+            verdict = verdicts.pop(key)
+        except KeyError:
+            self.misses += 1
+            verdict = bool(ensemble(trajectory, trusted=False,
+                                    candidate=candidate))
+            if len(verdicts) >= self.maxsize:
+                old_key, _ = verdicts.popitem(last=False)
+                self._unindex(old_key)
+                self.evictions += 1
+            self._keys_by_ensemble[key[0]].add(key)
+            self._keys_by_trajectory[key[1]].add(key)
+        else:
+            self.hits += 1
+
+        verdicts[key] = verdict
+        return verdict
+
+    def _unindex(self, key):
+        for index, uuid in [(self._keys_by_ensemble, key[0]),
+                            (self._keys_by_trajectory, key[1])]:
+            keys = index[uuid]
+            keys.discard(key)
+            if not keys:
+                del index[uuid]
+
+    def invalidate(self, ensemble=None, trajectory=None):
+        """Remove stored results.
+
+        Without arguments, everything is removed. Otherwise only results
+        for the given ensemble and/or trajectory are removed; these are
+        looked up in an index, so the cost does not depend on the size of
+        the cache.
+
+        Parameters
+        ----------
+        ensemble : :class:`.Ensemble` or None
+            remove results for this ensemble
+        trajectory : :class:`.Trajectory` or None
+            remove results for this trajectory
+        """
+        if ensemble is None and trajectory is None:
+            self._verdicts = collections.OrderedDict()
+            self._keys_by_ensemble = collections.defaultdict(set)
+            self._keys_by_trajectory = collections.defaultdict(set)
+            return
+
+        if ensemble is not None:
+            remove = set(self._keys_by_ensemble.get(ensemble.__uuid__, ()))
+            if trajectory is not None:
+                remove &= self._keys_by_trajectory.get(trajectory.__uuid__,
+                                                       set())
+        else:
+            remove = set(self._keys_by_trajectory.get(trajectory.__uuid__,
+                                                      ()))
+
+        for key in remove:
+            del self._verdicts[key]
+            self._unindex(key)
+
+    def reset_stats(self):
+        """Set the hit/miss/eviction counters back to zero"""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def stats(self):
+        """dict : counters and current size of the cache"""
+        n_calls = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._verdicts),
+            'maxsize': self.maxsize,
+            'hit_rate': float(self.hits) / n_calls if n_calls else 0.0
+        }
+
+
 class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
     """
     Path ensemble object.
@@ -240,6 +498,9 @@ class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
 
     #__metaclass__ = abc.ABCMeta
 
+    verdict_cache = None
+    """:class:`.EnsembleVerdictCache` used by :meth:`.check`, or None"""
+
     def __init__(self):
         """
         A path volume defines a set of paths.
@@ -284,8 +545,40 @@ class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
         return self(trajectory, trusted=False)
 
     def check(self, trajectory):
-        """Alias for __call__"""
-        return self(trajectory, trusted=False)
+        """Alias for __call__, using the verdict cache if it is enabled
+
+        See :meth:`.enable_verdict_cache`.
+        """
+        cache = Ensemble.verdict_cache
+        if cache is None:
+            return self(trajectory, trusted=False)
+        return cache(self, trajectory)
+
+    @staticmethod
+    def enable_verdict_cache(maxsize=100000):
+        """Memoize the results of :meth:`.check` for all ensembles.
+
+        Parameters
+        ----------
+        maxsize : int
+            maximal number of results to keep
+
+        Returns
+        -------
+        :class:`.EnsembleVerdictCache`
+            the active cache; an already active cache is kept (with the
+            new ``maxsize``)
+        """
+        if Ensemble.verdict_cache is None:
+            Ensemble.verdict_cache = EnsembleVerdictCache(maxsize)
+        else:
+            Ensemble.verdict_cache.maxsize = maxsize
+        return Ensemble.verdict_cache
+
+    @staticmethod
+    def disable_verdict_cache():
+        """Stop memoizing the results of :meth:`.check`."""
+        Ensemble.verdict_cache = None
 
     def trajectory_summary(self, trajectory):
         """
@@ -404,6 +697,24 @@ class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
         # default behavior is to be the same as can_prepend
         return self.can_prepend(trajectory, trusted)
 
+    def _frame_local_constraints(self):
+        """Volumes and length bounds, if this ensemble is frame-local.
+
+        A trajectory is in a frame-local ensemble if and only if all of its
+        frames are in each of the volumes and its length is within the
+        bounds. These ensembles use a faster search in
+        :meth:`.iter_valid_slices`.
+
+        Returns
+        -------
+        tuple or None
+            list of :class:`.Volume` and length bounds
+            ``(lo, hi, append_max)`` (see
+            :func:`._iter_frame_local_slices`), or None if the ensemble is
+            not frame-local
+        """
+        return None
+
     def iter_valid_slices(
             self,
             trajectory,
@@ -448,6 +759,23 @@ class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
         min_length = max(1, min_length)
 
         logger.debug("Looking for subtrajectories in " + str(trajectory))
+
+        frame_local = self._frame_local_constraints()
+        if frame_local is not None:
+            # fast path: evaluate each volume once per frame, then search
+            # the runs of allowed frames
+            volumes, length_bounds = frame_local
+            mask = _frame_mask(volumes, _get_list_traj(trajectory))
+            if reverse:
+                mask = mask[::-1]
+            parts = _iter_frame_local_slices(mask, length_bounds, max_length,
+                                             min_length, overlap)
+            for start, end in parts:
+                if reverse:
+                    start, end = length - end, length - start
+                yield slice(start, end)
+            return
+
         old_tt_len = 0
 
         if not reverse:
@@ -485,10 +813,6 @@ class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
                         pad = min(overlap + 1, end - start - 2)
                         start = end - pad
                     else:
-                        # TODO: for some ensembles, there are better ways to
-                        # change start. For frame-by-frame ensembles
-                        # (AllInX, AllOutX) we know that we can completely
-                        # stop for all subtrajectories.
                         start += 1
                     end = start + min_length
 
@@ -1435,6 +1759,17 @@ class IntersectionEnsemble(EnsembleCombination):
                                                    fnc=lambda a, b: a and b,
                                                    str_fnc='{0}\nand\n{1}')
 
+    def _frame_local_constraints(self):
+        constraints1 = self.ensemble1._frame_local_constraints()
+        constraints2 = self.ensemble2._frame_local_constraints()
+        if constraints1 is None or constraints2 is None:
+            return None
+
+        volumes1, (lo1, hi1, append_max1) = constraints1
+        volumes2, (lo2, hi2, append_max2) = constraints2
+        return (volumes1 + volumes2,
+                (max(lo1, lo2), min(hi1, hi2), min(append_max1, append_max2)))
+
 
 # class SymmetricDifferenceEnsemble(EnsembleCombination):
 #     # TODO: this is not yet supported. Should be removed. ~DWHS
@@ -2124,6 +2459,18 @@ class LengthEnsemble(Ensemble):
     def can_prepend(self, trajectory, trusted=False):
         return self.can_append(trajectory)
 
+    def _frame_local_constraints(self):
+        if type(self.length) is int:
+            bounds = (self.length, self.length + 1, self.length)
+        else:
+            lo = self.length.start if self.length.start is not None else 0
+            stop = self.length.stop
+            if stop is None:
+                bounds = (lo, float('inf'), float('inf'))
+            else:
+                bounds = (lo, stop, stop - 1)
+        return [], bounds
+
     def _str(self):
         if type(self.length) is int:
             return 'len(x) = {0}'.format(self.length)
@@ -2277,6 +2624,9 @@ class AllInXEnsemble(VolumeEnsemble):
             # print "Rev UnTrusted"
             return self(trajectory)  # in this case, order wouldn't matter
 
+    def _frame_local_constraints(self):
+        return [self._volume], _UNBOUNDED_LENGTH
+
     def __invert__(self):
         return PartOutXEnsemble(self.volume, self.trusted)
 
@@ -2836,6 +3186,10 @@ class TISEnsemble(WrappedEnsemble):
         Volume which the trajectory must exit to be accepted
     orderparameter : `openpathsampling.collectivevariable.CollectiveVariable`
         CV to be used as order parameter for this
+    interface_set : :class:`.InterfaceSet`
+        interface set that ``interface`` belongs to; if given, candidate
+        checks and trajectory summaries classify each frame against all
+        interfaces in a single pass
     """
 
     @property
@@ -2858,7 +3212,8 @@ class TISEnsemble(WrappedEnsemble):
         }
 
     def __init__(self, initial_states, final_states, interface,
-                 orderparameter=None, cv_max=None, lambda_i=None):
+                 orderparameter=None, cv_max=None, lambda_i=None,
+                 interface_set=None):
         # regularize to list of volumes
         # without orderparameter, some info can't be obtained
         try:
@@ -2888,19 +3243,56 @@ class TISEnsemble(WrappedEnsemble):
         self.orderparameter = orderparameter  # TODO: is this used? remove?
         self.cv_max = cv_max
         self.lambda_i = lambda_i
+        self.interface_set = interface_set
         self._initial_volumes = volume_a
         self._final_volumes = volume_b | volume_a
 
+    @property
+    def _interface_set_index(self):
+        """Index of ``self.interface`` in ``self.interface_set`` or None"""
+        try:
+            return self._cached_interface_set_index
+        except AttributeError:
+            pass
+
+        index = None
+        if self.interface_set is not None:
+            for i, volume in enumerate(self.interface_set.volumes):
+                if volume is self.interface or volume == self.interface:
+                    index = i
+                    break
+
+        self._cached_interface_set_index = index
+        return index
+
+    def _interface_set_candidate(self, trajectory):
+        indices = self.interface_set.interface_indices(trajectory)
+        return (
+            self._initial_volumes(trajectory[0])
+            & self._final_volumes(trajectory[-1])
+            & (max(indices) > self._interface_set_index)
+        )
+
     def __call__(self, trajectory, trusted=None, candidate=False):
         logger.debug("TIS ENSEMBLE: candidate={0}".format(str(candidate)))
         use_candidate = (candidate and self.lambda_i is not None)
-        if use_candidate and self.cv_max is not None:
+        use_interface_set = (candidate
+                             and self._interface_set_index is not None)
+        if use_interface_set and self.interface_set.classifies_cv_values:
+            # this also handles interfaces where `cv_max > lambda_i` is not
+            # the same as crossing, e.g., periodic ones
+            logger.debug("Using candidate shortcut with interface_set")
+            return self._interface_set_candidate(trajectory)
+        elif use_candidate and self.cv_max is not None:
             logger.debug("Using candidate shortcut with self.cv_max")
             return (
                 self._initial_volumes(trajectory[0])
                 & self._final_volumes(trajectory[-1])
                 & (self.cv_max(trajectory) > self.lambda_i)
             )
+        elif use_interface_set:
+            logger.debug("Using candidate shortcut with interface_set")
+            return self._interface_set_candidate(trajectory)
         elif use_candidate and self.orderparameter is not None:
             logger.debug("Using candidate shortcut with max(orderparameter)")
             # as a candidate trajectory, we assume that only the first and
@@ -2934,20 +3326,39 @@ class TISEnsemble(WrappedEnsemble):
                 final_state_i = state_i
                 break
 
+        interface_set = self.interface_set
+        max_interface = None
         if self.orderparameter is not None:
             lambda_traj = self.orderparameter(trajectory)
             min_lambda = min(lambda_traj)
             max_lambda = max(lambda_traj)
+            if interface_set is not None \
+                    and interface_set.cv is self.orderparameter \
+                    and interface_set.classifies_cv_values:
+                # reuse the CV values instead of evaluating each interface
+                indices = interface_set.indices_from_cv_values(lambda_traj)
+                max_interface = int(max(indices))
         else:
             min_lambda = None
             max_lambda = None
 
-        return {
+        if max_interface is None and interface_set is not None:
+            max_interface = int(max(
+                interface_set.interface_indices(trajectory)
+            ))
+
+        summary = {
             'initial_state': initial_state_i,
             'final_state': final_state_i,
             'max_lambda': max_lambda,
             'min_lambda': min_lambda
         }
+        if interface_set is not None:
+            # the trajectory has left all interfaces with lower index (see
+            # InterfaceSet.interface_indices)
+            summary['max_interface'] = max_interface
+
+        return summary
 
     def trajectory_summary_str(self, trajectory):
         summ = self.trajectory_summary(trajectory)
@@ -0,0 +1,198 @@
+"""
+Append-only binary files for array data, stored next to a database.
+
+The database keeps only a reference to the location of each array, and
+arrays are read back through memory maps. See
+:class:`.SQLStorageBackend` (``array_sidecar=True``) for usage.
+"""
+import os
+import shutil
+
+import numpy as np
+
+
+class ArrayReference(object):
+    """Location of an array in the sidecar files.
+
+    Parameters
+    ----------
+    chunk : int
+        number of the chunk file
+    offset : int
+        position of the first byte in the chunk file
+    nbytes : int
+        number of bytes
+    """
+    def __init__(self, chunk, offset, nbytes):
+        self.chunk = chunk
+        self.offset = offset
+        self.nbytes = nbytes
+
+    def __str__(self):
+        return "{}:{}:{}".format(self.chunk, self.offset, self.nbytes)
+
+    def __eq__(self, other):
+        return (self.chunk, self.offset, self.nbytes) == \
+            (other.chunk, other.offset, other.nbytes)
+
+    def __repr__(self):
+        return "ArrayReference(" + str(self).replace(":", ", ") + ")"
+
+    @classmethod
+    def from_string(cls, string):
+        return cls(*(int(val) for val in string.split(":")))
+
+
+class ArraySidecar(object):
+    """Append-only, chunked binary files holding arrays.
+
+    Each key (typically ``table.column``) has its own series of chunk
+    files. Arrays are appended as raw bytes and never split between
+    chunks; a new chunk is started when the current one would grow beyond
+    ``chunk_size``. Arrays appended together are contiguous.
+
+    Parameters
+    ----------
+    directory : str
+        directory for the chunk files; created if needed
+    mode : 'r', 'w', or 'a'
+        file mode; 'w' removes existing chunk files
+    chunk_size : int
+        maximum size of a chunk file in bytes (unless a single array is
+        larger)
+    """
+    def __init__(self, directory, mode='r', chunk_size=2**30):
+        self.directory = directory
+        self.mode = mode
+        self.chunk_size = chunk_size
+        if mode == 'w' and os.path.exists(directory):
+            shutil.rmtree(directory)
+        if mode != 'r':
+            os.makedirs(directory, exist_ok=True)
+        self._memmaps = {}
+
+    def _filename(self, key, chunk):
+        return os.path.join(self.directory,
+                            "{}.{:04d}.bin".format(key, chunk))
+
+    def _last_chunk(self, key):
+        chunk = 0
+        while os.path.exists(self._filename(key, chunk + 1)):
+            chunk += 1
+        return chunk
+
+    def append(self, key, data_list):
+        """Append arrays (as bytes) to the files for ``key``.
+
+        Parameters
+        ----------
+        key : str
+            name of the array series
+        data_list : list of bytes
+            the data to append
+
+        Returns
+        -------
+        list of :class:`.ArrayReference`
+            where each item was written
+        """
+        if self.mode == 'r':
+            raise RuntimeError("Can't write to sidecar in read mode")
+        chunk = self._last_chunk(key)
+        filename = self._filename(key, chunk)
+        references = []
+        out = open(filename, 'ab')
+        try:
+            offset = out.tell()
+            for data in data_list:
+                nbytes = len(data)
+                if offset > 0 and offset + nbytes > self.chunk_size:
+                    out.close()
+                    chunk += 1
+                    out = open(self._filename(key, chunk), 'ab')
+                    offset = 0
+                out.write(data)
+                references.append(ArrayReference(chunk, offset, nbytes))
+                offset += nbytes
+        finally:
+            out.close()
+        return references
+
+    def _memmap(self, key, chunk, end):
+        filename = self._filename(key, chunk)
+        memmap = self._memmaps.get(filename)
+        if memmap is None or len(memmap) < end:
+            # the file might have grown since we mapped it
+            memmap = np.memmap(filename, dtype=np.uint8, mode='r')
+            self._memmaps[filename] = memmap
+        return memmap
+
+    def read(self, key, reference):
+        """Memory-mapped bytes of a single array.
+
+        Parameters
+        ----------
+        key : str
+            name of the array series
+        reference : :class:`.ArrayReference`
+            where the array was written
+
+        Returns
+        -------
+        memoryview
+            the bytes of the array (without copying)
+        """
+        end = reference.offset + reference.nbytes
+        memmap = self._memmap(key, reference.chunk, end)
+        return memoryview(memmap[reference.offset:end])
+
+    def read_arrays(self, key, references, dtype, shape):
+        """Several arrays of the same dtype and shape as one array.
+
+        If the arrays are stored contiguously (as for arrays appended
+        together), the result is a view of the memory map; otherwise the
+        arrays are copied into a new array.
+
+        Parameters
+        ----------
+        key : str
+            name of the array series
+        references : list of :class:`.ArrayReference`
+            where the arrays were written
+        dtype : np.dtype
+            dtype of each array
+        shape : tuple
+            shape of each array
+
+        Returns
+        -------
+        np.ndarray
+            array with shape ``(len(references),) + shape``
+        """
+        dtype = np.dtype(dtype)
+        nbytes = dtype.itemsize * int(np.prod(shape))
+        full_shape = (len(references),) + tuple(shape)
+        if not references:
+            return np.empty(full_shape, dtype=dtype)
+
+        if any(ref.nbytes != nbytes for ref in references):
+            raise ValueError("Stored arrays don't match dtype and shape")
+
+        first = references[0]
+        is_contiguous = all(
+            ref.chunk == first.chunk
+            and ref.offset == first.offset + i * nbytes
+            for i, ref in enumerate(references)
+        )
+        if is_contiguous:
+            end = first.offset + len(references) * nbytes
+            memmap = self._memmap(key, first.chunk, end)
+            return memmap[first.offset:end].view(dtype).reshape(full_shape)
+
+        return np.stack([
+            np.frombuffer(self.read(key, ref), dtype=dtype).reshape(shape)
+            for ref in references
+        ])
+
+    def close(self):
+        self._memmaps = {}
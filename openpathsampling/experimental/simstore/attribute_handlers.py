@@ -1,4 +1,8 @@
-from .my_types import parse_ndarray_type
+import lzma
+import re
+import zlib
+
+from .my_types import parse_ndarray_type, ndarray_re
 import numpy as np
 
 
@@ -117,28 +121,222 @@ class JSONObjHandler(StandardHandler):
         pass
 
 
+class ArrayCodec(object):
+    """Abstract encoding step for arrays stored by :class:`.NDArrayHandler`.
+
+    Codecs are selected by appending them to the ndarray type string in the
+    schema, separated by ``|``, e.g., ``ndarray.float32(1000,3)|zlib`` or
+    ``ndarray.float32(1000,3)|quantize(0.001)|zlib``. They are applied in
+    that order when writing, and in reverse order when reading. Since the
+    type string is part of the stored schema, files remain readable without
+    knowing the codec in advance.
+
+    Parameters
+    ----------
+    arg : str or None
+        the argument given in parentheses in the type string, if any
+    """
+    name = None
+
+    def __init__(self, arg=None):
+        self.arg = arg
+
+    def encoded_dtype(self, dtype):
+        """dtype of the array returned by :meth:`.encode`"""
+        return dtype
+
+    def encode(self, arr):
+        """Encode an array.
+
+        Parameters
+        ----------
+        arr : np.ndarray
+            input array
+
+        Returns
+        -------
+        np.ndarray :
+            encoded array, with dtype given by :meth:`.encoded_dtype`
+        """
+        raise NotImplementedError()
+
+    def decode(self, arr, dtype):
+        """Decode an array.
+
+        Parameters
+        ----------
+        arr : np.ndarray
+            encoded array
+        dtype : np.dtype
+            dtype of the array before encoding
+
+        Returns
+        -------
+        np.ndarray :
+            flattened decoded array
+        """
+        raise NotImplementedError()
+
+
+class QuantizeCodec(ArrayCodec):
+    """Lossy fixed-precision storage of floats as 32-bit integers.
+
+    The argument is the precision, e.g., ``quantize(0.001)`` keeps
+    coordinates in nm to 1e-3 nm as in XTC files. This is most useful
+    followed by a compression codec.
+    """
+    name = 'quantize'
+
+    def __init__(self, arg=None):
+        super().__init__(arg)
+        if arg is None:
+            raise ValueError("quantize codec requires a precision")
+        self.precision = float(arg)
+
+    def encoded_dtype(self, dtype):
+        return np.dtype(np.int32)
+
+    def encode(self, arr):
+        quantized = np.rint(arr / self.precision)
+        limit = np.iinfo(np.int32).max
+        if quantized.size and np.abs(quantized).max() > limit:
+            raise ValueError("Values too large to quantize with precision "
+                             + str(self.precision))
+        return quantized.astype(np.int32)
+
+    def decode(self, arr, dtype):
+        return (arr * self.precision).astype(dtype)
+
+
+class _CompressionCodec(ArrayCodec):
+    # bytes of each array item are shuffled so that bytes of equal
+    # significance are adjacent, which compresses much better for floats
+    def _compress(self, data):
+        raise NotImplementedError()
+
+    def _decompress(self, data):
+        raise NotImplementedError()
+
+    def encoded_dtype(self, dtype):
+        return np.dtype(np.uint8)
+
+    def encode(self, arr):
+        arr = np.ascontiguousarray(arr)
+        shuffled = arr.view(np.uint8).reshape(-1, arr.itemsize).T
+        compressed = self._compress(shuffled.tobytes())
+        return np.frombuffer(compressed, dtype=np.uint8)
+
+    def decode(self, arr, dtype):
+        dtype = np.dtype(dtype)
+        raw = np.frombuffer(self._decompress(arr.tobytes()), dtype=np.uint8)
+        unshuffled = raw.reshape(dtype.itemsize, -1).T
+        return np.ascontiguousarray(unshuffled).view(dtype).ravel()
+
+
+class ZlibCodec(_CompressionCodec):
+    """Lossless zlib compression; optional argument is the level (0-9)"""
+    name = 'zlib'
+
+    def __init__(self, arg=None):
+        super().__init__(arg)
+        self.level = 6 if arg is None else int(arg)
+
+    def _compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def _decompress(self, data):
+        return zlib.decompress(data)
+
+
+class LZMACodec(_CompressionCodec):
+    """Lossless LZMA compression; optional argument is the preset (0-9)"""
+    name = 'lzma'
+
+    def __init__(self, arg=None):
+        super().__init__(arg)
+        self.preset = None if arg is None else int(arg)
+
+    def _compress(self, data):
+        return lzma.compress(data, preset=self.preset)
+
+    def _decompress(self, data):
+        return lzma.decompress(data)
+
+
+ARRAY_CODECS = {codec.name: codec
+                for codec in [QuantizeCodec, ZlibCodec, LZMACodec]}
+
+_array_codec_re = re.compile(r"(?P<name>[a-z0-9_]+)(\((?P<arg>[^)]*)\))?$")
+
+
+def parse_array_codecs(codec_str):
+    """Create the array codecs from the type string suffix.
+
+    Parameters
+    ----------
+    codec_str : str
+        the part of the type string after the ndarray type; either empty or
+        codecs each preceded by ``|``
+
+    Returns
+    -------
+    list of :class:`.ArrayCodec`
+    """
+    if not codec_str:
+        return []
+    if not codec_str.startswith('|'):
+        raise ValueError("Unable to parse array codecs: " + codec_str)
+    codecs = []
+    for entry in codec_str[1:].split('|'):
+        match = _array_codec_re.match(entry.strip())
+        if not match or match.group('name') not in ARRAY_CODECS:
+            raise ValueError("Unknown array codec: " + entry)
+        codec_cls = ARRAY_CODECS[match.group('name')]
+        codecs.append(codec_cls(match.group('arg')))
+    return codecs
+
+
 class NDArrayHandler(AttributeHandler):
     """Attribute handler for NumPy ndarrays.
 
     Parameters
     ----------
     type_info: Tuple
-        dtype and shape of the array
+        dtype and shape of the array, optionally followed by a string
+        of array codecs (see :class:`.ArrayCodec`)
     """
     def __init__(self, type_info):
         super().__init__(type_info)
-        self.dtype, self.shape = type_info
+        self.dtype, self.shape = type_info[:2]
+        codec_str = type_info[2] if len(type_info) > 2 else ""
+        self.codecs = parse_array_codecs(codec_str)
         self.backend_type = 'ndarray'
         self.type_size = None  # TODO: change this based on dtype/shape
 
+        # dtype before each codec is applied, and as stored
+        self._dtypes = [np.dtype(self.dtype)]
+        for codec in self.codecs:
+            self._dtypes.append(codec.encoded_dtype(self._dtypes[-1]))
+
     @classmethod
     def is_my_type(cls, type_str):
-        return parse_ndarray_type(type_str)
+        type_info = parse_ndarray_type(type_str)
+        if type_info:
+            codec_str = type_str[ndarray_re.match(type_str).end():]
+            if codec_str:
+                type_info += (codec_str,)
+        return type_info
 
     def serialize(self, obj):
-        return obj.astype(dtype=self.dtype, copy=False).tobytes()
+        data = obj.astype(dtype=self.dtype, copy=False)
+        for codec in self.codecs:
+            data = codec.encode(data)
+        return data.tobytes()
 
     def deserialize(self, data, caches=None):
-        return np.frombuffer(data, dtype=self.dtype).reshape(self.shape)
+        data = np.frombuffer(data, dtype=self._dtypes[-1])
+        for codec, dtype in reversed(list(zip(self.codecs, self._dtypes))):
+            data = codec.decode(data, dtype)
+        return data.reshape(self.shape)
 
 DEFAULT_HANDLERS = [NDArrayHandler, StandardHandler]
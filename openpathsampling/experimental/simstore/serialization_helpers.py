@@ -101,7 +101,8 @@ def default_find_uuids(obj, cache_list):
 
 # NOTE: this needs find everything, including if the iterable/mapping has a
 # UUID, find that and things under it
-def get_all_uuids(initial_object, known_uuids=None, class_info=None):
+def get_all_uuids(initial_object, known_uuids=None, class_info=None,
+                  stored_uuids=None):
     """Find all UUID objects (to be stored)
 
     This searches through an initial object, finding *all* nested objects
@@ -116,6 +117,12 @@ def get_all_uuids(initial_object, known_uuids=None, class_info=None):
         because they have already been searched and any object beneath them
         in the search tree also also already known
     class_info : :class:`.SerializationSchema`
+    stored_uuids : Container[str]
+        UUIDs of objects that have already been saved, along with
+        everything they contain. The search does not enter these objects
+        (other than the initial object), and they are not included in the
+        results. This keeps the cost of saving proportional to the number
+        of new objects.
 
     Returns
     -------
@@ -123,31 +130,35 @@ def get_all_uuids(initial_object, known_uuids=None, class_info=None):
         objects found in the search
     """
     known_uuids = tools.none_to_default(known_uuids, {})
+    stored_uuids = tools.none_to_default(stored_uuids, set())
     objects = [initial_object]
     uuids = {}
-    # found_objs = collections.Counter()
+    # find_uuids for classes without special lookups; cached to avoid
+    # repeating the class lookup for every object
+    finders = {}
     while objects:
         new_objects = []
         objects = unique_objects(objects)
-        # print objects
-        # found_objs += collections.Counter(o.__class__.__name__)
-                                          # for o in objects)
         for obj in objects:
-            # TODO: this might be slow; check performance
+            if has_uuid(obj) and obj is not initial_object:
+                uuid = get_uuid(obj)
+                if uuid in uuids or uuid in stored_uuids:
+                    continue
+
             if isinstance(obj, GenericLazyLoader):
                 obj = obj.load()
 
-            # TODO: find a way to ensure that objects doesn't go over
-            # duplicates here; see lprofile of default_find_uuids to see how
-            # often abort due to being in cache in there, and whether we
-            # should move the skip in here instead (how expensive is
-            # info_from_instance?)
-            info = class_info.info_from_instance(obj) \
-                    if class_info else None
-            if info and info.find_uuids is not None:
-                find_uuids = info.find_uuids
-            else:
-                find_uuids = default_find_uuids
+            find_uuids = finders.get(obj.__class__, None)
+            if find_uuids is None:
+                info = class_info.info_from_instance(obj) \
+                        if class_info else None
+                if info and info.find_uuids is not None:
+                    find_uuids = info.find_uuids
+                else:
+                    find_uuids = default_find_uuids
+
+                if class_info is None or not class_info.is_special(obj):
+                    finders[obj.__class__] = find_uuids
 
             new_uuids, new_objs = find_uuids(obj=obj,
                                              cache_list=[uuids, known_uuids])
@@ -156,7 +167,6 @@ def get_all_uuids(initial_object, known_uuids=None, class_info=None):
             new_objects.extend(new_objs)
 
         objects = new_objects
-    # print(found_objs)
     return uuids
 
 
@@ -1,4 +1,5 @@
 import os
+import re
 import warnings
 import collections
 from collections import abc
@@ -10,7 +11,9 @@ from . import tools
 import json
 
 from .backend import extract_backend_metadata
-from .my_types import backend_registration_type
+from .my_types import backend_registration_type, parse_ndarray_type
+from .my_types import ndarray_re
+from .array_sidecar import ArraySidecar, ArrayReference
 from .serialization_helpers import import_class
 
 import logging
@@ -92,6 +95,18 @@ class SQLStorageBackend(StorableNamedObject):
         databases, but keeps the interface consistent
     sql_dialect : str
         name of the SQL dialect to use; default is sqlite
+    sqlite_pragmas : dict
+        SQLite settings applied to every connection, mapping the PRAGMA
+        name to its value, e.g., ``{'journal_mode': 'WAL', 'synchronous':
+        'NORMAL', 'cache_size': -64000}`` for faster writes to a local file.
+        See https://www.sqlite.org/pragma.html. Only for the sqlite dialect.
+    array_sidecar : bool
+        if True, ndarray columns are written to append-only binary files in
+        the directory ``filename + '.arrays'``, and the database only keeps
+        their location. Arrays are then loaded from memory maps, and
+        :meth:`.load_sidecar_arrays` can load the arrays of many rows as a
+        single view. Only used in mode 'w'; when opening an existing file,
+        this is determined by the file.
 
     Additional keyword arguments are passed to sqlalchemy.create_engine. Of
     particular use is ``echo`` (bool) which echos SQL commands to stdout
@@ -100,10 +115,16 @@ class SQLStorageBackend(StorableNamedObject):
     More info: https://docs.sqlalchemy.org/en/latest/core/engines.html
     """
     MAX_SQL_ITEMS = 900
-    def __init__(self, filename, mode='r', sql_dialect='sqlite', **kwargs):
+    def __init__(self, filename, mode='r', sql_dialect='sqlite',
+                 sqlite_pragmas=None, array_sidecar=False, **kwargs):
         super().__init__()
         self.filename = filename
         self.sql_dialect = sql_dialect
+        if sqlite_pragmas is None:
+            sqlite_pragmas = {}
+        self._check_sqlite_pragmas(sqlite_pragmas, sql_dialect)
+        self.sqlite_pragmas = sqlite_pragmas
+        self.array_sidecar = array_sidecar
         self.mode = mode
         self.kwargs = kwargs
         self.debug = False
@@ -127,6 +148,11 @@ class SQLStorageBackend(StorableNamedObject):
         # TODO: change this to an LRU cache
         self.known_uuids = collections.defaultdict(set)
 
+        # set up in _initialize_with_mode if arrays go in sidecar files
+        self.sidecar = None
+        self.sidecar_columns = {}
+        self._sidecar_row_types = {}
+
         # we prevent writes by disallowing write method in read mode;
         # for everything else; just connect to the database
         self.engine = None
@@ -154,8 +180,31 @@ class SQLStorageBackend(StorableNamedObject):
             self._initialize_from_engine(engine)
             self.mode = mode  # in case we changed when checking existence
 
+    _PRAGMA_RE = re.compile(r'^[A-Za-z_]+$')
+    _PRAGMA_VALUE_RE = re.compile(r'^-?[A-Za-z0-9_]+$')
+
+    @classmethod
+    def _check_sqlite_pragmas(cls, sqlite_pragmas, sql_dialect):
+        if sqlite_pragmas and sql_dialect != 'sqlite':
+            raise ValueError("SQLite pragmas can't be used with dialect "
+                             + str(sql_dialect))
+        for name, value in sqlite_pragmas.items():
+            # these go into the statement as is, so only allow simple ones
+            if not (cls._PRAGMA_RE.match(name)
+                    and cls._PRAGMA_VALUE_RE.match(str(value))):
+                raise ValueError("Invalid SQLite pragma: "
+                                 + "{}={}".format(name, value))
+
+    def _set_sqlite_pragmas(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in self.sqlite_pragmas.items():
+            cursor.execute("PRAGMA {}={}".format(name, value))
+        cursor.close()
+
     def _initialize_from_engine(self, engine):
         self.engine = engine
+        if self.sqlite_pragmas:
+            sql.event.listen(engine, 'connect', self._set_sqlite_pragmas)
         self._metadata = sql.MetaData()
         self._initialize_with_mode(self.mode)
 
@@ -172,6 +221,8 @@ class SQLStorageBackend(StorableNamedObject):
             'sql_dialect': self.sql_dialect,
             'mode': 'a' if self.mode == 'w' else self.mode,
             'connection_uri': self.connection_uri,
+            'sqlite_pragmas': self.sqlite_pragmas,
+            'array_sidecar': self.array_sidecar,
             'kwargs': self.kwargs,
         }
 
@@ -208,6 +259,9 @@ class SQLStorageBackend(StorableNamedObject):
             uuid_table = self.metadata.tables['uuid']
             index = sql.Index('uuids_index', *uuid_table.c, unique=True)
             index.create(self.engine)
+            if self.array_sidecar:
+                self._add_metadata('array_sidecar', 'true')
+                self._initialize_sidecar(mode)
 
         elif mode == "r" or mode == "a":
             self.metadata.reflect(self.engine)
@@ -216,6 +270,61 @@ class SQLStorageBackend(StorableNamedObject):
                     self.internal_tables_from_db()
 
             self.sfr_result_types.update(self._load_sfr_types())
+            metadata = self._load_metadata()
+            self.array_sidecar = metadata.get('array_sidecar') == 'true'
+            if self.array_sidecar:
+                self.sidecar_columns = {
+                    key[len('sidecar:'):]: json.loads(value)
+                    for key, value in metadata.items()
+                    if key.startswith('sidecar:')
+                }
+                self._initialize_sidecar(mode)
+
+    def _initialize_sidecar(self, mode):
+        if self.filename is None or self.filename == ":memory:":
+            raise ValueError("Array sidecar files require a database file")
+        self.sidecar = ArraySidecar(str(self.filename) + ".arrays", mode)
+
+    def _add_metadata(self, key, value):
+        metadata_table = self.metadata.tables['metadata']
+        with self.engine.begin() as conn:
+            conn.execute(metadata_table.insert().values(key=key,
+                                                        value=value))
+
+    def _load_metadata(self):
+        metadata_table = self.metadata.tables['metadata']
+        with self.engine.connect() as conn:
+            rows = list(conn.execute(metadata_table.select()))
+        return {row.key: row.value for row in rows}
+
+    def _is_array_type(self, type_name):
+        backend_type = self.known_types.get(
+            type_name, (backend_registration_type(type_name), None)
+        )[0]
+        return backend_type == 'ndarray'
+
+    def _resolve_sidecar(self, table_name, rows):
+        # replace sidecar references in rows with the (memory-mapped) data
+        columns = self.sidecar_columns.get(table_name)
+        if not columns or not rows:
+            return rows
+
+        row_type = self._sidecar_row_types.get(table_name)
+        if row_type is None:
+            row_type = collections.namedtuple(table_name + "_row",
+                                              rows[0]._fields)
+            self._sidecar_row_types[table_name] = row_type
+
+        resolved = []
+        for row in rows:
+            dct = row._asdict()
+            for col in columns:
+                if dct[col] is not None:
+                    ref = ArrayReference.from_string(dct[col])
+                    dct[col] = self.sidecar.read(table_name + "." + col,
+                                                 ref)
+            resolved.append(row_type(**dct))
+        return resolved
 
     def _load_sfr_types(self):
         try:
@@ -253,6 +362,8 @@ class SQLStorageBackend(StorableNamedObject):
     def close(self):
         # is this necessary?
         self.engine.dispose()
+        if self.sidecar is not None:
+            self.sidecar.close()
 
     @property
     def metadata(self):
@@ -322,7 +433,7 @@ class SQLStorageBackend(StorableNamedObject):
                 sel = table.select().where(or_stmt)
                 results.extend(list(conn.execute(sel)))
 
-        return results
+        return self._resolve_sidecar(table_name, results)
 
     ### FROM HERE IS THE GENERIC PUBLIC API
     def register_type(self, type_str, backend_type):
@@ -341,8 +452,23 @@ class SQLStorageBackend(StorableNamedObject):
         """
         for table_name in schema:
             logger.info("Add schema table " + str(table_name))
+            backend_types = self.known_types
+            if self.sidecar is not None and table_name not in universal_schema:
+                # array columns only hold the location in the sidecar
+                array_cols = [(col, type_name)
+                              for (col, type_name) in schema[table_name]
+                              if self._is_array_type(type_name)]
+                backend_types = dict(self.known_types)
+                backend_types.update({type_name: ('str', None)
+                                      for (_, type_name) in array_cols})
+                if array_cols:
+                    col_names = [col for (col, _) in array_cols]
+                    self.sidecar_columns[table_name] = col_names
+                    self._add_metadata('sidecar:' + table_name,
+                                       json.dumps(col_names))
+
             columns = make_columns(table_name, schema, sql_schema_metadata,
-                                   self.known_types)
+                                   backend_types)
             try:
                 table = sql.Table(table_name, self.metadata, *columns)
             except sql.exc.InvalidRequestError:
@@ -430,6 +556,38 @@ class SQLStorageBackend(StorableNamedObject):
         # update the cache
         self.known_uuids[table_name].update(set_uuids)
 
+    def _select_by_uuids(self, table, uuids):
+        """Select the rows of ``table`` with the given UUIDs.
+
+        Small requests use ``IN`` clauses; large requests (such as all the
+        snapshots of several trajectories) insert the UUIDs into a
+        temporary table and load everything with a single join, instead of
+        one query per block of ``MAX_SQL_ITEMS`` UUIDs.
+        """
+        uuids = set(uuids)
+        if len(uuids) <= self.MAX_SQL_ITEMS:
+            if not uuids:
+                return []
+            uuid_sel = table.select().where(table.c.uuid.in_(uuids))
+            with self.engine.connect() as conn:
+                return conn.execute(uuid_sel).fetchall()
+
+        tmp_table = sql.Table('_uuid_selection', sql.MetaData(),
+                              sql.Column('uuid', sql.String,
+                                         primary_key=True),
+                              prefixes=['TEMPORARY'])
+        uuid_sel = table.select().join(tmp_table,
+                                       table.c.uuid == tmp_table.c.uuid)
+        with self.engine.begin() as conn:
+            tmp_table.create(conn)
+            try:
+                conn.execute(tmp_table.insert(),
+                             [{'uuid': uuid} for uuid in uuids])
+                results = conn.execute(uuid_sel).fetchall()
+            finally:
+                tmp_table.drop(conn)
+        return results
+
     def load_storable_function_results(self, table_name, uuids):
         """Load results for given stored function and input UUIDs.
 
@@ -446,22 +604,13 @@ class SQLStorageBackend(StorableNamedObject):
             mapping of UUID to associated value
         """
         table = self.metadata.tables[table_name]
-        results = []
         result_type = self.sfr_result_types.get(table_name, None)
         try:
             deserialize = self.serialization[result_type].deserialize
         except KeyError:
             # TODO: this should be removed eventually
             deserialize = lambda x: x
-        for uuid_block in tools.block(uuids, self.MAX_SQL_ITEMS):
-            # uuid_sel = table.select(
-                # sql.exists().where(table.c.uuid.in_(uuid_block))
-            # )
-            uuid_sel = table.select().where(table.c.uuid.in_(uuid_block))
-            with self.engine.connect() as conn:
-                res = conn.execute(uuid_sel)
-                res = res.fetchall()
-            results += res
+        results = self._select_by_uuids(table, uuids)
 
         logger.debug("Found {} UUIDs".format(len(results)))
         result_dict = {uuid: deserialize(value) for uuid, value in results}
@@ -495,33 +644,40 @@ class SQLStorageBackend(StorableNamedObject):
         objects : list of dict
             dict representation of the objects to be added
         """
+        if not objects:
+            return
+
         # this will insert objects into the table
         table = self.metadata.tables[table_name]
         table_num = self.table_to_number[table_name]
+        uuid_table = self.metadata.tables['uuid']
 
-        # this is if we don't use the UUID in the schema... but doing so
-        # would be another option (redundant data, but better sanity checks)
-
+        # we assign row indices ourselves, so that the object rows and the
+        # uuid rows can be written in a single transaction without reading
+        # back what we just inserted
+        rows = [dict(obj) for obj in objects]
+        for col in self.sidecar_columns.get(table_name, []):
+            to_write = [row for row in rows if row[col] is not None]
+            refs = self.sidecar.append(table_name + "." + col,
+                                       [row[col] for row in to_write])
+            for row, ref in zip(to_write, refs):
+                row[col] = str(ref)
+
+        max_idx = sql.select(sql.func.max(table.c.idx))
         with self.engine.begin() as conn:
-            conn.execute(table.insert(), objects)
-
-        res = []
-        uuids = [obj['uuid'] for obj in objects]
-        for uuid_block in tools.block(uuids, self.MAX_SQL_ITEMS):
-            sel_uuids_idx = sql.select(table.c.uuid, table.c.idx).\
-                    where(table.c.uuid.in_(uuid_block))
-            with self.engine.begin() as conn:
-                res += list(conn.execute(sel_uuids_idx))
-
-        uuid_to_rows = {r[0]: r[1] for r in res}
+            last_idx = conn.execute(max_idx).scalar()
+            if last_idx is None:
+                last_idx = 0  # SQL counts from 1
 
+            for idx, row in enumerate(rows, start=last_idx + 1):
+                row['idx'] = idx
+            # for a duplicated UUID, the last row is the one we find
+            uuid_to_rows = {row['uuid']: row['idx'] for row in rows}
+            uuid_insert_dicts = [{'uuid': k, 'table': table_num, 'row': v}
+                                 for (k, v) in uuid_to_rows.items()]
 
-        uuid_table = self.metadata.tables['uuid']
-        uuid_insert_dicts = [{'uuid': k, 'table': table_num, 'row':v}
-                             for (k, v) in uuid_to_rows.items()]
-
-        with self.engine.begin() as conn:
             # here we use executemany for performance
+            conn.execute(table.insert(), rows)
             conn.execute(uuid_table.insert(), uuid_insert_dicts)
 
     def load_n_rows_from_table(self, table_name, first_row, n_rows):
@@ -584,6 +740,54 @@ class SQLStorageBackend(StorableNamedObject):
             assert set(input_uuids) == set(loaded_uuids)  # sanity check
         return loaded_results
 
+    def load_sidecar_arrays(self, table_name, column, uuids):
+        """Load an array column for several objects as a single array.
+
+        Requires ``array_sidecar`` mode, and an ndarray column without
+        array codecs. If the arrays were saved together (e.g., the
+        snapshots of a trajectory saved at once), the result is a view of
+        the memory-mapped sidecar file, so no data is copied.
+
+        Parameters
+        ----------
+        table_name : str
+            name of the table
+        column : str
+            name of the ndarray column
+        uuids : list of str
+            UUIDs of the objects, in the order to return the arrays
+
+        Returns
+        -------
+        np.ndarray
+            array with shape ``(len(uuids),) + shape`` of the column
+        """
+        if column not in self.sidecar_columns.get(table_name, []):
+            raise ValueError("Column {} of table {} is not stored in the "
+                             "array sidecar".format(column, table_name))
+        type_name = dict(self.schema[table_name])[column]
+        array_info = parse_ndarray_type(type_name)
+        if not array_info or ndarray_re.match(type_name).end() \
+                != len(type_name):
+            raise ValueError("Can only load arrays without codecs: "
+                             + type_name)
+
+        table = self.metadata.tables[table_name]
+        col = table.c[column]
+        ref_strings = {}
+        with self.engine.connect() as conn:
+            for uuid_block in tools.block(uuids, self.MAX_SQL_ITEMS):
+                sel = sql.select(table.c.uuid, col).\
+                        where(table.c.uuid.in_(uuid_block))
+                ref_strings.update({row[0]: row[1]
+                                    for row in conn.execute(sel)})
+
+        references = [ArrayReference.from_string(ref_strings[uuid])
+                      for uuid in uuids]
+        (dtype, shape) = array_info
+        return self.sidecar.read_arrays(table_name + "." + column,
+                                        references, dtype, shape)
+
     def database_schema(self):
         """Reload the schema as stored in the database.
 
@@ -626,6 +830,9 @@ class SQLStorageBackend(StorableNamedObject):
             results = conn.execute(table.select())
             representative = results.fetchone()
             results.close()
+        if representative is not None:
+            representative = self._resolve_sidecar(table_name,
+                                                   [representative])[0]
         return representative
 
     @property
@@ -653,7 +860,7 @@ class SQLStorageBackend(StorableNamedObject):
         table = self.metadata.tables[table_name]
         with self.engine.connect() as conn:
             results = list(conn.execute(table.select()))
-        for row in results:
+        for row in self._resolve_sidecar(table_name, results):
             yield row
 
     def table_len(self, table_name):
@@ -677,6 +884,7 @@ class SQLStorageBackend(StorableNamedObject):
         item_sel = table.select().where(table.c.idx == item + 1)
         with self.engine.connect() as conn:
             results = list(conn.execute(item_sel))
+        results = self._resolve_sidecar(table_name, results)
 
         if self.debug:
             assert len(results) == 1
@@ -361,15 +361,39 @@ class StorableFunction(StorableNamedObject):
 
         return obj
 
-    def preload_cache(self, storage=None):
+    def preload_cache(self, storage=None, uuids=None):
+        """Load stored results into the local cache.
+
+        Parameters
+        ----------
+        storage : :class:`.GeneralStorage`
+            storage to load from; default (None) uses all storages this
+            function is attached to
+        uuids : Iterable[str]
+            UUIDs of the inputs to load results for; default (None) loads
+            all stored results. Results for many inputs are loaded in a
+            single query, so this is much faster than loading them as they
+            are needed.
+        """
         if storage is None:
             storages = [h.storage for h in self._handlers]
         else:
             storages = [storage]
 
         uuid = get_uuid(self)
+        if uuids is not None:
+            uuids = set(uuids) - set(self.local_cache.result_dict)
+
         for storage in storages:
-            cache = storage.backend.load_storable_function_table(uuid)
+            if uuids is None:
+                cache = storage.backend.load_storable_function_table(uuid)
+            elif not uuids:
+                break
+            else:
+                cache = storage.backend.load_storable_function_results(
+                    uuid, uuids
+                )
+                uuids -= set(cache)
             self.local_cache.cache_results(cache)
 
     def is_scalar(self, item):
@@ -52,7 +52,8 @@ from openpathsampling.netcdfplus import StorableNamedObject
 class GeneralStorage(StorableNamedObject):
     _known_storages = {}
     def __init__(self, backend, class_info, schema=None,
-                 simulation_classes=None, fallbacks=None, safemode=False):
+                 simulation_classes=None, fallbacks=None, safemode=False,
+                 shared=False):
         super().__init__()
         GeneralStorage._known_storages[backend.identifier] = self
         self.backend = backend
@@ -83,6 +84,7 @@ class GeneralStorage(StorableNamedObject):
             self.schema = backend.schema
         self.cache = MixedCache({})  # initial empty cache so it exists
         self.initialize_with_mode(self.mode)
+        self._uuid_index = self._make_uuid_index(shared)
         self.tags = TagsTable(self)
         self._simulation_objects = self._cache_simulation_objects()
         self.cache = MixedCache(self._simulation_objects)
@@ -122,6 +124,18 @@ class GeneralStorage(StorableNamedObject):
         elif mode == 'w':
             self.register_schema(self.schema, class_info_list=[])
 
+    def _make_uuid_index(self, shared):
+        # in read mode, nothing is saved, so we don't need the UUIDs
+        if self.mode == 'r':
+            return UUIDIndex(complete=False)
+
+        if self.mode == 'a':
+            uuids = (row.uuid for row in self.backend.table_iterator('uuid'))
+        else:
+            uuids = []
+
+        return UUIDIndex(uuids, complete=not shared)
+
     def _load_missing_info_tables(self, table_to_class):
         missing_info_tables = [tbl for tbl in self.schema
                                if tbl not in self.class_info.tables]
@@ -194,10 +208,16 @@ class GeneralStorage(StorableNamedObject):
                 lookup_examples |= {lookup}
 
     def filter_existing_uuids(self, uuid_dict):
-        existing = self.backend.load_uuids_table(
-            uuids=list(uuid_dict.keys()),
-            ignore_missing=True
-        )
+        existing = [uuid for uuid in uuid_dict if uuid in self._uuid_index]
+        if not self._uuid_index.complete:
+            # someone else might have saved the UUIDs we don't know
+            unknown = [uuid for uuid in uuid_dict
+                       if uuid not in self._uuid_index]
+            found = [uuid_row.uuid for uuid_row in
+                     self.backend.load_uuids_table(uuids=unknown,
+                                                   ignore_missing=True)]
+            self._uuid_index.update(found)
+            existing.extend(found)
 
         # "special" here indicates that we always try to re-save these, even
         # if they've already been saved once. This is (currently) necessary
@@ -206,20 +226,21 @@ class GeneralStorage(StorableNamedObject):
         # TODO: make `special` customizable
         special = set(self._sf_handler.canonical_functions.keys())
 
-        for uuid_row in existing:
-            uuid = uuid_row.uuid
+        for uuid in existing:
             if uuid not in special:
-                del uuid_dict[uuid_row.uuid]
+                del uuid_dict[uuid]
 
         return uuid_dict
 
-    def _uuids_by_table(self, input_uuids, cache, get_table_name):
+    def _uuids_by_table(self, input_uuids, cache, get_table_name,
+                        stored_uuids=None):
         # find all UUIDs we need to save with this object
         logger.debug("Listing all objects to save")
         uuids = {}
         for uuid, obj in input_uuids.items():
             uuids.update(get_all_uuids(obj, known_uuids=cache,
-                                       class_info=self.class_info))
+                                       class_info=self.class_info,
+                                       stored_uuids=stored_uuids))
 
         logger.debug("Found %d objects" % len(uuids))
         logger.debug("Deproxying proxy objects")
@@ -239,6 +260,9 @@ class GeneralStorage(StorableNamedObject):
         lazies = [uuid for uuid, obj in uuid_mapping.items()
                   if isinstance(obj, GenericLazyLoader)]
         logger.debug("Found " + str(len(lazies)) + " objects to deproxy")
+        if not lazies:
+            return uuid_mapping
+
         loaded = self.load(lazies, allow_lazy=False)
         uuid_mapping.update({get_uuid(obj): obj for obj in loaded})
         return uuid_mapping
@@ -248,6 +272,9 @@ class GeneralStorage(StorableNamedObject):
             obj_list = [obj_list]
 
         cache = self.cache if use_cache else {}
+        # anything already saved (including everything it contains) can be
+        # skipped when searching for objects to save
+        stored_uuids = self._uuid_index if use_cache else None
         # TODO: convert the whole .save process to something based on the
         # class_info.serialize method (enabling per-class approaches for
         # finding UUIDs, which will be a massive serialization speed-up
@@ -263,7 +290,8 @@ class GeneralStorage(StorableNamedObject):
         # TODO: move to function: self.register_missing(by_table)
         # TODO: convert to while?
         get_table_name = lambda uuid, obj_: self.class_info[obj_].table
-        by_table = self._uuids_by_table(input_uuids, cache, get_table_name)
+        by_table = self._uuids_by_table(input_uuids, cache, get_table_name,
+                                        stored_uuids)
         old_missing = {}
         while '__missing__' in by_table:
             # __missing__ is a special result returned by the
@@ -284,7 +312,8 @@ class GeneralStorage(StorableNamedObject):
             by_table.update(missing_by_table)
             # search for objects inside the objects we just registered
             next_by_table = self._uuids_by_table(missing, cache,
-                                                 get_table_name)
+                                                 get_table_name,
+                                                 stored_uuids)
             for table, uuid_dict in next_by_table.items():
                 by_table[table].update(uuid_dict)
             old_missing = missing
@@ -312,6 +341,7 @@ class GeneralStorage(StorableNamedObject):
             serialize = self.class_info[table].serializer
             storables_list = [serialize(o) for o in by_table[table].values()]
             self.backend.add_to_table(table, storables_list)
+            self._uuid_index.update(by_table[table].keys())
             # special handling for simulation objects
             if table == 'simulation_objects':
                 self._update_pseudo_tables(by_table[table])
@@ -512,6 +542,35 @@ class GeneralStorage(StorableNamedObject):
                                  .format(self.__class__.__name__, attr))
 
 
+class UUIDIndex(object):
+    """UUIDs known to exist in the storage backend.
+
+    This lets :meth:`.GeneralStorage.save` skip objects that are already
+    stored without a round-trip to the backend.
+
+    Parameters
+    ----------
+    uuids : Iterable[str]
+        UUIDs that are already stored
+    complete : bool
+        whether the index contains every stored UUID. This is only the case
+        if this process is the only one writing to the backend; if it is
+        not complete, unknown UUIDs must be looked up in the backend.
+    """
+    def __init__(self, uuids=None, complete=True):
+        self._uuids = set(tools.none_to_default(uuids, []))
+        self.complete = complete
+
+    def update(self, uuids):
+        self._uuids.update(uuids)
+
+    def __contains__(self, uuid):
+        return uuid in self._uuids
+
+    def __len__(self):
+        return len(self._uuids)
+
+
 class MixedCache(abc.MutableMapping):
     """Combine a frozen cache and a mutable cache"""
     # TODO: benchmark with single dict instead; might be just as fast!
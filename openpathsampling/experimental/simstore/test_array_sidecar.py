@@ -0,0 +1,78 @@
+import pytest
+import numpy as np
+
+from .array_sidecar import *
+
+
+class TestArrayReference(object):
+    def test_string_round_trip(self):
+        ref = ArrayReference(2, 480, 24)
+        assert str(ref) == "2:480:24"
+        assert ArrayReference.from_string(str(ref)) == ref
+
+
+class TestArraySidecar(object):
+    def setup_method(self):
+        self.arrays = [np.arange(6, dtype=np.float32).reshape(2, 3) + i
+                       for i in range(4)]
+        self.data = [arr.tobytes() for arr in self.arrays]
+
+    def test_append_read(self, tmpdir):
+        sidecar = ArraySidecar(str(tmpdir.join("arrays")), mode='w')
+        refs = sidecar.append('snap.xyz', self.data)
+        assert refs == [ArrayReference(0, 24 * i, 24) for i in range(4)]
+        for ref, arr in zip(refs, self.arrays):
+            loaded = np.frombuffer(sidecar.read('snap.xyz', ref),
+                                   dtype=np.float32).reshape(2, 3)
+            np.testing.assert_array_equal(loaded, arr)
+        sidecar.close()
+
+    def test_append_new_chunk(self, tmpdir):
+        sidecar = ArraySidecar(str(tmpdir.join("arrays")), mode='w',
+                               chunk_size=60)
+        refs = sidecar.append('snap.xyz', self.data[:3])
+        refs += sidecar.append('snap.xyz', self.data[3:])
+        assert [(ref.chunk, ref.offset) for ref in refs] == \
+            [(0, 0), (0, 24), (1, 0), (1, 24)]
+        loaded = sidecar.read_arrays('snap.xyz', refs, np.float32, (2, 3))
+        np.testing.assert_array_equal(loaded, np.array(self.arrays))
+
+    def test_read_arrays_contiguous_view(self, tmpdir):
+        sidecar = ArraySidecar(str(tmpdir.join("arrays")), mode='w')
+        refs = sidecar.append('snap.xyz', self.data)
+        contiguous = sidecar.read_arrays('snap.xyz', refs, np.float32,
+                                         (2, 3))
+        assert isinstance(contiguous, np.memmap)
+        np.testing.assert_array_equal(contiguous, np.array(self.arrays))
+
+        reordered = sidecar.read_arrays('snap.xyz', refs[::-1], np.float32,
+                                        (2, 3))
+        assert not isinstance(reordered, np.memmap)
+        np.testing.assert_array_equal(reordered,
+                                      np.array(self.arrays[::-1]))
+
+    def test_read_arrays_bad_shape(self, tmpdir):
+        sidecar = ArraySidecar(str(tmpdir.join("arrays")), mode='w')
+        refs = sidecar.append('snap.xyz', self.data)
+        with pytest.raises(ValueError):
+            sidecar.read_arrays('snap.xyz', refs, np.float32, (3, 3))
+
+    def test_read_mode(self, tmpdir):
+        directory = str(tmpdir.join("arrays"))
+        refs = ArraySidecar(directory, mode='w').append('snap.xyz',
+                                                        self.data)
+        sidecar = ArraySidecar(directory, mode='r')
+        loaded = sidecar.read_arrays('snap.xyz', refs, np.float32, (2, 3))
+        np.testing.assert_array_equal(loaded, np.array(self.arrays))
+        with pytest.raises(RuntimeError):
+            sidecar.append('snap.xyz', self.data)
+
+    def test_read_after_append(self, tmpdir):
+        # memory map must be refreshed when the file grows
+        sidecar = ArraySidecar(str(tmpdir.join("arrays")), mode='w')
+        refs = sidecar.append('snap.xyz', self.data[:1])
+        sidecar.read('snap.xyz', refs[0])
+        refs += sidecar.append('snap.xyz', self.data[1:])
+        loaded = np.frombuffer(sidecar.read('snap.xyz', refs[3]),
+                               dtype=np.float32).reshape(2, 3)
+        np.testing.assert_array_equal(loaded, self.arrays[3])
@@ -48,3 +48,57 @@ class TestNDArrayHandler(object):
         np.testing.assert_equal(deser, self.data)
         reser = self.ndarray_handler.serialize(deser)
         assert ser == reser
+
+
+class TestArrayCodecs(object):
+    def setup_method(self):
+        rng = np.random.RandomState(42)
+        self.data = np.cumsum(rng.normal(scale=0.1, size=(100, 3)),
+                              axis=0).astype(np.float32)
+
+    @pytest.mark.parametrize('codecs', ['|zlib', '|zlib(9)', '|lzma',
+                                        '|lzma(1)'])
+    def test_lossless_cycle(self, codecs):
+        handler = NDArrayHandler.from_type_string(
+            'ndarray.float32(100,3)' + codecs
+        )
+        assert handler.backend_type == 'ndarray'
+        ser = handler.serialize(self.data)
+        assert isinstance(ser, bytes)
+        deser = handler.deserialize(ser)
+        assert deser.dtype == np.float32
+        np.testing.assert_array_equal(deser, self.data)
+        assert handler.serialize(deser) == ser
+
+    @pytest.mark.parametrize('codecs', ['|quantize(0.001)',
+                                        '|quantize(0.001)|zlib'])
+    def test_quantize_cycle(self, codecs):
+        handler = NDArrayHandler.from_type_string(
+            'ndarray.float32(100,3)' + codecs
+        )
+        ser = handler.serialize(self.data)
+        deser = handler.deserialize(ser)
+        assert deser.shape == (100, 3)
+        assert deser.dtype == np.float32
+        np.testing.assert_allclose(deser, self.data, atol=0.0005 + 1e-6)
+        assert len(ser) <= self.data.nbytes
+
+    def test_quantize_overflow(self):
+        handler = NDArrayHandler.from_type_string(
+            'ndarray.float32(2)|quantize(0.001)'
+        )
+        with pytest.raises(ValueError):
+            handler.serialize(np.array([1e7, 0.0]))
+
+    @pytest.mark.parametrize('type_str, expected', [
+        ('ndarray.float32(3,2)|zlib', (np.float32, (3, 2), '|zlib')),
+        ('ndarray.float64(3)|quantize(0.01)|lzma',
+         (np.float64, (3,), '|quantize(0.01)|lzma')),
+    ])
+    def test_is_my_type(self, type_str, expected):
+        assert NDArrayHandler.is_my_type(type_str) == expected
+
+    @pytest.mark.parametrize('codec_str', ['zlib', '|foo', '|quantize'])
+    def test_bad_codecs(self, codec_str):
+        with pytest.raises(ValueError):
+            NDArrayHandler((np.float32, (3,), codec_str))
@@ -81,6 +81,20 @@ def test_get_all_uuids_with_known(obj, included_objs):
         expected.update({str(obj.__uuid__): obj})
     assert get_all_uuids(obj, known_uuids=known_uuids) == expected
 
+def test_get_all_uuids_with_stored():
+    stored = {get_uuid(all_objects['int'])}
+    # stored objects are not searched or returned
+    expected = {get_uuid(all_objects[name]): all_objects[name]
+                for name in ['lst', 'str']}
+    assert get_all_uuids(all_objects['lst'],
+                         stored_uuids=stored) == expected
+    # but the initial object is always searched
+    expected = {get_uuid(all_objects[name]): all_objects[name]
+                for name in ['obj', 'int']}
+    assert get_all_uuids(all_objects['obj'],
+                         stored_uuids={get_uuid(all_objects['obj'])}) \
+            == expected
+
 @pytest.mark.parametrize('obj,replace_dct', [
     (all_objects['int'], {'name': 'int', 'normal_attr': 5}),
     (all_objects['str'], {'name': 'str', 'normal_attr': 'foo'}),
@@ -1,5 +1,6 @@
 from .sql_backend import *
 import pytest
+import numpy as np
 
 class TestSQLStorageBackend(object):
     def setup_method(self):
@@ -275,3 +276,155 @@ class TestSQLStorageBackend(object):
     def test_non_existing_file(self):
         with pytest.raises(FileNotFoundError, match="foo.sql"):
             SQLStorageBackend("foo.sql")
+
+    def test_add_to_table_appends(self):
+        self._add_snapshot_data()
+        snap_dicts = [{'filename': 'file.trr', 'index': idx,
+                       'uuid': 'snapuuid' + str(idx)}
+                      for idx in range(3)]
+        self.database.add_to_table('snapshot0', snap_dicts)
+        # input is not modified
+        assert all('idx' not in dct for dct in snap_dicts)
+        assert self.database.table_len('snapshot0') == 4
+        uuids = ['snapuuid'] + [dct['uuid'] for dct in snap_dicts]
+        uuid_rows = self.database.load_uuids_table(uuids)
+        assert sorted(row.row for row in uuid_rows) == [1, 2, 3, 4]
+        for row in self.database.load_table_data(uuid_rows):
+            expected = 'snapuuid' + ('' if row.idx == 1
+                                     else str(row.idx - 2))
+            assert row.uuid == expected
+
+    def test_add_to_table_empty(self):
+        self._add_snapshot_data()
+        self.database.add_to_table('snapshot0', [])
+        assert self.database.table_len('snapshot0') == 1
+
+    def test_sqlite_pragmas(self):
+        pragmas = {'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+                   'cache_size': -4000}
+        database = SQLStorageBackend('test.sql', mode='w',
+                                     sqlite_pragmas=pragmas)
+        with database.engine.connect() as conn:
+            get = lambda name: conn.exec_driver_sql(
+                "PRAGMA " + name
+            ).scalar()
+            assert get('journal_mode').lower() == 'wal'
+            assert get('synchronous') == 1  # NORMAL
+            assert get('cache_size') == -4000
+
+        assert database.to_dict()['sqlite_pragmas'] == pragmas
+        database.close()
+        reloaded = SQLStorageBackend.from_dict(database.to_dict())
+        with reloaded.engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        reloaded.close()
+
+    @pytest.mark.parametrize('pragmas,dialect', [
+        ({'journal_mode': 'WAL; DROP TABLE uuid'}, 'sqlite'),
+        ({'synchronous; DROP TABLE uuid': 1}, 'sqlite'),
+        ({'journal_mode': 'WAL'}, 'postgresql'),
+    ])
+    def test_bad_sqlite_pragmas(self, pragmas, dialect):
+        with pytest.raises(ValueError):
+            SQLStorageBackend(None, mode='w', sql_dialect=dialect,
+                              sqlite_pragmas=pragmas)
+
+    @pytest.mark.parametrize('max_items', [900, 2])
+    def test_load_storable_function_results(self, max_items):
+        # with max_items=2, results are loaded with a temporary table join
+        from .attribute_handlers import StandardHandler
+        self.database.register_storable_function('func', 'float')
+        self.database.serialization['float'] = StandardHandler('float')
+        results = {'uuid' + str(i): float(i) for i in range(5)}
+        self.database.add_storable_function_results('func', results)
+        self.database.MAX_SQL_ITEMS = max_items
+        uuids = ['uuid1', 'uuid3', 'uuid4', 'missing']
+        loaded = self.database.load_storable_function_results('func',
+                                                              uuids)
+        assert loaded == {'uuid1': 1.0, 'uuid3': 3.0, 'uuid4': 4.0}
+        # the temporary table is removed
+        assert not sql.inspect(self.database.engine).get_temp_table_names()
+        assert self.database.load_storable_function_results('func',
+                                                            []) == {}
+
+
+class TestSQLStorageBackendSidecar(object):
+    def setup_method(self):
+        self.schema = {'snapshot0': [('xyz', 'ndarray.float32(2,3)'),
+                                     ('index', 'int')]}
+        self.table_to_class = {'snapshot0': tuple}
+        self.arrays = [np.arange(6, dtype=np.float32).reshape(2, 3) + i
+                       for i in range(3)]
+        self.rows = [{'uuid': 'snap' + str(i), 'index': i,
+                      'xyz': arr.tobytes()}
+                     for i, arr in enumerate(self.arrays)]
+
+    def _database(self, tmpdir):
+        filename = str(tmpdir.join("test.sql"))
+        database = SQLStorageBackend(filename, mode='w', array_sidecar=True)
+        database.register_schema(self.schema, self.table_to_class)
+        database.add_to_table('snapshot0', self.rows)
+        return filename, database
+
+    @staticmethod
+    def _as_array(data):
+        return np.frombuffer(data, dtype=np.float32).reshape(2, 3)
+
+    def test_add_load(self, tmpdir):
+        filename, database = self._database(tmpdir)
+        assert os.path.isdir(filename + ".arrays")
+        uuid_rows = database.load_uuids_table(['snap2', 'snap0'])
+        loaded = database.load_table_data(uuid_rows)
+        assert {row.index for row in loaded} == {2, 0}
+        for row in loaded:
+            np.testing.assert_array_equal(self._as_array(row.xyz),
+                                          self.arrays[row.index])
+        # the database itself only holds the references
+        table = database.metadata.tables['snapshot0']
+        with database.engine.connect() as conn:
+            refs = [row.xyz for row in conn.execute(table.select())]
+        assert refs == ['0:0:24', '0:24:24', '0:48:24']
+        assert database.to_dict()['array_sidecar'] is True
+        database.close()
+
+    def test_row_accessors(self, tmpdir):
+        _, database = self._database(tmpdir)
+        rep = database.get_representative('snapshot0')
+        np.testing.assert_array_equal(self._as_array(rep.xyz),
+                                      self.arrays[0])
+        item = database.table_get_item('snapshot0', 1)
+        np.testing.assert_array_equal(self._as_array(item.xyz),
+                                      self.arrays[1])
+        for row in database.table_iterator('snapshot0'):
+            np.testing.assert_array_equal(self._as_array(row.xyz),
+                                          self.arrays[row.index])
+        database.close()
+
+    def test_reopen(self, tmpdir):
+        filename, database = self._database(tmpdir)
+        database.close()
+        reloaded = SQLStorageBackend(filename, mode='r')
+        assert reloaded.array_sidecar
+        uuid_rows = reloaded.load_uuids_table(['snap1'])
+        row = reloaded.load_table_data(uuid_rows)[0]
+        np.testing.assert_array_equal(self._as_array(row.xyz),
+                                      self.arrays[1])
+        reloaded.close()
+
+    def test_load_sidecar_arrays(self, tmpdir):
+        _, database = self._database(tmpdir)
+        uuids = ['snap0', 'snap1', 'snap2']
+        loaded = database.load_sidecar_arrays('snapshot0', 'xyz', uuids)
+        assert isinstance(loaded, np.memmap)
+        np.testing.assert_array_equal(loaded, np.array(self.arrays))
+        reordered = database.load_sidecar_arrays('snapshot0', 'xyz',
+                                                 uuids[::-1])
+        np.testing.assert_array_equal(reordered,
+                                      np.array(self.arrays[::-1]))
+        with pytest.raises(ValueError):
+            database.load_sidecar_arrays('snapshot0', 'index', uuids)
+        database.close()
+
+    def test_sidecar_requires_file(self):
+        with pytest.raises(ValueError):
+            SQLStorageBackend(":memory:", mode='w', array_sidecar=True)
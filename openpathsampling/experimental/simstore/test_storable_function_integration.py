@@ -329,3 +329,23 @@ def test_storage_file_problem(tmpdir, inputs_and_func):
     with pytest.warns(UserWarning):
         assert container(inp1) == 'f'
     assert container.cv.func.call_count == 2
+
+
+def test_preload_cache_uuids(tmpdir):
+    inputs = [InputObj() for _ in range(3)]
+    func = Mock(return_value='foo')
+    sf = StorableFunction(func).named('foo-return')
+    _ = sf(inputs[:2])
+    storage = GeneralStorage(
+        backend=SQLStorageBackend(tmpdir.join("st1.db"), mode='w'),
+        class_info=_serialization,
+        schema=_schema
+    )
+    storage.save(sf)
+    sf.local_cache.clear()
+
+    uuids = [get_uuid(inp) for inp in inputs]
+    sf.preload_cache(storage, uuids)
+    assert set(sf.local_cache.result_dict) == set(uuids[:2])
+    assert sf(inputs[:2]) == ['foo', 'foo']
+    assert func.call_count == 2
@@ -145,3 +145,107 @@ class TestPseudoTable(object):
         assert self.pseudo_table[len_table] == item
         if name is not None:
             assert self.pseudo_table[name] == item
+
+
+class TestUUIDIndex(object):
+    def test_contains_and_update(self):
+        index = UUIDIndex(['a', 'b'])
+        assert index.complete
+        assert 'a' in index
+        assert 'c' not in index
+        index.update(['c'])
+        assert 'c' in index
+        assert len(index) == 3
+
+
+class TestGeneralStorageUUIDIndex(object):
+    def setup_method(self):
+        from .test_storable_function_integration import (
+            InputObj, _schema, _serialization
+        )
+        from .sql_backend import SQLStorageBackend
+        self.schema = _schema
+        self.class_info = _serialization
+        self.backend_cls = SQLStorageBackend
+        self.objs = [InputObj(), InputObj()]
+        GeneralStorage._known_storages = {}
+
+    def teardown_method(self):
+        GeneralStorage._known_storages = {}
+
+    def _storage(self, filename, mode, shared=False):
+        return GeneralStorage(backend=self.backend_cls(filename, mode=mode),
+                              class_info=self.class_info,
+                              schema=self.schema, shared=shared)
+
+    @staticmethod
+    def _forbid_uuid_lookups(storage):
+        def fail(*args, **kwargs):
+            raise AssertionError("UUID table should not be queried")
+        storage.backend.load_uuids_table = fail
+
+    def test_save_skips_database(self, tmpdir):
+        storage = self._storage(tmpdir.join("test.db"), 'w')
+        self._forbid_uuid_lookups(storage)
+        storage.save(self.objs[0])
+        assert get_uuid(self.objs[0]) in storage._uuid_index
+        storage.save(self.objs)
+        assert storage.backend.table_len('input_objs') == 2
+        storage.close()
+
+    def test_append_loads_index(self, tmpdir):
+        filename = tmpdir.join("test.db")
+        storage = self._storage(filename, 'w')
+        storage.save(self.objs[0])
+        storage.close()
+
+        GeneralStorage._known_storages = {}
+        storage = self._storage(filename, 'a')
+        assert get_uuid(self.objs[0]) in storage._uuid_index
+        self._forbid_uuid_lookups(storage)
+        storage.save(self.objs)
+        assert storage.backend.table_len('input_objs') == 2
+        storage.close()
+
+    def test_save_skips_stored_subtrees(self, tmpdir):
+        from .test_storable_function_integration import Container
+        storage = self._storage(tmpdir.join("test.db"), 'w')
+        storage.save(self.objs[0])
+
+        info = self.class_info['input_objs']
+        searched = []
+        find_uuids = info.find_uuids
+
+        def counting_find_uuids(obj, cache_list):
+            searched.append(get_uuid(obj))
+            return find_uuids(obj, cache_list)
+
+        info.find_uuids = counting_find_uuids
+        try:
+            storage.save([Container(obj) for obj in self.objs])
+        finally:
+            info.find_uuids = find_uuids
+
+        assert searched == [get_uuid(self.objs[1])]
+        assert storage.backend.table_len('input_objs') == 2
+        assert storage.backend.table_len('simulation_objects') == 2
+        storage.close()
+
+    def test_shared_writers(self, tmpdir):
+        filename = tmpdir.join("test.db")
+        storage = self._storage(filename, 'w')
+        storage.close()
+
+        GeneralStorage._known_storages = {}
+        writer_1 = self._storage(filename, 'a', shared=True)
+        GeneralStorage._known_storages = {}
+        writer_2 = self._storage(filename, 'a', shared=True)
+        assert not writer_2._uuid_index.complete
+
+        writer_1.save(self.objs[0])
+        # writer_2 doesn't know about this, so it has to ask the database
+        writer_2.save(self.objs)
+        assert writer_2.backend.table_len('input_objs') == 2
+        assert get_uuid(self.objs[0]) in writer_2._uuid_index
+        writer_1.close()
+        writer_2.close()
@@ -276,18 +276,43 @@ ops_simulation_classes = {
 }  # TODO: add more to these
 
 
+def _snapshot_uuids(objects):
+    """UUIDs of all snapshots in the given trajectories, samples, steps.
+    """
+    uuids = set()
+    for obj in objects:
+        if isinstance(obj, paths.BaseSnapshot):
+            uuids.add(get_uuid(obj))
+        elif isinstance(obj, paths.Trajectory):
+            uuids.update(get_uuid(snap) for snap in obj)
+        elif isinstance(obj, paths.Sample):
+            uuids.update(get_uuid(snap) for snap in obj.trajectory)
+        elif isinstance(obj, paths.SampleSet):
+            uuids |= _snapshot_uuids(obj.samples)
+        elif isinstance(obj, paths.MCStep):
+            uuids |= _snapshot_uuids(obj.active.samples)
+            uuids |= _snapshot_uuids(obj.change.trials)
+        else:
+            raise TypeError("Can't find snapshots in object of type "
+                            + obj.__class__.__name__)
+    return uuids
+
+
 class Storage(storage.GeneralStorage):
-    def __init__(self, filename, mode='r', fallbacks=None, safemode=False):
+    def __init__(self, filename, mode='r', fallbacks=None, safemode=False,
+                 shared=False, array_codecs=None):
         # TODO: this will change to match the current notation
         backend = sql_backend.SQLStorageBackend(filename, mode=mode)
         self.snapshots = None
+        self.array_codecs = tools.none_to_default(array_codecs, {})
         super(Storage, self).__init__(
             backend=backend,
             schema=ops_schema,
             class_info=ops_class_info,
             simulation_classes=ops_simulation_classes,
             fallbacks=fallbacks,
-            safemode=safemode
+            safemode=safemode,
+            shared=shared
         )
 
         self.snapshots = SnapshotsTable(self)
@@ -304,7 +329,7 @@ class Storage(storage.GeneralStorage):
     @classmethod
     def from_backend(cls, backend, schema=None, class_info=None,
                      simulation_classes=None, fallbacks=None,
-                     safemode=False):
+                     safemode=False, array_codecs=None):
         # quick exit if this storage is known
         exists = None
         if backend.identifier[1] != 'w':
@@ -317,6 +342,7 @@ class Storage(storage.GeneralStorage):
         simulation_classes = tools.none_to_default(simulation_classes,
                                                    ops_simulation_classes)
         obj.snapshots = None
+        obj.array_codecs = tools.none_to_default(array_codecs, {})
         super(Storage, obj).__init__(
             backend=backend,
             schema=schema,
@@ -331,7 +357,8 @@ class Storage(storage.GeneralStorage):
     def to_dict(self):
         return {'backend': self.backend,
                 'fallbacks': self.fallbacks,
-                'safemode': self.safemode}
+                'safemode': self.safemode,
+                'array_codecs': self.array_codecs}
 
     @classmethod
     def from_dict(cls, dct):
@@ -348,6 +375,29 @@ class Storage(storage.GeneralStorage):
     def samplesets(self):
         return self.sample_sets
 
+    def preload_function_results(self, objects, functions=None):
+        """Load stored function results for all snapshots of ``objects``.
+
+        This loads the results for all snapshots at once, which is much
+        faster than loading them piecemeal as each trajectory is analyzed.
+
+        Parameters
+        ----------
+        objects : Iterable
+            snapshots, trajectories, samples, sample sets, or MC steps
+        functions : List[:class:`.StorableFunction`]
+            functions to load results for; default (None) loads results
+            for all functions in this storage
+        """
+        uuids = _snapshot_uuids(objects)
+        if functions is None:
+            functions = self._sf_handler.functions
+
+        for func in functions:
+            if not self.backend.has_table(get_uuid(func)):
+                continue
+            func.preload_cache(self, uuids)
+
     def register_from_tables(self, table_names, classes):
         lookups = {}
         table_to_class = {tbl: cls for tbl, cls in zip(table_names, classes)}
@@ -385,6 +435,7 @@ class Storage(storage.GeneralStorage):
             schema = snapshots.replace_schema_dimensions(
                 schema, obj.engine.descriptor
             )
+            schema = snapshots.add_array_codecs(schema, self.array_codecs)
 
             self.register_schema(schema, class_info_list)
             self.snapshots.update_tables()  # increments snapshot types, too
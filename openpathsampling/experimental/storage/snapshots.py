@@ -64,6 +64,32 @@ def replace_schema_dimensions(schema, descriptor):
     return schema
 
 
+def add_array_codecs(schema, array_codecs):
+    """Select array codecs for the ndarray entries of a snapshot schema.
+
+    Parameters
+    ----------
+    schema : dict
+        the schema dictionary, after dimensions have been replaced
+    array_codecs : dict
+        maps attribute name (e.g., ``'coordinates'``) to the codecs to use
+        for it, as in the type string (e.g., ``'quantize(0.001)|zlib'``)
+
+    Returns
+    -------
+    dict
+        the schema dictionary with codecs added to the type strings
+    """
+    for (table, entries) in schema.items():
+        schema[table] = [
+            (attr, type_name + '|' + array_codecs[attr])
+            if attr in array_codecs and type_name.startswith('ndarray')
+            else (attr, type_name)
+            for (attr, type_name) in entries
+        ]
+    return schema
+
+
 def snapshot_registration_from_db(storage, schema, class_info, table_name):
     # TODO: snapshot tables always have `snapshotNUM`; this should be used
     # to identify other related tables in the DB
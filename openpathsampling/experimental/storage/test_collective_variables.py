@@ -143,3 +143,27 @@ class TestMDTrajFunctionCV(object):
         by_snap = np.array([self.cv(snap) for snap in self.traj])
         np.testing.assert_array_equal(by_traj, by_snap)
         assert by_traj.shape == (len(self.traj),)
+
+
+def test_preload_function_results(tmpdir):
+    from .ops_storage import Storage
+    cv = CoordinateFunctionCV(lambda s: s.xyz[0][0]).named('x')
+    traj = make_1d_traj([1.0, 2.0, 3.0])
+    other = make_1d_traj([4.0, 5.0])
+    ensemble = paths.LengthEnsemble(2)
+    sample = paths.Sample(replica=0, trajectory=other, ensemble=ensemble)
+    _ = cv(traj + other)
+    Storage._known_storages = {}
+    storage = Storage(str(tmpdir.join("preload.db")), mode='w')
+    storage.save([traj, sample, cv])
+    cv.local_cache.clear()
+
+    storage.preload_function_results([traj])
+    assert set(cv.local_cache.result_dict) == \
+        set(get_uuid(snap) for snap in traj)
+    storage.preload_function_results([sample], functions=[cv])
+    assert len(cv.local_cache) == 5
+
+    with pytest.raises(TypeError):
+        storage.preload_function_results([ensemble])
+    storage.close()
@@ -105,3 +105,30 @@ class TestSnapshotIntegration(object):
                                       get_velocities(snap2))
         np.testing.assert_array_equal(get_box_vectors(snap),
                                       get_box_vectors(snap2))
+
+
+def test_array_codecs(tmpdir):
+    from openpathsampling.tests.test_helpers import make_1d_traj
+    filename = str(tmpdir.join("codecs.db"))
+    traj = make_1d_traj([0.12345, 1.23456, 2.34567])
+    Storage._known_storages = {}
+    storage = Storage(filename, mode='w',
+                      array_codecs={'coordinates': 'quantize(0.001)|zlib',
+                                    'velocities': 'lzma'})
+    storage.save(traj)
+    storage.close()
+
+    Storage._known_storages = {}
+    storage = Storage(filename, mode='r')
+    snapshot_table = [table for table in storage.schema
+                      if table.startswith('snapshot')
+                      and table != 'snapshots'][0]
+    types = dict(storage.backend.schema[snapshot_table])
+    assert types['coordinates'].endswith('|quantize(0.001)|zlib')
+    assert types['velocities'].endswith('|lzma')
+    reloaded = storage.trajectories[0]
+    for snap, orig in zip(reloaded, traj):
+        np.testing.assert_allclose(snap.coordinates, orig.coordinates,
+                                   atol=0.0005 + 1e-6)
+        np.testing.assert_array_equal(snap.velocities, orig.velocities)
+    storage.close()
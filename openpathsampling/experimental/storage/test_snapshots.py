@@ -57,3 +57,20 @@ def test_snapshot_registration_info():
     assert info.lookup_result == (get_uuid(snapshot.engine),
                                   snapshot.__class__)
     assert info.cls == snapshot.__class__
+
+def test_add_array_codecs():
+    schema = {
+        'statics': [('coordinates', 'ndarray.float32(1000,3)'),
+                    ('box_vectors', 'ndarray.float32(3,3)'),
+                    ('engine', 'uuid')],
+        'snapshot': [('statics', 'lazy')]
+    }
+    codecs = {'coordinates': 'quantize(0.001)|zlib', 'engine': 'zlib'}
+    expected = {
+        'statics': [('coordinates',
+                     'ndarray.float32(1000,3)|quantize(0.001)|zlib'),
+                    ('box_vectors', 'ndarray.float32(3,3)'),
+                    ('engine', 'uuid')],
+        'snapshot': [('statics', 'lazy')]
+    }
+    assert add_array_codecs(schema, codecs) == expected
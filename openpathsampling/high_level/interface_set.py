@@ -3,6 +3,8 @@ import openpathsampling.netcdfplus as netcdfplus
 import collections
 import copy
 
+import numpy as np
+
 from functools import partial
 
 def _cv_max_func(trajectory, cv):
@@ -125,6 +127,40 @@ class InterfaceSet(netcdfplus.StorableNamedObject):
         """
         return self._lambda_dict[volume]
 
+    def interface_indices(self, trajectory):
+        """Index of the first interface volume that contains each frame.
+
+        For nested interfaces, this classifies each frame by the interfaces
+        it has crossed: frame ``i`` is outside of interface ``k`` if and
+        only if ``k < indices[i]``.
+
+        Parameters
+        ----------
+        trajectory : :class:`.Trajectory` or list of :class:`.BaseSnapshot`
+            the frames to classify
+
+        Returns
+        -------
+        np.ndarray of int
+            for each frame, the index of the first interface volume that
+            contains it, or ``len(self)`` if no interface volume does
+        """
+        frames = getattr(trajectory, 'iter_proxies', trajectory.__iter__)()
+        indices = []
+        for frame in frames:
+            idx = 0
+            for volume in self.volumes:
+                if volume(frame):
+                    break
+                idx += 1
+            indices.append(idx)
+        return np.array(indices, dtype=int)
+
+    @property
+    def classifies_cv_values(self):
+        """bool : whether :meth:`.indices_from_cv_values` can be used"""
+        return False
+
     def _slice_dict(self, slicer):
         dct = self.to_dict()
         dct['volumes'] = self.volumes[slicer]
@@ -189,6 +225,56 @@ class GenericVolumeInterfaceSet(InterfaceSet):
             volumes=volumes, cv=cv, lambdas=lambdas, direction=direction)
         self._set_volume_func(volume_func)
 
+    def _classifier(self):
+        """Data to classify frames from CV values.
+
+        Returns None if frames can't be classified from the CV value alone
+        (e.g., if the volumes are intersected with another volume).
+        """
+        return None
+
+    def _get_classifier(self):
+        try:
+            return self._cached_classifier
+        except AttributeError:
+            self._cached_classifier = self._classifier()
+            return self._cached_classifier
+
+    @property
+    def classifies_cv_values(self):
+        return self._get_classifier() is not None
+
+    def interface_indices(self, trajectory):
+        # docstring inherited from InterfaceSet
+        if self._get_classifier() is None:
+            return super(GenericVolumeInterfaceSet, self).interface_indices(
+                trajectory
+            )
+
+        return self.indices_from_cv_values(self.cv(trajectory))
+
+    def indices_from_cv_values(self, values):
+        """Interface index for each CV value; see :meth:`.interface_indices`
+
+        Parameters
+        ----------
+        values : list of float
+            the values of ``self.cv`` for each frame
+
+        Returns
+        -------
+        np.ndarray of int
+            for each value, the index of the first interface volume that
+            contains it, or ``len(self)`` if no interface volume does
+        """
+        classifier = self._get_classifier()
+        if classifier is None:
+            raise RuntimeError("Interfaces of " + repr(self) + " can't be "
+                               + "identified from CV values alone")
+
+        values = np.array([float(val) for val in values], dtype=float)
+        return self._indices_from_values(classifier, values)
+
     def _slice_dict(self, slicer):
         dct = super(GenericVolumeInterfaceSet, self)._slice_dict(slicer)
         try:
@@ -325,6 +411,34 @@ class GenericVolumeInterfaceSet(InterfaceSet):
         """
         return self.intersect_with & self.volume_func(lambda_i)
 
+    def _bounds_for_lambdas(self, lambdas):
+        lambdas = list(lambdas)
+        if self.direction > 0:
+            return self.minvals, lambdas
+        elif self.direction < 0:
+            return lambdas, self.maxvals
+        else:
+            raise ValueError("Can't replace lambdas of an interface set "
+                             + "without a direction")
+
+    def with_lambdas(self, lambdas):
+        """New interface set like this one, with interfaces at ``lambdas``.
+
+        The CV, the fixed edge of the interface volumes, and any volume
+        the interfaces are intersected with are kept.
+
+        Parameters
+        ----------
+        lambdas : list of float or list of int
+            values of the CV for the new interfaces
+
+        Returns
+        -------
+        :class:`.GenericVolumeInterfaceSet`
+            new interface set, of the same type as this one
+        """
+        raise NotImplementedError()
+
 
 
 class VolumeInterfaceSet(GenericVolumeInterfaceSet):
@@ -347,6 +461,48 @@ class VolumeInterfaceSet(GenericVolumeInterfaceSet):
                                                  intersect_with,
                                                  volume_func)
 
+    def _classifier(self):
+        if self.direction == 0 or len(self.volumes) == 0:
+            return None
+
+        for volume in self.volumes:
+            if type(volume) is not paths.CVDefinedVolume \
+                    or volume.collectivevariable != self.cv:
+                return None
+
+        if self.direction > 0:
+            bounds = set(vol.lambda_min for vol in self.volumes)
+            lambdas = [vol.lambda_max for vol in self.volumes]
+        else:
+            bounds = set(vol.lambda_max for vol in self.volumes)
+            lambdas = [vol.lambda_min for vol in reversed(self.volumes)]
+
+        lambdas = np.array(lambdas, dtype=float)
+        if len(bounds) != 1 or np.any(np.diff(lambdas) < 0):
+            return None
+
+        return bounds.pop(), lambdas
+
+    def _indices_from_values(self, classifier, values):
+        # volume k is [bound, lambdas[k]) for increasing interfaces and
+        # [lambdas[k], bound) for decreasing interfaces
+        bound, lambdas = classifier
+        n_interfaces = len(lambdas)
+        if self.direction > 0:
+            indices = np.searchsorted(lambdas, values, side='right')
+            indices[values < bound] = n_interfaces
+        else:
+            indices = n_interfaces - np.searchsorted(lambdas, values,
+                                                     side='right')
+            indices[values >= bound] = n_interfaces
+        return indices
+
+    def with_lambdas(self, lambdas):
+        # docstring inherited from GenericVolumeInterfaceSet
+        minvals, maxvals = self._bounds_for_lambdas(lambdas)
+        return VolumeInterfaceSet(self.cv, minvals, maxvals,
+                                  self.intersect_with)
+
     @staticmethod
     def from_dict(dct):
         interface_set = VolumeInterfaceSet.__new__(VolumeInterfaceSet)
@@ -389,6 +545,75 @@ class PeriodicVolumeInterfaceSet(GenericVolumeInterfaceSet):
                                                          intersect_with,
                                                          volume_func)
 
+    def _classifier(self):
+        if self.direction <= 0 or len(self.volumes) == 0:
+            return None
+
+        # interfaces are arcs that start at a common (wrapped) lambda_min;
+        # arcs that don't wrap around the periodic boundary come first,
+        # followed by those that do, and finally full volumes
+        lambda_min = None
+        unwrapped = []
+        wrapped = []
+        n_full = 0
+        for volume in self.volumes:
+            if not isinstance(volume, paths.PeriodicCVDefinedVolume) \
+                    or volume.collectivevariable != self.cv \
+                    or volume.period_min != self.period_min \
+                    or volume.period_max != self.period_max:
+                return None
+
+            if type(volume) is not paths.PeriodicCVDefinedVolume:
+                # full periodic domain (see PeriodicCVDefinedVolume)
+                n_full += 1
+                continue
+            elif n_full > 0:
+                return None
+
+            if lambda_min is None:
+                lambda_min = volume.lambda_min
+            elif volume.lambda_min != lambda_min:
+                return None
+
+            if volume.lambda_max >= lambda_min:
+                if wrapped:
+                    return None
+                unwrapped.append(volume.lambda_max)
+            else:
+                wrapped.append(volume.lambda_max)
+
+        if lambda_min is None:
+            lambda_min = float('-inf')
+
+        unwrapped = np.array(unwrapped, dtype=float)
+        wrapped = np.array(wrapped, dtype=float)
+        if np.any(np.diff(unwrapped) < 0) or np.any(np.diff(wrapped) < 0):
+            return None
+
+        wrap = self.volumes[0].do_wrap if self.volumes[0].wrap else None
+        return float(lambda_min), unwrapped, wrapped, wrap
+
+    def _indices_from_values(self, classifier, values):
+        lambda_min, unwrapped, wrapped, wrap = classifier
+        if wrap is not None:
+            values = np.array([wrap(val) for val in values], dtype=float)
+
+        above = values >= lambda_min
+        indices = np.empty(len(values), dtype=int)
+        indices[above] = np.searchsorted(unwrapped, values[above],
+                                         side='right')
+        indices[~above] = len(unwrapped) + np.searchsorted(
+            wrapped, values[~above], side='right'
+        )
+        return indices
+
+    def with_lambdas(self, lambdas):
+        # docstring inherited from GenericVolumeInterfaceSet
+        minvals, maxvals = self._bounds_for_lambdas(lambdas)
+        return PeriodicVolumeInterfaceSet(self.cv, minvals, maxvals,
+                                          self.period_min, self.period_max,
+                                          self.intersect_with)
+
     def to_dict(self):
         dct = super(PeriodicVolumeInterfaceSet, self).to_dict()
         dct['period_min'] = self.period_min
@@ -240,6 +240,11 @@ class TISTransition(Transition):
         except AttributeError:
             lambdas = [None] * len(interfaces)
 
+        if isinstance(interfaces, paths.InterfaceSet):
+            interface_set = interfaces
+        else:
+            interface_set = None
+
         self.ensembles = [
             paths.TISEnsemble(
                 initial_states=stateA,
@@ -247,7 +252,8 @@ class TISTransition(Transition):
                 interface=iface_vol,
                 orderparameter=cv,
                 cv_max=cv_max,
-                lambda_i=lambda_i
+                lambda_i=lambda_i,
+                interface_set=interface_set
             )
             for (iface_vol, lambda_i) in zip(interfaces, lambdas)
         ]
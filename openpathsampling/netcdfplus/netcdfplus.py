@@ -3,6 +3,7 @@ author
 """
 
 import abc
+import fnmatch
 import logging
 import os.path
 from collections import OrderedDict
@@ -35,6 +36,12 @@ class NetCDFPlus(netCDF4.Dataset):
     """
     support_simtk_unit = HAS_SIMTK_UNIT
 
+    # storage profiles: for each profile name a list of
+    # (variable name pattern, settings), see `_profile_settings`
+    storage_profiles = {
+        'default': []
+    }
+
     @property
     def _netcdfplus_version_(self):
         import openpathsampling.netcdfplus.version as v
@@ -88,6 +95,9 @@ class NetCDFPlus(netCDF4.Dataset):
             on the variable
         store : openpathsampling.netcdfplus.ObjectStore
             a reference to an object store used for convenience in some cases
+        write_buffer : :class:`.WriteBehindBuffer` or None
+            if set, values assigned to single indices (or full rows, like
+            ``[idx, :, :]``) are kept in the buffer until it is flushed
 
         """
 
@@ -106,16 +116,51 @@ class NetCDFPlus(netCDF4.Dataset):
 
             self.getter = getter
             self.setter = setter
+            self.write_buffer = None
 
             if not HAS_SIMTK_UNIT:
                 self.support_simtk_unit = False
 
+        @staticmethod
+        def _single_index(key):
+            """The index if `key` selects one full row, otherwise None
+
+            This is a (non-negative) int, possibly followed by full slices
+            or Ellipsis, e.g. ``[idx, :, :]``.
+            """
+            if isinstance(key, tuple) and key \
+                    and all(part is Ellipsis or (isinstance(part, slice)
+                                                 and part == slice(None))
+                            for part in key[1:]):
+                key = key[0]
+            if isinstance(key, (int, np.integer)) and key >= 0:
+                return int(key)
+            return None
+
         def __setitem__(self, key, value):
+            if self.write_buffer is not None:
+                idx = self._single_index(key)
+                if idx is not None:
+                    self.write_buffer.add(self, idx, self.setter(value))
+                    return
+                self.write_buffer.flush()
+
             self.variable[key] = self.setter(value)
 
         def __getitem__(self, key):
             # print(self.variable[key])
             # print(type(self.variable[key]))
+            if self.write_buffer is not None and self.write_buffer:
+                idx = self._single_index(key)
+                if idx is None:
+                    # slices etc. may include pending values
+                    self.write_buffer.flush()
+                else:
+                    try:
+                        return self.getter(self.write_buffer.get(self, idx))
+                    except KeyError:
+                        pass
+
             return self.getter(self.variable[key])
 
         def __getattr__(self, item):
@@ -183,7 +228,7 @@ class NetCDFPlus(netCDF4.Dataset):
         # todo: add CVStore, rename to attribute
         pass
 
-    def __init__(self, filename, mode=None, fallback=None):
+    def __init__(self, filename, mode=None, fallback=None, profile=None):
         """
         Create a storage for complex objects in a netCDF file
 
@@ -200,6 +245,11 @@ class NetCDFPlus(netCDF4.Dataset):
             in this storage. By default you will not try to resave objects
             that could be found in the fallback. Note that the fall back does
             only work if `use_uuid` is enabled
+        profile : str or None
+            name of the storage profile (see `storage_profiles`) that sets
+            chunking and compression of new variables. The profile is saved
+            in the file; None uses the saved profile, or 'default' for new
+            files.
 
         Notes
         -----
@@ -249,9 +299,20 @@ class NetCDFPlus(netCDF4.Dataset):
         # this can be set to false to re-store proxies from other stores
         self.exclude_proxy_from_other = False
 
+        if profile is not None and profile not in self.storage_profiles:
+            raise ValueError("Unknown storage profile '%s'" % profile)
+
         # call netCDF4-python to create or open .nc file
         super(NetCDFPlus, self).__init__(filename, mode)
 
+        if profile is None:
+            if 'storage_profile' in self.ncattrs():
+                profile = self.getncattr('storage_profile')
+            else:
+                profile = 'default'
+
+        self.profile = profile
+
         self._setup_class()
 
         if mode == 'w':
@@ -259,6 +320,7 @@ class NetCDFPlus(netCDF4.Dataset):
 
             self.setncattr('format', 'netcdf+')
             self.setncattr('ncplus_version', self._netcdfplus_version_)
+            self.setncattr('storage_profile', profile)
 
             self.write_meta()
 
@@ -428,6 +490,44 @@ class NetCDFPlus(netCDF4.Dataset):
     def write_meta(self):
         pass
 
+    def set_write_behind(self, max_objects=256, max_seconds=None):
+        """
+        Buffer the writes of new objects in all stores
+
+        See :meth:`.ObjectStore.set_write_behind`. Buffers are written on
+        :meth:`sync` and :meth:`close`. Stores created later (like the
+        store for a new snapshot type) are buffered as well.
+
+        Parameters
+        ----------
+        max_objects : int or None
+            number of saved objects after which a store's buffer is
+            written. If `None` or 0, write-behind is switched off.
+        max_seconds : float or None
+            maximal time an object is kept in a buffer
+        """
+        if max_objects:
+            self.write_behind = (max_objects, max_seconds)
+        else:
+            self.write_behind = None
+
+        for store in self._stores.values():
+            store.set_write_behind(max_objects, max_seconds)
+
+    def flush_write_buffers(self):
+        """Write the buffered values of all stores to the file"""
+        for store in self._stores.values():
+            store.flush_write_buffer()
+
+    def sync(self):
+        self.flush_write_buffers()
+        super(NetCDFPlus, self).sync()
+
+    def close(self):
+        if self.isopen():
+            self.flush_write_buffers()
+        super(NetCDFPlus, self).close()
+
     def _setup_class(self):
         """
         Sets the basic properties for the storage
@@ -437,6 +537,7 @@ class NetCDFPlus(netCDF4.Dataset):
         self._obj_store = {}
         self._storages_base_cls = {}
         self.vars = dict()
+        self.write_behind = None
         self.units = dict()
 
     def create_store(self, name, store, register_attr=True):
@@ -481,6 +582,11 @@ class NetCDFPlus(netCDF4.Dataset):
         self.update_delegates()
         self.simplifier.update_class_list()
 
+        if self.write_behind is not None:
+            for store in self._stores.values():
+                if store.write_buffer is None:
+                    store.set_write_behind(*self.write_behind)
+
     def register_store(self, name, store, register_attr=True):
         """
         Add a object store to the file
@@ -1037,13 +1143,152 @@ class NetCDFPlus(netCDF4.Dataset):
         else:
             raise ValueError("Variable '%s' is already taken!" % var_name)
 
+    @classmethod
+    def rewrite_with_profile(cls, source, target, profile, n_block=1024):
+        """
+        Copy a storage file to a new file with a different storage profile
+
+        All dimensions, attributes and data are copied unchanged; only the
+        chunking and compression of the variables follow the new profile.
+        Variables without settings in the new profile keep their chunking
+        and are not compressed.
+
+        Parameters
+        ----------
+        source : str
+            filename of the existing storage
+        target : str
+            filename of the new storage; overwritten if it exists
+        profile : str
+            name of the storage profile for the new file
+        n_block : int
+            number of entries along the first dimension copied at once
+        """
+        if profile not in cls.storage_profiles:
+            raise ValueError("Unknown storage profile '%s'" % profile)
+
+        src = netCDF4.Dataset(source, 'r')
+        dst = netCDF4.Dataset(target, 'w')
+        try:
+            src.set_auto_maskandscale(False)
+            dst.set_auto_maskandscale(False)
+
+            dst.setncatts({name: src.getncattr(name)
+                           for name in src.ncattrs()})
+            dst.setncattr('storage_profile', profile)
+
+            for name, dim in src.dimensions.items():
+                dst.createDimension(
+                    name, None if dim.isunlimited() else len(dim)
+                )
+
+            # a variable's VLType doesn't know its name, so match by dtype
+            vltypes = {}
+            for name, vltype in src.vltypes.items():
+                new_vltype = dst.createVLType(vltype.dtype, name)
+                vltypes.setdefault(vltype.dtype, new_vltype)
+
+            for name, var in src.variables.items():
+                is_vlen = isinstance(var.datatype, netCDF4.VLType)
+                if is_vlen and var.datatype.dtype is str:
+                    # variable length strings
+                    datatype = str
+                elif is_vlen:
+                    datatype = vltypes[var.datatype.dtype]
+                else:
+                    datatype = var.datatype
+
+                chunking = var.chunking()
+                chunksizes = None if chunking == 'contiguous' \
+                    else tuple(chunking)
+
+                settings = cls._profile_settings(profile, name)
+                chunksizes = cls._profile_chunksizes(
+                    chunksizes,
+                    settings.get('chunksizes'),
+                    [None if src.dimensions[dim].isunlimited()
+                     else len(src.dimensions[dim])
+                     for dim in var.dimensions]
+                )
+                compression = {} if is_vlen \
+                    else settings.get('compression', {})
+
+                attrs = {attr: var.getncattr(attr) for attr in var.ncattrs()}
+                fill_value = attrs.pop('_FillValue', None)
+
+                new_var = dst.createVariable(
+                    name, datatype, var.dimensions,
+                    chunksizes=chunksizes,
+                    fill_value=fill_value,
+                    **compression
+                )
+                new_var.setncatts(attrs)
+
+                if not var.dimensions:
+                    new_var[...] = var[...]
+                else:
+                    length = len(var)
+                    for start in range(0, length, n_block):
+                        end = min(start + n_block, length)
+                        new_var[start:end] = var[start:end]
+        finally:
+            src.close()
+            dst.close()
+
+    @classmethod
+    def _profile_settings(cls, profile, var_name):
+        """
+        Chunking and compression settings of a variable in a profile
+
+        The settings of the first pattern in the profile that matches the
+        variable name are used. They can contain
+
+            'chunksizes' : tuple of int or None
+                chunk size for the leading dimensions; `None` keeps the
+                default and `-1` is the full dimension
+            'compression' : dict
+                keyword arguments for `netCDF4.Dataset.createVariable`,
+                i.e. `zlib`, `complevel`, `shuffle` and
+                `least_significant_digit`
+        """
+        for pattern, settings in cls.storage_profiles.get(profile, []):
+            if fnmatch.fnmatch(var_name, pattern):
+                return settings
+        return {}
+
+    @staticmethod
+    def _profile_chunksizes(chunksizes, profile_chunksizes, dim_sizes):
+        if chunksizes is None or profile_chunksizes is None:
+            return chunksizes
+
+        # a leading chunk size of 1 is required for some variables, see
+        # Unidata/netcdf4-python#566, so keep it
+        if chunksizes[0] == 1:
+            return chunksizes
+
+        chunksizes = list(chunksizes)
+        for ix, size in enumerate(profile_chunksizes[:len(chunksizes)]):
+            if size is None:
+                continue
+            dim_size = dim_sizes[ix]
+            if dim_size is None:
+                # unlimited dimension
+                if size == -1:
+                    size = chunksizes[ix]
+            elif size == -1 or size > dim_size:
+                size = dim_size
+            chunksizes[ix] = size
+
+        return tuple(chunksizes)
+
     def create_variable(self, var_name,
                         var_type,
                         dimensions,
                         description=None,
                         chunksizes=None,
                         simtk_unit=None,
-                        maskable=False):
+                        maskable=False,
+                        compression=None):
         """
         Create a new variable in the netCDF storage.
 
@@ -1087,6 +1332,11 @@ class NetCDFPlus(netCDF4.Dataset):
             exist and if they have not yet been written they are filled with
             a fill_value which is treated as a non-set variable. The created
             variable will interpret this values as `None` when returned
+        compression : dict or None
+            compression settings passed to `netCDF4.Dataset.createVariable`
+            (`zlib`, `complevel`, `shuffle`, `least_significant_digit`).
+            If None, the settings of the storage profile are used. Variable
+            length variables are not compressed.
         """
 
         ncfile = self
@@ -1135,6 +1385,16 @@ class NetCDFPlus(netCDF4.Dataset):
 
             chunksizes = tuple(chunksizes)
 
+        settings = self._profile_settings(self.profile, var_name)
+        chunksizes = self._profile_chunksizes(
+            chunksizes,
+            settings.get('chunksizes'),
+            [None if ncfile.dimensions[dim].isunlimited()
+             else len(ncfile.dimensions[dim]) for dim in dimensions]
+        )
+        if compression is None:
+            compression = settings.get('compression', {})
+
         if variable_length:
             vlen_t = ncfile.createVLType(nc_type, var_name + '_vlen')
             ncvar = ncfile.createVariable(
@@ -1145,6 +1405,7 @@ class NetCDFPlus(netCDF4.Dataset):
         else:
             ncvar = ncfile.createVariable(
                 var_name, nc_type, dimensions, chunksizes=chunksizes,
+                **compression
             )
 
         setattr(ncvar, 'var_type', var_type)
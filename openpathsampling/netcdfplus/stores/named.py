@@ -95,6 +95,7 @@ class NamedObjectStore(ObjectStore):
 
         """
         if not self._cached_all:
+            self.flush_write_buffer()
             idxs = range(len(self))
             jsons = self.variables['json'][:]
             names = self.variables['name'][:]
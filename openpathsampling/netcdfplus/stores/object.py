@@ -1,7 +1,11 @@
 import logging
+import time
 # from uuid import UUID
 from weakref import WeakValueDictionary
 
+import netCDF4
+import numpy as np
+
 from openpathsampling.netcdfplus.base import StorableNamedObject, StorableObject
 from openpathsampling.netcdfplus.cache import MaxCache, Cache, NoCache, \
     WeakLRUCache
@@ -61,6 +65,84 @@ class HashedList(dict):
         return self._list
 
 
+class WriteBehindBuffer(object):
+    """
+    Collects values written to single indices of a store's variables
+
+    Values are kept until :meth:`flush`, which writes each contiguous
+    range of indices of a variable with a single netCDF write. A flush
+    happens automatically after `max_objects` saved objects or when the
+    oldest pending value is older than `max_seconds`.
+
+    Parameters
+    ----------
+    max_objects : int
+        number of saved objects after which the buffer is flushed
+    max_seconds : float or None
+        maximal time a value is kept before the buffer is flushed
+    """
+    def __init__(self, max_objects=256, max_seconds=None):
+        self.max_objects = max_objects
+        self.max_seconds = max_seconds
+        self.pending = {}
+        self.end = 0
+        self._n_objects = 0
+        self._start_time = None
+
+    def __bool__(self):
+        return bool(self.pending)
+
+    __nonzero__ = __bool__
+
+    def add(self, delegate, idx, value):
+        if not self.pending:
+            self._start_time = time.time()
+        self.pending.setdefault(delegate, {})[idx] = value
+        self.end = max(self.end, idx + 1)
+
+    def get(self, delegate, idx):
+        """Pending (converted) value; raises KeyError if there is none"""
+        return self.pending[delegate][idx]
+
+    def object_saved(self):
+        """Count a saved object and flush if a threshold is reached"""
+        self._n_objects += 1
+        if self._n_objects >= self.max_objects:
+            self.flush()
+        elif self.max_seconds is not None and self._start_time is not None \
+                and time.time() - self._start_time > self.max_seconds:
+            self.flush()
+
+    @staticmethod
+    def _stack(variable, values):
+        if variable.dtype is str or isinstance(variable.datatype,
+                                               netCDF4.VLType):
+            data = np.empty(len(values), dtype=object)
+            for ix, value in enumerate(values):
+                data[ix] = value
+            return data
+        return np.asarray(values, dtype=variable.dtype)
+
+    def flush(self):
+        """Write all pending values"""
+        pending = self.pending
+        self.pending = {}
+        self._n_objects = 0
+        self._start_time = None
+        for delegate, values in pending.items():
+            indices = sorted(values)
+            start = 0
+            for pos in range(1, len(indices) + 1):
+                if pos == len(indices) \
+                        or indices[pos] != indices[pos - 1] + 1:
+                    run = indices[start:pos]
+                    delegate.variable[run[0]:run[-1] + 1] = self._stack(
+                        delegate.variable, [values[idx] for idx in run]
+                    )
+                    start = pos
+        self.end = 0
+
+
 class ObjectStore(StorableNamedObject):
     """
     Base Class for storing complex objects in a netCDF4 file. It holds a
@@ -171,6 +253,7 @@ class ObjectStore(StorableNamedObject):
         self._cached_all = False
         self.nestable = nestable
         self._created = False
+        self.write_buffer = None
 
         self.attribute_list = {}
         self.cv = {}
@@ -347,7 +430,53 @@ class ObjectStore(StorableNamedObject):
             number of stored objects
 
         """
-        return len(self.storage.dimensions[self.prefix])
+        return self._n_rows()
+
+    def _n_rows(self):
+        # rows in the file plus rows still waiting in the write buffer
+        length = len(self.storage.dimensions[self.prefix])
+        if self.write_buffer is not None:
+            length = max(length, self.write_buffer.end)
+        return length
+
+    def set_write_behind(self, max_objects=256, max_seconds=None):
+        """
+        Buffer the writes of new objects and write them in batches
+
+        Values written to single indices of this store's variables are
+        collected in a :class:`.WriteBehindBuffer` and written to the file
+        in one call per contiguous range of indices. Loading through the
+        store sees the buffered objects; the buffer is written on
+        `storage.sync()` and `storage.close()`, or when a threshold is hit.
+        Call `flush_write_buffer` before reading `storage.variables`
+        directly.
+
+        Parameters
+        ----------
+        max_objects : int or None
+            number of saved objects after which the buffer is written. If
+            `None` or 0, write-behind is switched off.
+        max_seconds : float or None
+            maximal time an object is kept in the buffer; it is checked
+            when objects are saved
+        """
+        self.flush_write_buffer()
+        if max_objects:
+            buffer = WriteBehindBuffer(max_objects, max_seconds)
+        else:
+            buffer = None
+
+        self.write_buffer = buffer
+        for name, delegate in self.storage.vars.items():
+            if name.startswith(self.prefix + '_') and \
+                    self.storage.variables[name].dimensions[:1] == \
+                    (self.prefix,):
+                delegate.write_buffer = buffer
+
+    def flush_write_buffer(self):
+        """Write all buffered values to the file"""
+        if self.write_buffer:
+            self.write_buffer.flush()
 
     def write(self, variable, idx, obj, attribute=None):
         if attribute is None:
@@ -453,6 +582,7 @@ class ObjectStore(StorableNamedObject):
     def cache_all(self):
         """Load all samples as fast as possible into the cache"""
         if not self._cached_all:
+            self.flush_write_buffer()
             idxs = range(len(self))
             jsons = self.variables['json'][:]
 
@@ -573,7 +703,8 @@ class ObjectStore(StorableNamedObject):
             chunksizes=None,
             description=None,
             simtk_unit=None,
-            maskable=False
+            maskable=False,
+            compression=None
     ):
         """
         Create a new variable in the netCDF storage. This is just a helper
@@ -616,6 +747,9 @@ class ObjectStore(StorableNamedObject):
             exist and if they have not yet been written they are filled with
             a fill_value which is treated as a non-set variable. The created
             variable will interpret this values as `None` when returned
+        compression : dict or None
+            compression settings for the variable; None uses the storage
+            profile, see :meth:`.NetCDFPlus.create_variable`
         """
 
         # add the main dimension to the var_type
@@ -668,7 +802,8 @@ class ObjectStore(StorableNamedObject):
             chunksizes=chunksizes,
             description=description,
             simtk_unit=simtk_unit,
-            maskable=maskable
+            maskable=maskable,
+            compression=compression
         )
 
     @property
@@ -765,6 +900,8 @@ class ObjectStore(StorableNamedObject):
                 'Loading of negative int should result in no object. '
                 'This should never happen!')
         else:
+            # stores may read the variables directly
+            self.flush_write_buffer()
             obj = self._load(n_idx)
 
         if self._log_debug:
@@ -903,6 +1040,9 @@ class ObjectStore(StorableNamedObject):
         # self.release_idx(n_idx)
         self._set_id(n_idx, obj)
 
+        if self.write_buffer is not None:
+            self.write_buffer.object_saved()
+
         return self.reference(obj)
 
     def __setitem__(self, key, value):
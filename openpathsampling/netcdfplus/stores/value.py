@@ -49,6 +49,10 @@ class ValueStore(ObjectStore):
     def __len__(self):
         return len(self.variables['value'])
 
+    def set_write_behind(self, max_objects=256, max_seconds=None):
+        # values are read back in chunks directly from the file
+        pass
+
     # ==========================================================================
     # LOAD/SAVE DECORATORS FOR CACHE HANDLING
     # ==========================================================================
@@ -543,7 +543,13 @@ class SampleMover(PathMover):
         # TODO: This isn't right. `bias` should be associated with the
         # change; not with each individual sample. ~~~DWHS
         for ens, sample in trial_dict.items():
-            valid = ens(sample.trajectory, candidate=self._trust_candidate)
+            cache = paths.Ensemble.verdict_cache
+            if cache is None:
+                valid = ens(sample.trajectory,
+                            candidate=self._trust_candidate)
+            else:
+                valid = cache(ens, sample.trajectory,
+                              candidate=self._trust_candidate)
             if not valid:
                 # one sample not valid reject
                 accepted = False
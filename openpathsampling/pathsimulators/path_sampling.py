@@ -218,32 +218,29 @@ class PathSampling(PathSimulator):
         decorrelated from their initial conditions. "Decorrelated" here is
         meant in the sense commonly used in one-way shooting: this runs
         until no configurations from the original trajectories remain.
+
+        See :class:`.DecorrelationHook` to monitor decorrelation during a
+        normal run.
         """
-        originals = {s.replica: s.trajectory for s in self.sample_set}
-        current = self.sample_set
+        tracker = hooks.DecorrelationHook(time_reversal=time_reversal)
+        tracker.reset(self.sample_set, self.step)
 
         # cache the output stream; force the primary `run` method to not
         # output anything
         original_output_stream = self.output_stream
         self.output_stream = open(os.devnull, 'w')
 
-        def n_correlated(sample_set, originals):
-            return sum([originals[r].is_correlated(sample_set[r],
-                                                   time_reversal)
-                        for r in originals])
-
         original_output_stream.write("Decorrelating trajectories....\n")
-        to_decorrelate = n_correlated(self.sample_set, originals)
-        # walrus in py38!
-        while to_decorrelate:
+        while not tracker.all_decorrelated:
             out_str = "Step {}: {} of {} trajectories still correlated\n"
             paths.tools.refresh_output(
-                out_str.format(self.step + 1, to_decorrelate, len(originals)),
+                out_str.format(self.step + 1, tracker.n_correlated,
+                               tracker.n_replicas),
                 refresh=False,
                 output_stream=original_output_stream
             )
             self.run(1)
-            to_decorrelate = n_correlated(self.sample_set, originals)
+            tracker.update(self.sample_set, self.step)
 
         paths.tools.refresh_output(
             "Step {}: All trajectories decorrelated!\n".format(self.step+1),
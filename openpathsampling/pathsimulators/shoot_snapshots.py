@@ -1,5 +1,11 @@
+import collections
 import logging
+import warnings
+
 import openpathsampling as paths
+from openpathsampling.analysis.shooting_point_analysis import (
+    proportion_interval, NoFramesInStateError
+)
 
 logger = logging.getLogger(__name__)
 from .path_simulator import PathSimulator, MCStep
@@ -108,6 +114,30 @@ class ShootFromSnapshotsSimulation(PathSimulator):
         self.attach_hook(hooks.StorageHook())
         self.attach_hook(hooks.ShootFromSnapshotsOutputHook())
 
+    def _shoot(self, start_snap):
+        """Single shot from ``start_snap``; returns the :class:`.MCStep`"""
+        sample_set = paths.SampleSet([
+            paths.Sample(replica=0,
+                         trajectory=paths.Trajectory([start_snap]),
+                         ensemble=self.starting_ensemble)
+        ])
+        sample_set.sanity_check()
+
+        # shoot_snapshot_task (start)
+        new_pmc = self.mover.move(sample_set)
+        samples = new_pmc.results
+        new_sample_set = sample_set.apply_samples(samples)
+
+        mcstep = MCStep(
+            simulation=self,
+            mccycle=self.step,
+            previous=sample_set,
+            active=new_sample_set,
+            change=new_pmc
+        )
+        # shoot_snapshot_task (end)
+        return mcstep
+
     def run(self, n_per_snapshot, as_chain=False):
         """Run the simulation.
 
@@ -144,26 +174,7 @@ class ShootFromSnapshotsSimulation(PathSimulator):
                 else:
                     start_snap = self.randomizer(snapshot)
 
-                sample_set = paths.SampleSet([
-                    paths.Sample(replica=0,
-                                 trajectory=paths.Trajectory([start_snap]),
-                                 ensemble=self.starting_ensemble)
-                ])
-                sample_set.sanity_check()
-
-                # shoot_snapshot_task (start)
-                new_pmc = self.mover.move(sample_set)
-                samples = new_pmc.results
-                new_sample_set = sample_set.apply_samples(samples)
-
-                mcstep = MCStep(
-                    simulation=self,
-                    mccycle=self.step,
-                    previous=sample_set,
-                    active=new_sample_set,
-                    change=new_pmc
-                )
-                # shoot_snapshot_task (end)
+                mcstep = self._shoot(start_snap)
 
                 hook_state = self.run_hooks(
                     'after_step', sim=self, step_number=step_number,
@@ -245,4 +256,114 @@ class CommittorSimulation(ShootFromSnapshotsSimulation):
         obj.direction = dct['direction']
         return obj
 
+    def run_adaptive(self, min_per_snapshot=10, max_per_snapshot=100,
+                     max_shots=None, max_width=0.2, confidence=0.95,
+                     method='wilson'):
+        """Run the committor simulation, adapting the shots per snapshot.
+
+        Each snapshot first gets ``min_per_snapshot`` shots. After that,
+        shots go one at a time to the snapshot with the widest confidence
+        interval for its committor (see :func:`.proportion_interval`),
+        until every snapshot either has an interval no wider than
+        ``max_width`` or has ``max_per_snapshot`` shots, or until
+        ``max_shots`` shots have been run in total. Snapshots with a
+        committor close to 0 or 1 therefore need far fewer shots than
+        snapshots near the transition state.
+
+        The steps are stored and reported to hooks as in :meth:`.run`; in
+        ``step_info``, the number of steps is ``max_per_snapshot``. Shots
+        always start from the original snapshot (no ``as_chain``). A shot
+        that does not end in any state gives a warning and only counts
+        toward the limits.
+
+        Parameters
+        ----------
+        min_per_snapshot : int
+            number of shots for every snapshot before adapting
+        max_per_snapshot : int
+            maximum number of shots for a single snapshot
+        max_shots : int or None
+            maximum total number of shots; None (default) for no limit
+            beyond ``max_per_snapshot``
+        max_width : float
+            a snapshot is resolved once the confidence interval of its
+            committor for every state is at most this wide
+        confidence : float
+            confidence level of the interval
+        method : str
+            'wilson' (Wilson score interval) or 'beta' (Bayesian posterior
+            with a uniform prior); see :func:`.proportion_interval`
+
+        Returns
+        -------
+        :class:`.ShootingPointAnalysis`
+            the analysis of the shots run here, with uneven numbers of
+            shots per snapshot
+        """
+        analysis = paths.ShootingPointAnalysis(None, self.states)
+        n_snapshots = len(self.initial_snapshots)
+        counts = [collections.Counter() for _ in range(n_snapshots)]
+        n_shots = [0] * n_snapshots
+        # the first shots go round the snapshots in order
+        n_initial = min(min_per_snapshot, max_per_snapshot)
+        schedule = collections.deque(
+            snap_num for snap_num in range(n_snapshots)
+            for _ in range(n_initial)
+        )
+        hook_state = None
+        self.step = 0
+        self.run_hooks('before_simulation', sim=self,
+                       n_per_snapshot=max_per_snapshot)
+        while max_shots is None or self.step < max_shots:
+            if schedule:
+                snap_num = schedule.popleft()
+            else:
+                widths = {
+                    k: self._committor_interval_width(counts[k], confidence,
+                                                      method)
+                    for k in range(n_snapshots)
+                    if n_shots[k] < max_per_snapshot
+                }
+                unresolved = [k for k in widths if widths[k] > max_width]
+                if not unresolved:
+                    break
+                # widest interval first; ties go to the earlier snapshot
+                snap_num = min(unresolved, key=lambda k: (-widths[k], k))
+
+            snapshot = self.initial_snapshots[snap_num]
+            step_number = self.step
+            step_info = (snap_num, n_snapshots, n_shots[snap_num],
+                         max_per_snapshot)
+            self.run_hooks('before_step', sim=self,
+                           step_number=step_number, step_info=step_info,
+                           state=snapshot)
+            start_snap = self.randomizer(snapshot)
+            mcstep = self._shoot(start_snap)
+            try:
+                final_states = analysis.analyze_single_step(mcstep)
+            except NoFramesInStateError as err:
+                # the shot only counts toward the budget
+                warnings.warn(str(err))
+            else:
+                counts[snap_num].update(final_states)
+
+            hook_state = self.run_hooks(
+                'after_step', sim=self, step_number=step_number,
+                step_info=step_info, state=start_snap, results=mcstep,
+                hook_state=hook_state
+            )
+            self.step += 1
+            n_shots[snap_num] += 1
+
+        self.run_hooks('after_simulation', sim=self, hook_state=hook_state)
+        return analysis
 
+    def _committor_interval_width(self, counter, confidence, method):
+        """Widest committor confidence interval over the states"""
+        n_total = sum(counter.values())
+        widths = []
+        for state in self.states:
+            (low, high) = proportion_interval(counter[state], n_total,
+                                              confidence, method)
+            widths.append(high - low)
+        return max(widths)
@@ -19,6 +19,14 @@ else:
 logger = logging.getLogger(__name__)
 
 
+def _in_ensemble(ensemble, trajectory):
+    # `ensemble(trajectory)`, from the verdict cache if it is enabled
+    cache = paths.Ensemble.verdict_cache
+    if cache is None:
+        return ensemble(trajectory)
+    return cache(ensemble, trajectory)
+
+
 class SampleKeyError(Exception):
     def __init__(self, key, sample, sample_key):
         self.key = key
@@ -250,7 +258,7 @@ class SampleSet(StorableObject, Mapping):
             logger.info("Checking sanity of " + repr(sample.ensemble) +
                         " with " + str(sample.trajectory))
             try:
-                assert(sample.ensemble(sample.trajectory))
+                assert(_in_ensemble(sample.ensemble, sample.trajectory))
             except AssertionError as e:
                 failmsg = ("Trajectory does not match ensemble for replica "
                            + str(sample.replica))
@@ -876,7 +884,8 @@ class Sample(StorableObject):
                 self._valid = True
             else:
                 if self.ensemble is not None:
-                    self._valid = self.ensemble(self.trajectory)
+                    self._valid = _in_ensemble(self.ensemble,
+                                               self.trajectory)
                 else:
                     # no ensemble means ALL ???
                     self._valid = True
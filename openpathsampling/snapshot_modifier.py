@@ -7,10 +7,27 @@ import numpy as np
 
 from openpathsampling.netcdfplus import StorableNamedObject
 from openpathsampling.deprecations import SNAPSHOTMODIFIER_PROB_RAT
+from openpathsampling.integration_tools import unit, is_simtk_quantity
+from openpathsampling.rng import default_rng
 
 logger = logging.getLogger(__name__)
 
 
+def _strip_units(values):
+    """Array of values (without units) and the unit (None if no units).
+
+    Handles quantities wrapping arrays, as well as lists of quantities.
+    """
+    if is_simtk_quantity(values):
+        return np.asarray(values.value_in_unit(values.unit)), values.unit
+    values = list(values)
+    if values and is_simtk_quantity(values[0]):
+        value_unit = values[0].unit
+        return (np.array([val.value_in_unit(value_unit) for val in values]),
+                value_unit)
+    return np.asarray(values), None
+
+
 class SnapshotModifier(StorableNamedObject):
     """Abstract class for snapshot modification.
 
@@ -153,6 +170,10 @@ class RandomVelocities(SnapshotModifier):
 
         beta = 1.0 / (300.0 * u.kelvin * u.BOLTZMANN_CONSTANT_kB)
 
+    Random numbers are drawn from the OPS random number generator (see
+    :func:`.default_rng`); set the ``_rng`` attribute to use a different
+    (e.g., seeded) generator.
+
     Parameters
     ----------
     beta : float or openmm.unit.Quantity
@@ -164,35 +185,69 @@ class RandomVelocities(SnapshotModifier):
         the subset to use (default None, meaning use all). The values
         select along the first axis of the input array. For example, in a
         typical shape=(n_atoms, 3) array, this will pick the atoms.
+    n_pregenerated : int
+        if greater than 0, normal random numbers are generated in batches
+        large enough for this many randomizations, instead of once per
+        randomization. This reduces overhead when randomizing many times
+        (e.g., in committor simulations). Default 0.
     """
-    def __init__(self, beta=None, engine=None, subset_mask=None):
+    def __init__(self, beta=None, engine=None, subset_mask=None,
+                 n_pregenerated=0):
         super(RandomVelocities, self).__init__(subset_mask)
         self.beta = beta
         self.engine = engine
+        self.n_pregenerated = n_pregenerated
+        self._rng = default_rng()
+        self._pool = np.empty(0)
+
+    def _standard_normal(self, shape):
+        n_draws = int(np.prod(shape))
+        if not self.n_pregenerated:
+            return self._rng.standard_normal(size=shape)
+
+        if len(self._pool) < n_draws:
+            self._pool = self._rng.standard_normal(
+                size=n_draws * self.n_pregenerated
+            )
+        draws = self._pool[:n_draws]
+        self._pool = self._pool[n_draws:]
+        return draws.reshape(shape)
 
     def _default_random_velocities(self, snapshot, beta, subset):
         if beta is None:
             raise RuntimeError("Engine can't use RandomVelocities")
 
         # raises AttributeError is snapshot doesn't support velocities
-        velocities = copy.copy(snapshot.velocities)  # copy.copy for units
-        vel_subset = self.extract_subset(velocities, subset)
+        velocities, vel_unit = _strip_units(snapshot.velocities)
+        velocities = np.array(velocities)  # copy; we modify in place
 
         # raises AttributeError if snapshot doesn't support masses feature
-        all_masses = snapshot.masses
-        masses = self.extract_subset(all_masses, subset)
-
-        n_spatial = len(vel_subset[0])
-        n_atoms = len(vel_subset)
-        for atom_i in range(n_atoms):
-            radicand = 1.0 / (self.beta * masses[atom_i])
-            try:  # preference that masses is quantity or np.array
-                sigma = radicand.sqrt()
-            except AttributeError:  # if masses regular list
-                sigma = np.sqrt(radicand)
-            vel_subset[atom_i] = sigma * np.random.normal(size=n_spatial)
-
-        self.apply_to_subset(velocities, vel_subset, subset)
+        masses, mass_unit = _strip_units(snapshot.masses)
+        if subset is None:
+            masses = masses[:len(velocities)]
+        else:
+            masses = masses[subset]
+
+        # variance is (1 / beta / mass); get units out of the way once
+        variance_scale = 1.0 / (beta * mass_unit) \
+                if mass_unit is not None else 1.0 / beta
+        if vel_unit is not None:
+            variance_scale = variance_scale.value_in_unit(vel_unit**2)
+
+        # one sigma per atom (or per degree of freedom, if masses are)
+        n_atoms = len(masses)
+        sigma = np.sqrt(variance_scale / masses).reshape(n_atoms, -1)
+        n_spatial = velocities.shape[1]
+        random_vels = sigma * self._standard_normal((n_atoms, n_spatial))
+
+        if subset is None:
+            velocities[:] = random_vels
+        else:
+            velocities[subset] = random_vels
+
+        if vel_unit is not None:
+            velocities = unit.Quantity(velocities, vel_unit)
+
         new_snap = snapshot.copy_with_replacement(velocities=velocities)
 
         # applying constraints, if they exist
@@ -93,7 +93,7 @@ class DistributedUUIDStorage(object):
         self.stores = {}
 
         if storages is not None:
-            map(self.add, storages)
+            self.add(list(storages))
 
     def add(self, storage):
         """
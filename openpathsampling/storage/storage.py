@@ -41,6 +41,22 @@ class Storage(NetCDFPlus):
     template : :class:`openpathsampling.Snapshot`
         a Snapshot instance that contains a reference to a Topology, the
         number of atoms and used units
+    fallback : :class:`.Storage`
+        the storage to load objects from that are not in this storage
+    profile : str or None
+        chunking and compression of the snapshot and CV data, one of
+
+        * `'default'`: frames are stored in chunks of 256, uncompressed
+        * `'write-optimized'`: one frame per chunk, uncompressed; fastest
+          for saving and for loading single snapshots
+        * `'analysis-optimized'`: atom-major chunks of 1024 frames and 16
+          atoms, and large chunks for CV values; fastest for reading the
+          time series of a few atoms or of a CV
+        * `'archival-compressed'`: frame-major chunks, compressed with
+          zlib (lossless); smallest files
+
+        None uses the profile the file was created with. See
+        :meth:`.NetCDFPlus.rewrite_with_profile` to convert existing files.
     """
 
     @property
@@ -50,18 +66,43 @@ class Storage(NetCDFPlus):
 
     USE_FEATURE_SNAPSHOTS = True
 
+    _archival_compression = {'zlib': True, 'complevel': 6, 'shuffle': True}
+
+    storage_profiles = {
+        'default': [],
+        'write-optimized': [
+            ('*_coordinates', {'chunksizes': (1, -1, -1)}),
+            ('*_velocities', {'chunksizes': (1, -1, -1)}),
+        ],
+        'analysis-optimized': [
+            ('*_coordinates', {'chunksizes': (1024, 16, -1)}),
+            ('*_velocities', {'chunksizes': (1024, 16, -1)}),
+            ('cv*_value', {'chunksizes': (65536,)}),
+        ],
+        'archival-compressed': [
+            ('*_coordinates', {'chunksizes': (64, -1, -1),
+                               'compression': _archival_compression}),
+            ('*_velocities', {'chunksizes': (64, -1, -1),
+                              'compression': _archival_compression}),
+            ('cv*_value', {'chunksizes': (65536,),
+                           'compression': _archival_compression}),
+        ],
+    }
+
     def __init__(
             self,
             filename,
             mode=None,
             template=None,
-            fallback=None):
+            fallback=None,
+            profile=None):
 
         self._template = template
         super(Storage, self).__init__(
             filename,
             mode,
-            fallback=fallback)
+            fallback=fallback,
+            profile=profile)
 
     def _create_simplifier(self):
         super(Storage, self)._create_simplifier()
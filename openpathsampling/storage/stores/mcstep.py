@@ -1,14 +1,155 @@
+import numpy as np
+import netCDF4
+
 from openpathsampling.netcdfplus import VariableStore
 from openpathsampling.pathsimulators import MCStep
 
 
+class StepSummary(object):
+    """Compact per-step index of a stored path sampling simulation.
+
+    Holds, for each step in an :class:`.MCStepStore`, the storage indices of
+    the objects most analyses need, so that those analyses can run without
+    loading the :class:`.SampleSet` and :class:`.MoveChange` of every step.
+    All indices refer to the stores of ``storage``; ``-1`` marks a missing
+    entry (no mover, replica not active, or object not stored).
+
+    Attributes
+    ----------
+    storage : :class:`.Storage`
+        the storage the indices refer to
+    mccycle : np.ndarray of int, shape (n_steps,)
+        MC cycle number of each step
+    mover : np.ndarray of int, shape (n_steps,)
+        index of the canonical mover in ``storage.pathmovers``
+    accepted : np.ndarray of bool, shape (n_steps,)
+        whether the canonical change was accepted
+    replicas : np.ndarray of int, shape (n_replicas,)
+        sorted replica IDs that appear in any step
+    ensembles : np.ndarray of int, shape (n_steps, n_replicas)
+        index in ``storage.ensembles`` of the ensemble of each replica
+    trajectories : np.ndarray of int, shape (n_steps, n_replicas)
+        index in ``storage.trajectories`` of the trajectory of each replica
+    """
+    def __init__(self, storage, mccycle, mover, accepted, replicas,
+                 ensembles, trajectories):
+        self.storage = storage
+        self.mccycle = mccycle
+        self.mover = mover
+        self.accepted = accepted
+        self.replicas = replicas
+        self.ensembles = ensembles
+        self.trajectories = trajectories
+
+    @classmethod
+    def from_rows(cls, storage, rows):
+        """Create from a list of rows as returned by
+        :meth:`.MCStepStore.summary_row`
+        """
+        n_steps = len(rows)
+        replicas = np.unique(np.concatenate(
+            [np.asarray(row[3], dtype=int) for row in rows] +
+            [np.zeros(0, dtype=int)]
+        ))
+        ensembles = np.full((n_steps, len(replicas)), -1, dtype=int)
+        trajectories = np.full((n_steps, len(replicas)), -1, dtype=int)
+        for step_idx, row in enumerate(rows):
+            cols = np.searchsorted(replicas, np.asarray(row[3], dtype=int))
+            ensembles[step_idx, cols] = row[4]
+            trajectories[step_idx, cols] = row[5]
+
+        return cls(
+            storage=storage,
+            mccycle=np.array([row[0] for row in rows], dtype=int),
+            mover=np.array([row[1] for row in rows], dtype=int),
+            accepted=np.array([row[2] for row in rows], dtype=bool),
+            replicas=replicas,
+            ensembles=ensembles,
+            trajectories=trajectories
+        )
+
+    @staticmethod
+    def for_steps(steps):
+        """Summary for ``steps`` if it is a complete :class:`.MCStepStore`
+
+        Parameters
+        ----------
+        steps : iterable of :class:`.MCStep`
+            the steps to analyze
+
+        Returns
+        -------
+        :class:`.StepSummary` or None
+            the summary of all steps in the store, or None if ``steps`` is
+            not a store (e.g., a list or a slice of steps)
+        """
+        try:
+            summary = steps.summary
+        except AttributeError:
+            return None
+        return summary()
+
+    def __len__(self):
+        return len(self.mccycle)
+
+    def replica_column(self, replica):
+        """Column of ``replica`` in ``ensembles`` and ``trajectories``
+
+        Raises
+        ------
+        KeyError
+            if the replica is not active in any step
+        """
+        col = int(np.searchsorted(self.replicas, replica))
+        if col == len(self.replicas) or self.replicas[col] != replica:
+            raise KeyError(replica)
+        return col
+
+    def ensemble_column(self, ensemble_idx):
+        """Trajectory index for the given ensemble index in each step"""
+        # an ensemble is occupied by exactly one replica in each step
+        mask = self.ensembles == ensemble_idx
+        result = np.full(len(self), -1, dtype=int)
+        step_idxs, cols = np.nonzero(mask)
+        result[step_idxs] = self.trajectories[step_idxs, cols]
+        return result
+
+    def load(self, store_name, indices):
+        """Load the objects for the given indices from a store.
+
+        Parameters
+        ----------
+        store_name : str
+            name of the store, e.g. ``'ensembles'``
+        indices : iterable of int
+            indices to load; ``-1`` maps to None
+
+        Returns
+        -------
+        dict of int: :class:`.StorableObject`
+            the loaded object for each distinct index
+        """
+        store = getattr(self.storage, store_name)
+        return {int(idx): store[int(idx)] if idx >= 0 else None
+                for idx in set(indices)}
+
+
 class MCStepStore(VariableStore):
+    summary_variables = ['summary_mover', 'summary_accepted',
+                         'summary_replicas', 'summary_ensembles',
+                         'summary_trajectories']
+
     def __init__(self):
         super(MCStepStore, self).__init__(
             MCStep,
             ['simulation', 'mccycle', 'previous', 'active', 'change']
         )
 
+    def _save(self, obj, idx):
+        super(MCStepStore, self)._save(obj, idx)
+        if self.has_summary:
+            self._write_summary(idx, self.summary_row(obj))
+
     def initialize(self, units=None):
         super(MCStepStore, self).initialize()
 
@@ -18,3 +159,131 @@ class MCStepStore(VariableStore):
         self.create_variable('previous', 'obj.samplesets')
         self.create_variable('simulation', 'obj.pathsimulators')
         self.create_variable('mccycle', 'int')
+
+        self._create_summary_variables()
+
+    def _create_summary_variables(self):
+        self.create_variable(
+            'summary_mover', 'numpy.int32',
+            description="index of the canonical mover of step '{idx}'.")
+        self.create_variable(
+            'summary_accepted', 'numpy.int8',
+            description="1 if the canonical change of step '{idx}' was "
+                        "accepted, else 0.")
+        self.create_variable(
+            'summary_replicas', 'numpy.int32', dimensions='...',
+            description="replica IDs of the active samples of step '{idx}'.")
+        self.create_variable(
+            'summary_ensembles', 'numpy.int32', dimensions='...',
+            description="ensemble indices of the active samples of step "
+                        "'{idx}'.")
+        self.create_variable(
+            'summary_trajectories', 'numpy.int32', dimensions='...',
+            description="trajectory indices of the active samples of step "
+                        "'{idx}'.")
+
+    @property
+    def has_summary(self):
+        """bool : whether this file contains the step summary variables"""
+        return all(var in self.variables for var in self.summary_variables)
+
+    def _store_index(self, store_name, obj):
+        if obj is None:
+            return -1
+        store = getattr(self.storage, store_name)
+        idx = store.index.get(obj.__uuid__)
+        return -1 if idx is None else idx
+
+    def summary_row(self, step):
+        """Summary data of a single step.
+
+        Returns
+        -------
+        tuple
+            (mccycle, mover index, accepted, replicas, ensemble indices,
+            trajectory indices)
+        """
+        canonical = step.change.canonical
+        samples = list(step.active)
+        return (
+            step.mccycle,
+            self._store_index('pathmovers', canonical.mover),
+            bool(canonical.accepted),
+            [s.replica for s in samples],
+            [self._store_index('ensembles', s.ensemble) for s in samples],
+            [self._store_index('trajectories', s.trajectory)
+             for s in samples]
+        )
+
+    def _write_summary(self, idx, row):
+        _, mover, accepted, replicas, ensembles, trajectories = row
+        self.variables['summary_mover'][idx] = mover
+        self.variables['summary_accepted'][idx] = int(accepted)
+        self.variables['summary_replicas'][idx] = \
+            np.array(replicas, dtype=np.int32)
+        self.variables['summary_ensembles'][idx] = \
+            np.array(ensembles, dtype=np.int32)
+        self.variables['summary_trajectories'][idx] = \
+            np.array(trajectories, dtype=np.int32)
+
+    def _missing_summary(self):
+        """Indices of steps without a stored summary row"""
+        n_steps = len(self)
+        if not self.has_summary:
+            return list(range(n_steps))
+
+        var = self.variables['summary_accepted']
+        fill = getattr(var, '_FillValue', netCDF4.default_fillvals['i1'])
+        written = np.zeros(n_steps, dtype=bool)
+        values = np.ma.filled(var[:n_steps], fill)
+        written[:len(values)] = values != fill
+        return list(np.nonzero(~written)[0])
+
+    def backfill_summary(self):
+        """Write the step summary for steps that don't have it yet.
+
+        Use this to add the summary to files written by older versions;
+        the file must be writable. This loads each missing step once.
+
+        Returns
+        -------
+        int
+            number of steps that were added to the summary
+        """
+        if not self.has_summary:
+            self._create_summary_variables()
+
+        missing = self._missing_summary()
+        for idx in missing:
+            self._write_summary(idx, self.summary_row(self[int(idx)]))
+        return len(missing)
+
+    def summary(self):
+        """:class:`.StepSummary` of all steps in this store.
+
+        Rows that are not stored in the file (e.g., in files from older
+        versions opened read-only) are calculated from the steps.
+        """
+        n_steps = len(self)
+        missing = set(self._missing_summary())
+        def read(var_name):
+            return np.ma.getdata(self.variables[var_name][:n_steps])
+
+        mccycles = read('mccycle')
+        if len(missing) < n_steps:
+            movers = read('summary_mover')
+            accepted = read('summary_accepted')
+            replicas = read('summary_replicas')
+            ensembles = read('summary_ensembles')
+            trajectories = read('summary_trajectories')
+
+        rows = []
+        for idx in range(n_steps):
+            if idx in missing:
+                rows.append(self.summary_row(self[idx]))
+            else:
+                rows.append((mccycles[idx], movers[idx], accepted[idx],
+                             replicas[idx], ensembles[idx],
+                             trajectories[idx]))
+
+        return StepSummary.from_rows(self.storage, rows)
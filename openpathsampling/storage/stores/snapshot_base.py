@@ -152,6 +152,9 @@ class BaseSnapshotStore(IndexedObjectStore):
 
         self._set_id(n_idx, obj)
 
+        if self.write_buffer is not None:
+            self.write_buffer.object_saved()
+
         return idx
 
     def _save(self, snapshot, idx):
@@ -210,4 +213,4 @@ class BaseSnapshotStore(IndexedObjectStore):
             return None
 
     def __len__(self):
-        return len(self.storage.dimensions[self.prefix]) * 2
+        return self._n_rows() * 2
@@ -1,4 +1,6 @@
 import logging
+import multiprocessing
+import os
 from uuid import UUID
 
 import openpathsampling.engines as peng
@@ -187,6 +189,7 @@ class SnapshotWrapperStore(ObjectStore):
                 'Loading of negative int should result in no object. '
                 'This should never happen!')
         else:
+            self.flush_write_buffer()
             obj = self._load(n_idx)
 
         logger.debug(
@@ -225,7 +228,7 @@ class SnapshotWrapperStore(ObjectStore):
             return snap
 
     def __len__(self):
-        return len(self.storage.dimensions[self.prefix]) * 2
+        return self._n_rows() * 2
 
     def initialize(self):
         super(SnapshotWrapperStore, self).initialize()
@@ -325,9 +328,9 @@ class SnapshotWrapperStore(ObjectStore):
 
         if n_idx is not None:
             # snapshot is mentioned
-            store_idx = int(self.variables['store'][n_idx // 2])
-            if not store_idx == -1:
-                # and stored
+            store_idx = self.vars['store'][n_idx // 2]
+            if store_idx is not None:
+                # and stored (the index getter turns -1 into None)
                 return self.reference(obj)
 
         if self.only_mention:
@@ -377,6 +380,9 @@ class SnapshotWrapperStore(ObjectStore):
 
         self.cache[n_idx] = obj
 
+        if self.write_buffer is not None:
+            self.write_buffer.object_saved()
+
         return self.reference(obj)
 
     def _save(self, obj, n_idx):
@@ -484,12 +490,7 @@ class SnapshotWrapperStore(ObjectStore):
                             value = None
 
                     if value is not None:
-                        n_idx = cv_store.free()
-
-                        cv_store.vars['value'][n_idx] = value
-                        cv_store.vars['index'][n_idx] = pos
-                        cv_store.index[pos] = n_idx
-                        cv_store.cache[n_idx] = value
+                        self._store_cv_value(cv_store, pos, value)
 
                 if not cv_store.time_reversible:
                     pos += 1
@@ -513,12 +514,7 @@ class SnapshotWrapperStore(ObjectStore):
                                 value = None
 
                         if value is not None:
-                            n_idx = cv_store.free()
-
-                            cv_store.vars['value'][n_idx] = value
-                            cv_store.vars['index'][n_idx] = pos
-                            cv_store.index[pos] = n_idx
-                            cv_store.cache[n_idx] = value
+                            self._store_cv_value(cv_store, pos, value)
 
     def sync_cv(self, cv):
         """
@@ -555,12 +551,134 @@ class SnapshotWrapperStore(ObjectStore):
                         # this value is stored so skip it
                         continue
 
-                    n_idx = cv_store.free()
+                    self._store_cv_value(cv_store, pos, value)
+
+    @staticmethod
+    def _store_cv_value(cv_store, pos, value):
+        # append a value to an incomplete CV store
+        n_idx = cv_store.free()
+
+        cv_store.vars['value'][n_idx] = value
+        cv_store.vars['index'][n_idx] = pos
+        cv_store.index[pos] = n_idx
+        cv_store.cache[n_idx] = value
+
+    def complete_cv_parallel(self, cv, n_workers=None, chunksize=1000,
+                             mp_context='spawn'):
+        """
+        Compute all missing values of a CV in worker processes and store them
+
+        The positions of missing values are split into chunks of
+        ``chunksize`` snapshots. Each worker opens the file read-only once,
+        loads the CV, and evaluates it for the snapshots of the chunks it is
+        given. The values are sent back and written by this process only,
+        after all workers are done, since the file must not change while
+        they read it. If the run is interrupted, the values that were
+        already computed are written, and calling this again only computes
+        the values that are still missing.
+
+        Like :meth:`complete_cv` this only applies to CVs with
+        ``allow_incomplete``; complete stores are filled when they are
+        created.
+
+        Since workers are started with ``spawn`` by default, scripts that
+        call this need the usual ``if __name__ == '__main__':`` guard. The
+        CV must be loadable from the storage, i.e. its function must be
+        serializable.
+
+        Parameters
+        ----------
+        cv : :obj:`openpathsampling.CollectiveVariable`
+        n_workers : int or None
+            number of worker processes; None uses the number of CPUs and 1
+            evaluates in this process without reopening the file
+        chunksize : int
+            number of snapshots evaluated per task
+        mp_context : str
+            start method of the worker processes, see
+            :func:`multiprocessing.get_context`
+
+        Returns
+        -------
+        int
+            the number of values that were computed
+        """
+        if cv not in self.attribute_list:
+            return 0
+
+        cv_store = self.attribute_list[cv]
+
+        if not cv_store.allow_incomplete:
+            return 0
+
+        # values in the memory cache are cheaper to store than to compute
+        self.sync_cv(cv)
+
+        n_pairs = len(self) // 2
+        if cv_store.time_reversible:
+            # one value per snapshot pair at the position of the pair
+            missing = [2 * pos for pos in range(n_pairs)
+                       if pos not in cv_store.index]
+        else:
+            missing = [pos for pos in range(2 * n_pairs)
+                       if pos not in cv_store.index]
 
-                    cv_store.vars['value'][n_idx] = value
-                    cv_store.vars['index'][n_idx] = pos
-                    cv_store.index[pos] = n_idx
-                    cv_store.cache[n_idx] = value
+        if not missing:
+            return 0
+
+        chunks = [missing[i:i + chunksize]
+                  for i in range(0, len(missing), chunksize)]
+
+        if n_workers == 1:
+            results = (_cv_values(self.storage, cv, chunk)
+                       for chunk in chunks)
+            self._complete_from_results(cv_store, results)
+        else:
+            # workers see the file as it is on disk
+            self.storage.sync()
+            context = multiprocessing.get_context(mp_context)
+            # HDF5 does not let other processes open a file that this
+            # process has open for writing, unless they start with file
+            # locking switched off. Reading is safe here, since the file
+            # does not change until all workers are done.
+            file_locking = os.environ.get('HDF5_USE_FILE_LOCKING')
+            os.environ['HDF5_USE_FILE_LOCKING'] = 'FALSE'
+            try:
+                pool = context.Pool(
+                    n_workers,
+                    initializer=_init_cv_worker,
+                    initargs=(os.path.abspath(self.storage.filename),
+                              self.storage.cvs.index[cv.__uuid__])
+                )
+            finally:
+                if file_locking is None:
+                    del os.environ['HDF5_USE_FILE_LOCKING']
+                else:
+                    os.environ['HDF5_USE_FILE_LOCKING'] = file_locking
+            results = []
+            try:
+                for chunk_results in pool.imap_unordered(_evaluate_cv_chunk,
+                                                         chunks):
+                    results.append(chunk_results)
+            finally:
+                pool.terminate()
+                pool.join()
+                # only write once no worker reads the file anymore
+                self._complete_from_results(cv_store, results)
+
+        return len(missing)
+
+    def _complete_from_results(self, cv_store, results):
+        for chunk_results in results:
+            for idx, value in chunk_results:
+                if value is None:
+                    continue
+
+                pos = idx // 2 if cv_store.time_reversible else idx
+                self._store_cv_value(cv_store, pos, value)
+
+            # each finished chunk is on disk, so an interrupted run resumes
+            self.storage.sync()
 
     @staticmethod
     def _get_cv_name(cv_idx):
@@ -764,3 +882,53 @@ class SnapshotWrapperStore(ObjectStore):
     #         return [self.load(idx) for idx in item]
     #     elif item is Ellipsis:
     #         return iter(self)
+
+
+def _cv_values(storage, cv, snapshot_indices):
+    snapshots = [storage.snapshots[idx] for idx in snapshot_indices]
+    if cv._eval_dict:
+        values = cv._eval_dict(snapshots)
+    else:
+        values = [None] * len(snapshots)
+
+    return list(zip(snapshot_indices, values))
+
+
+# the storage and CV of a worker process, see `_init_cv_worker`
+_worker_storage = None
+_worker_cv = None
+
+
+def _init_cv_worker(filename, cv_idx):
+    """
+    Open the file read-only once per worker process
+
+    Parameters
+    ----------
+    filename : str
+        the file to read from
+    cv_idx : int
+        index of the CV in the `cvs` store
+    """
+    global _worker_storage, _worker_cv
+    from openpathsampling.storage import Storage
+
+    _worker_storage = Storage(filename, mode='r')
+    _worker_cv = _worker_storage.cvs[cv_idx]
+
+
+def _evaluate_cv_chunk(snapshot_indices):
+    """
+    Evaluate the CV of a worker process for stored snapshots
+
+    Parameters
+    ----------
+    snapshot_indices : list of int
+        indices of the snapshots in the `snapshots` store
+
+    Returns
+    -------
+    list of tuple
+        pairs of snapshot index and CV value
+    """
+    return _cv_values(_worker_storage, _worker_cv, snapshot_indices)
@@ -372,3 +372,164 @@ class TestFunctionCV(object):
 
             if os.path.isfile(fname):
                 os.remove(fname)
+
+
+class TestCompleteCVParallel(object):
+    def setup_method(self):
+        self.fname = data_filename("cv_parallel_test.nc")
+        if os.path.isfile(self.fname):
+            os.remove(self.fname)
+
+        self.traj = make_1d_traj([float(i) for i in range(10)])
+        self.storage = paths.Storage(self.fname, "w")
+        self.storage.save(self.traj)
+
+    def teardown_method(self):
+        self.storage.close()
+        if os.path.isfile(self.fname):
+            os.remove(self.fname)
+
+    def _check_values(self, cv, n_values):
+        store = self.storage.cvs.cache_store(cv)
+        assert len(store.vars['value']) == n_values
+        for snap in self.traj:
+            assert store[snap] == cv(snap)
+
+    @pytest.mark.parametrize('n_workers', [1, 2])
+    def test_complete_cv_parallel(self, n_workers):
+        cv = paths.CoordinateFunctionCV(
+            'x2', lambda snap: snap.coordinates[0][0] ** 2
+        ).with_diskcache(allow_incomplete=True)
+        self.storage.save(cv)
+
+        snapshots = self.storage.snapshots
+        # storing the CV evaluates it for the template snapshot
+        snapshots.sync_cv(cv)
+        n_stored = len(self.storage.cvs.cache_store(cv).vars['value'])
+        n_done = snapshots.complete_cv_parallel(cv, n_workers=n_workers,
+                                                chunksize=3)
+        assert n_done == 10 - n_stored
+        self._check_values(cv, 10)
+
+        # nothing left to do
+        assert snapshots.complete_cv_parallel(cv, n_workers=n_workers) == 0
+
+    def test_more_chunks_than_workers(self):
+        cv = paths.CoordinateFunctionCV(
+            'x2', lambda snap: snap.coordinates[0][0] ** 2
+        ).with_diskcache(allow_incomplete=True)
+        self.storage.save(cv)
+
+        snapshots = self.storage.snapshots
+        snapshots.sync_cv(cv)
+        n_stored = len(self.storage.cvs.cache_store(cv).vars['value'])
+        data_dir = sorted(os.listdir(os.path.dirname(self.fname)))
+        file_locking = os.environ.get('HDF5_USE_FILE_LOCKING')
+        # one snapshot per chunk: each worker evaluates several chunks
+        n_done = snapshots.complete_cv_parallel(cv, n_workers=2,
+                                                chunksize=1)
+        assert n_done == 10 - n_stored
+        # the workers read the file itself, without making copies
+        assert sorted(os.listdir(os.path.dirname(self.fname))) == data_dir
+        assert os.environ.get('HDF5_USE_FILE_LOCKING') == file_locking
+        self._check_values(cv, 10)
+
+        # the values are on disk
+        self.storage.close()
+        self.storage = paths.Storage(self.fname, "r")
+        cv = self.storage.cvs.load(cv.__uuid__)
+        self._check_values(cv, 10)
+
+    def test_resume(self):
+        cv = paths.CoordinateFunctionCV(
+            'x2', lambda snap: snap.coordinates[0][0] ** 2
+        ).with_diskcache(allow_incomplete=True)
+        self.storage.save(cv)
+
+        # values from an interrupted run (or the memory cache) are kept
+        _ = cv(self.traj[:4])
+        snapshots = self.storage.snapshots
+        snapshots.sync_cv(cv)
+        assert len(self.storage.cvs.cache_store(cv).vars['value']) == 4
+        assert snapshots.complete_cv_parallel(cv, n_workers=1) == 6
+        self._check_values(cv, 10)
+
+    def test_not_time_reversible(self):
+        cv = paths.FunctionCV(
+            'v', lambda snap: snap.velocities[0][0],
+            cv_time_reversible=False
+        ).with_diskcache(allow_incomplete=True)
+        self.storage.save(cv)
+
+        snapshots = self.storage.snapshots
+        snapshots.complete_cv_parallel(cv, n_workers=1)
+        self._check_values(cv, 20)
+        store = self.storage.cvs.cache_store(cv)
+        for snap in self.traj:
+            assert store[snap.reversed] == -1.0
+
+
+class TestGeometricCV(object):
+    def setup_method(self):
+        self.coordinates = np.array([[0.0, 1.0, 0.0],
+                                     [0.0, 0.0, 0.0],
+                                     [1.0, 0.0, 0.0],
+                                     [1.0, 0.5, 0.5]])
+        engine = paths.engines.toy.Engine(
+            {}, paths.engines.toy.Topology(n_spatial=3, masses=[1.0] * 4,
+                                           pes=None)
+        )
+        self.snapshot = paths.engines.toy.Snapshot(
+            coordinates=self.coordinates,
+            velocities=np.zeros((4, 3)),
+            engine=engine
+        )
+
+    def test_terms(self):
+        distance = paths.GeometricCV("d", [(1.0, [0, 2])])
+        angle = paths.GeometricCV("a", [(1.0, [0, 1, 2])])
+        torsion = paths.GeometricCV("t", [(1.0, [0, 1, 2, 3])])
+        assert distance(self.snapshot) == pytest.approx(np.sqrt(2.0))
+        assert angle(self.snapshot) == pytest.approx(np.pi / 2)
+        assert abs(torsion(self.snapshot)) == pytest.approx(np.pi / 4)
+
+    def test_torsion_sign_matches_mdtraj(self):
+        if not md:
+            pytest.skip("mdtraj not installed")
+        topology = md.Topology()
+        residue = topology.add_residue("ALA", topology.add_chain())
+        for _ in range(4):
+            topology.add_atom("C", md.element.carbon, residue)
+        traj = md.Trajectory(self.coordinates[np.newaxis], topology)
+        expected = md.compute_dihedrals(traj, [[0, 1, 2, 3]])[0][0]
+        torsion = paths.GeometricCV("t", [(1.0, [0, 1, 2, 3])])
+        assert torsion(self.snapshot) == pytest.approx(expected)
+
+    def test_linear_combination(self):
+        cv = paths.GeometricCV("dd", [(2.0, [0, 2]), (-1.0, [1, 2])])
+        assert cv(self.snapshot) == pytest.approx(2.0 * np.sqrt(2.0) - 1.0)
+
+    def test_bad_term(self):
+        with pytest.raises(ValueError):
+            paths.GeometricCV("bad", [(1.0, [0])])
+
+    def test_dict_round_trip(self):
+        cv = paths.GeometricCV("dd", [(2.0, [0, 2]), (-1.0, [1, 2])])
+        dct = cv.to_dict()
+        assert dct == {'name': "dd",
+                       'terms': [(2.0, [0, 2]), (-1.0, [1, 2])]}
+        reloaded = paths.GeometricCV.from_dict(dct)
+        assert reloaded.terms == cv.terms
+        assert reloaded(self.snapshot) == cv(self.snapshot)
+
+    def test_storage(self):
+        cv = paths.GeometricCV("dd", [(2.0, [0, 2]), (-1.0, [1, 2])])
+        storage = paths.Storage("myfile.nc", "w", template=self.snapshot)
+        storage.save(cv)
+        storage.close()
+        storage = paths.Storage("myfile.nc", "r")
+        reloaded = storage.cvs[0]
+        assert isinstance(reloaded, paths.GeometricCV)
+        assert reloaded.terms == cv.terms
+        storage.close()
+        os.remove("myfile.nc")
@@ -109,3 +109,119 @@ class TestDynamicsEngine(object):
         # doesn't work
         traj = self.stupid.generate(init_snap, conditions)
         assert len(traj) == 2
+
+    def test_short_circuit_conditions(self):
+        calls = {'stopper': 0, 'other': 0}
+
+        def stopper(traj, trusted=False):
+            calls['stopper'] += 1
+            return len(traj) < 2
+
+        def other(traj, trusted=False):
+            calls['other'] += 1
+            return True
+
+        init_snap = make_1d_traj([0.0])[0]
+        engine = StupidEngine({'n_frames_max': 100,
+                               'short_circuit_conditions': True},
+                              self.descriptor)
+        # pretend that `other` is known to be slow
+        stats = engine.condition_scheduler.statistics
+        stats[other] = [1, 0, 1.0]
+        traj = engine.generate(init_snap, [other, stopper])
+        assert len(traj) == 2
+        # the slow condition is skipped once the first one stops
+        assert calls == {'stopper': 2, 'other': 1}
+        assert stats[stopper][:2] == [2, 1]
+        assert stats[other][:2] == [2, 0]
+
+        # conditions marked must_evaluate are always evaluated
+        other.must_evaluate = True
+        traj = engine.generate(init_snap, [stopper, other])
+        assert len(traj) == 2
+        assert calls == {'stopper': 4, 'other': 3}
+
+    def test_generate_backward(self):
+        init_snap = make_1d_traj([0.0])[0]
+        frames = make_1d_traj([1.0, 2.0, 3.0])
+        self.stupid.generate_next_frame = mock.Mock(side_effect=frames)
+        seen = []
+
+        def running(traj, trusted=False):
+            seen.append(traj.as_proxies())
+            return len(traj) < 4
+
+        traj = self.stupid.generate(init_snap, running, direction=-1)
+        assert type(traj) is paths.Trajectory
+        expected = [frames[2].reversed, frames[1].reversed,
+                    frames[0].reversed, init_snap]
+        assert list(traj) == expected
+        # stop conditions see the trajectory in time order while it grows
+        assert seen[1] == expected[2:]
+        assert seen[-1] == expected
+
+    def test_iter_generate_backward(self):
+        init_snap = make_1d_traj([0.0])[0]
+        frames = make_1d_traj([1.0, 2.0, 3.0])
+        self.stupid.generate_next_frame = mock.Mock(side_effect=frames)
+        running = lambda traj, trusted=False: len(traj) < 4
+        trajs = list(self.stupid.iter_generate(init_snap, running,
+                                               direction=-1, intervals=1))
+        # intermediate trajectories are plain copies in time order
+        assert all(type(traj) is paths.Trajectory for traj in trajs)
+        assert [len(traj) for traj in trajs] == [1, 2, 3, 4]
+        assert list(trajs[1]) == [frames[0].reversed, init_snap]
+        assert list(trajs[-1]) == [frames[2].reversed, frames[1].reversed,
+                                   frames[0].reversed, init_snap]
+
+
+class TestContinueConditionScheduler(object):
+    def setup_method(self):
+        self.scheduler = paths.engines.ContinueConditionScheduler()
+        self.calls = []
+
+    def _condition(self, name, result):
+        def condition(traj, trusted=False):
+            self.calls.append(name)
+            return result
+        return condition
+
+    def test_order(self):
+        slow = self._condition('slow', True)
+        fast = self._condition('fast', True)
+        never = self._condition('never', True)
+        new = self._condition('new', True)
+        self.scheduler.statistics = {slow: [10, 5, 10.0],
+                                     fast: [10, 5, 0.1],
+                                     never: [10, 0, 0.1]}
+        conditions = [slow, never, fast, new]
+        assert sorted(conditions, key=self.scheduler.rank) == \
+            [new, fast, never, slow]
+        assert not self.scheduler.stop(conditions, make_1d_traj([0.0]))
+        assert self.calls == ['new', 'fast', 'never', 'slow']
+        assert self.scheduler.statistics[new][:2] == [1, 0]
+
+    def test_stop(self):
+        cheap_stop = self._condition('cheap_stop', False)
+        expensive = self._condition('expensive', True)
+        self.scheduler.statistics = {cheap_stop: [10, 5, 0.1],
+                                     expensive: [10, 5, 10.0]}
+        assert self.scheduler.stop([expensive, cheap_stop],
+                                   make_1d_traj([0.0]))
+        assert self.calls == ['cheap_stop']
+
+    def test_must_evaluate(self):
+        cheap_stop = self._condition('cheap_stop', False)
+        expensive = self._condition('expensive', True)
+        expensive.must_evaluate = True
+        self.scheduler.statistics = {cheap_stop: [10, 5, 0.1],
+                                     expensive: [10, 5, 10.0]}
+        assert self.scheduler.stop([expensive, cheap_stop],
+                                   make_1d_traj([0.0]))
+        assert self.calls == ['expensive', 'cheap_stop']
+
+    def test_must_evaluate_bound_method(self):
+        ensemble = paths.LengthEnsemble(3)
+        assert not paths.engines.must_evaluate(ensemble.can_append)
+        ensemble.must_evaluate = True
+        assert paths.engines.must_evaluate(ensemble.can_append)
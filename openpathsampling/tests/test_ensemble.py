@@ -24,6 +24,12 @@ logger = logging.getLogger('openpathsampling.tests.testensemble')
 
 import re
 import random
+import itertools
+import pytest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
 
 def wrap_traj(traj, start, length):
     """Wraps the traj such that the original traj starts at frame `start`
@@ -1264,6 +1270,74 @@ class TestTISEnsemble(EnsembleTest):
             self._single_test(test_f, ttraj[test], results[test], failmsg)
 
 
+    def test_tis_ensemble_candidate_interface_set(self):
+        interface_set = paths.VolumeInterfaceSet(op, -0.1, [0.5, 0.7, 1.0])
+        tis = TISEnsemble(vol1, vol3, vol2, op, lambda_i=0.7,
+                          interface_set=interface_set)
+        assert_equal(tis._interface_set_index, 1)
+        reference = TISEnsemble(vol1, vol3, vol2, op, lambda_i=0.7)
+        upper_keys = [k for k in list(ttraj.keys()) if k[:6] == "upper_"]
+        for test in upper_keys:
+            failmsg = "Failure in "+test+"("+str(ttraj[test])+"): "
+            expected = reference(ttraj[test], candidate=True)
+            test_f = lambda t: tis(t, candidate=True)
+            self._single_test(test_f, ttraj[test], expected, failmsg)
+
+    def test_tis_transition_candidate_interface_set(self):
+        # transitions give the ensembles both cv_max and the interface set
+        interface_set = paths.VolumeInterfaceSet(op, -0.1, [0.5, 0.7, 1.0])
+        transition = paths.TISTransition(vol1, vol3, interface_set, op)
+        upper_keys = [k for k in list(ttraj.keys()) if k[:6] == "upper_"]
+        for (i, ensemble) in enumerate(transition.ensembles):
+            assert ensemble.cv_max is not None
+            assert_equal(ensemble._interface_set_index, i)
+            # frames at lambda_i are outside the interface volume, but not
+            # above lambda_i (e.g., upper_in_hit_in), so this only matches
+            # if the interface set is used instead of cv_max
+            reference = TISEnsemble(vol1, vol3, interface_set[i], op,
+                                    interface_set=interface_set)
+            for test in upper_keys:
+                failmsg = "Failure in "+test+"("+str(ttraj[test])+"): "
+                expected = reference(ttraj[test], candidate=True)
+                test_f = lambda t: ensemble(t, candidate=True)
+                self._single_test(test_f, ttraj[test], expected, failmsg)
+
+    def test_tis_network_candidate_periodic_interface_set(self):
+        cv = paths.FunctionCV("x", lambda snap: snap.xyz[0][0])
+        state_a = paths.PeriodicCVDefinedVolume(cv, 0, 10, -180, 180)
+        state_b = paths.PeriodicCVDefinedVolume(cv, -150, -100, -180, 180)
+        # the outermost interface of A wraps around the periodic boundary
+        interfaces_a = paths.PeriodicVolumeInterfaceSet(
+            cv, 0, [100, 150, -160], -180, 180
+        )
+        interfaces_b = paths.PeriodicVolumeInterfaceSet(
+            cv, -150, [-90, -60], -180, 180
+        )
+        network = paths.MSTISNetwork([(state_a, interfaces_a),
+                                      (state_b, interfaces_b)])
+        ensembles = network.from_state[state_a].ensembles
+        assert interfaces_a.classifies_cv_values
+
+        # max(x) = 170 > -160, but 170 is inside the outermost interface
+        inside = make_1d_traj([5, 120, 170, 5])
+        crossed = make_1d_traj([5, 120, 170, -50, 5])
+        for (traj, n_crossed) in [(inside, 2), (crossed, 3)]:
+            for (i, ensemble) in enumerate(ensembles):
+                assert ensemble.cv_max is not None
+                assert_equal(ensemble(traj, candidate=True), i < n_crossed)
+                assert_equal(ensemble(traj), i < n_crossed)
+
+    def test_tis_trajectory_summary_interface_set(self):
+        interface_set = paths.VolumeInterfaceSet(op, -0.1, [0.5, 0.7, 1.0])
+        tis = TISEnsemble(vol1, vol3, vol2, op, interface_set=interface_set)
+        summ = tis.trajectory_summary(self.traj)
+        assert_equal(summ['max_lambda'], self.maxl)
+        assert_equal(summ['min_lambda'], self.minl)
+        assert_equal(summ['max_interface'],
+                     max(interface_set.interface_indices(self.traj)))
+        assert_equal(summ['max_interface'], 2)
+
+
 class EnsembleCacheTest(EnsembleTest):
     def _was_cache_reset(self, cache):
         return cache.contents == { }
@@ -2452,6 +2526,41 @@ class TestEnsembleSplit(EnsembleTest):
         sub_traj = ensembleAXA.find_last_subtrajectory(traj3)
         assert(traj3.subtrajectory_indices(sub_traj) == [2,3,4])
 
+    @pytest.mark.parametrize('ensemble', ['in', 'out', 'in_len',
+                                          'in_len_range', 'len'])
+    def test_split_frame_local_matches_generic(self, ensemble):
+        ensemble = {
+            'in': self.inA,
+            'out': self.outA,
+            'in_len': self.inA & paths.LengthEnsemble(2),
+            'in_len_range': self.inA & paths.LengthEnsemble(slice(2, 4)),
+            'len': paths.LengthEnsemble(3),
+        }[ensemble]
+        assert ensemble._frame_local_constraints() is not None
+        trajs = [ttraj['upper_in_out_in_in_out_in'],
+                 make_1d_traj([0.3, 0.3, 0.3, 0.6, 0.3, 0.3, 0.6, 0.6]),
+                 make_1d_traj([])]
+        options = itertools.product([None, 1, 3], [1, 2], [0, 1],
+                                    [False, True])
+        for traj, (max_len, min_len, overlap, reverse) in \
+                itertools.product(trajs, options):
+            fast = list(ensemble.iter_valid_slices(
+                traj, max_len, min_len, overlap, reverse
+            ))
+            with mock.patch.object(type(ensemble),
+                                   '_frame_local_constraints',
+                                   lambda self: None):
+                generic = list(ensemble.iter_valid_slices(
+                    traj, max_len, min_len, overlap, reverse
+                ))
+            assert fast == generic
+
+    def test_not_frame_local(self):
+        assert PartInXEnsemble(vol1)._frame_local_constraints() is None
+        assert (self.inA | self.outA)._frame_local_constraints() is None
+        assert (self.inA & PartInXEnsemble(vol1))._frame_local_constraints() \
+            is None
+
 class TestVolumeCombinations(EnsembleTest):
     def setup_method(self):
         self.outA = paths.AllOutXEnsemble(vol1)
@@ -2727,3 +2836,124 @@ class TestEnsembleEquality(object):
 
     # TODO: may add tests for other ensembles, or may move this test
     # somewhere else
+
+
+class TestEnsembleVerdictCache(object):
+    def setup_method(self):
+        self.ensemble = AllInXEnsemble(vol1)
+        self.in_traj = make_1d_traj([0.2, 0.3])
+        self.out_traj = make_1d_traj([0.2, 0.6])
+        self.cache = paths.EnsembleVerdictCache(maxsize=2)
+
+    def teardown_method(self):
+        Ensemble.disable_verdict_cache()
+
+    def test_call(self):
+        with mock.patch.object(AllInXEnsemble, '__call__',
+                               return_value=True) as call:
+            assert self.cache(self.ensemble, self.in_traj) is True
+            assert self.cache(self.ensemble, self.in_traj) is True
+            assert call.call_count == 1
+            # candidate checks are stored separately
+            self.cache(self.ensemble, self.in_traj, candidate=True)
+            assert call.call_count == 2
+        assert self.cache.stats['hits'] == 1
+        assert self.cache.stats['misses'] == 2
+
+    def test_extended_trajectory(self):
+        traj = make_1d_traj([0.2, 0.3])
+        assert self.cache(self.ensemble, traj) is True
+        traj.append(make_1d_traj([0.6])[0])
+        assert self.cache(self.ensemble, traj) is False
+
+    def test_changed_end_frame(self):
+        traj = make_1d_traj([0.2, 0.3])
+        assert self.cache(self.ensemble, traj) is True
+        traj[-1] = make_1d_traj([0.6])[0]
+        assert self.cache(self.ensemble, traj) is False
+        del traj[0]
+        traj.insert(0, make_1d_traj([0.7])[0])
+        assert self.cache(self.ensemble, traj) is False
+        assert self.cache.stats['hits'] == 0
+
+    def test_untrusted(self):
+        with mock.patch.object(AllInXEnsemble, '__call__',
+                               return_value=True) as call:
+            self.cache(self.ensemble, self.in_traj)
+            self.cache(self.ensemble, list(self.in_traj))
+        for call_args in call.call_args_list:
+            assert call_args[1]['trusted'] is False
+
+    def test_lru_eviction(self):
+        traj3 = make_1d_traj([0.3])
+        self.cache(self.ensemble, self.in_traj)
+        self.cache(self.ensemble, self.out_traj)
+        self.cache(self.ensemble, self.in_traj)  # now most recent
+        self.cache(self.ensemble, traj3)
+        assert self.cache.stats['evictions'] == 1
+        assert len(self.cache) == 2
+        self.cache(self.ensemble, self.in_traj)
+        assert self.cache.stats['hits'] == 2
+
+    def test_invalidate(self):
+        other = AllOutXEnsemble(vol1)
+        for ens in [self.ensemble, other]:
+            self.cache(ens, self.in_traj)
+        self.cache.maxsize = 10
+        self.cache(self.ensemble, self.out_traj)
+        self.cache.invalidate(ensemble=other)
+        assert len(self.cache) == 2
+        self.cache.invalidate(trajectory=self.out_traj)
+        assert len(self.cache) == 1
+        self.cache.invalidate()
+        assert len(self.cache) == 0
+
+    def test_invalidate_index(self):
+        self.cache(self.ensemble, self.in_traj)
+        self.cache(self.ensemble, self.out_traj)
+        self.cache(self.ensemble, make_1d_traj([0.3]))  # evicts in_traj
+        assert len(self.cache._keys_by_trajectory) == 2
+        self.cache.invalidate(ensemble=self.ensemble,
+                              trajectory=self.out_traj)
+        assert len(self.cache) == 1
+        assert len(self.cache._keys_by_ensemble[self.ensemble.__uuid__]) \
+            == 1
+        self.cache.invalidate(ensemble=self.ensemble)
+        assert len(self.cache) == 0
+        assert not self.cache._keys_by_ensemble
+        assert not self.cache._keys_by_trajectory
+
+    def test_cache_off_call_args(self):
+        sample = paths.Sample(replica=0, trajectory=self.in_traj,
+                              ensemble=self.ensemble)
+        with mock.patch.object(AllInXEnsemble, '__call__',
+                               return_value=True) as call:
+            assert sample.valid
+            paths.SampleSet([sample]).sanity_check()
+            assert self.ensemble.check(self.in_traj)
+        assert call.call_args_list == [
+            mock.call(self.in_traj),
+            mock.call(self.in_traj),
+            mock.call(self.in_traj, trusted=False),
+        ]
+
+    def test_sample_uses_global_cache(self):
+        cache = Ensemble.enable_verdict_cache(maxsize=10)
+        sample = paths.Sample(replica=0, trajectory=self.in_traj,
+                              ensemble=self.ensemble)
+        assert sample.valid
+        paths.SampleSet([sample]).sanity_check()
+        assert cache.stats['misses'] == 1
+        assert cache.stats['hits'] >= 1
+
+    def test_check_uses_global_cache(self):
+        assert self.ensemble.check(self.in_traj) is True
+        cache = Ensemble.enable_verdict_cache(maxsize=10)
+        assert self.ensemble.check(self.in_traj) is True
+        assert self.ensemble.check(self.in_traj) is True
+        assert self.ensemble.check(self.out_traj) is False
+        assert cache.stats['hits'] == 1
+        assert cache.stats['misses'] == 2
+        assert Ensemble.enable_verdict_cache() is cache
+        Ensemble.disable_verdict_cache()
+        assert Ensemble.verdict_cache is None
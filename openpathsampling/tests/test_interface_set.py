@@ -19,6 +19,14 @@ logging.getLogger('openpathsampling.ensemble').setLevel(logging.CRITICAL)
 logging.getLogger('openpathsampling.storage').setLevel(logging.CRITICAL)
 logging.getLogger('openpathsampling.netcdfplus').setLevel(logging.CRITICAL)
 
+
+def _per_volume_indices(interface_set, trajectory):
+    return [[vol(snap) for vol in interface_set].index(True)
+            if any(vol(snap) for vol in interface_set)
+            else len(interface_set)
+            for snap in trajectory]
+
+
 class TestInterfaceSet(object):
     def setup_method(self):
         paths.InterfaceSet._reset()
@@ -44,6 +52,13 @@ class TestInterfaceSet(object):
             assert_equal(self.interface_set.get_lambda(v), l)
             assert_equal(self.no_lambda_set.get_lambda(v), None)
 
+    def test_interface_indices(self):
+        traj = make_1d_traj([-0.1, 0.0, 0.05, 0.1, 0.25, 0.3, 0.5])
+        assert_equal(list(self.interface_set.interface_indices(traj)),
+                     [0, 1, 1, 2, 3, 4, 4])
+        assert_equal(list(self.interface_set.interface_indices(traj)),
+                     _per_volume_indices(self.interface_set, traj))
+
     def test_list_behavior(self):
         # len
         assert_equal(len(self.interface_set), 4)
@@ -135,6 +150,37 @@ class TestVolumeInterfaceSet(object):
         assert_equal(self.weird_set.direction, 0)
         assert_equal(self.weird_set.lambdas, None)
 
+    def test_interface_indices(self):
+        traj = make_1d_traj([-0.2, -0.1, -0.05, 0.0, 0.05, 0.1, 0.2])
+        for iface_set in [self.increasing_set, self.decreasing_set]:
+            assert_equal(iface_set.classifies_cv_values, True)
+            assert_equal(list(iface_set.interface_indices(traj)),
+                         _per_volume_indices(iface_set, traj))
+        assert_equal(list(self.increasing_set.interface_indices(traj)),
+                     [0, 0, 0, 1, 1, 2, 2])
+        assert_equal(list(self.decreasing_set.interface_indices(traj)),
+                     [2, 1, 1, 0, 0, 0, 0])
+
+    def test_interface_indices_fallback(self):
+        traj = make_1d_traj([-0.2, -0.1, 0.0, 0.1, 0.2])
+        assert_equal(self.weird_set.classifies_cv_values, False)
+        assert_equal(list(self.weird_set.interface_indices(traj)),
+                     _per_volume_indices(self.weird_set, traj))
+        intersected = paths.VolumeInterfaceSet(
+            cv=self.cv, minvals=float("-inf"), maxvals=[0.0, 0.1],
+            intersect_with=paths.CVDefinedVolume(
+                paths.FunctionCV(name="y", f=lambda s: s.xyz[0][0]),
+                -0.15, 0.15
+            )
+        )
+        assert_equal(intersected.classifies_cv_values, False)
+        assert_equal(list(intersected.interface_indices(traj)),
+                     [2, 0, 1, 2, 2])
+
+    @raises(RuntimeError)
+    def test_indices_from_cv_values_unavailable(self):
+        self.weird_set.indices_from_cv_values([0.0])
+
     def test_new_interface(self):
         new_iface = self.increasing_set.new_interface(0.25)
         expected = paths.CVDefinedVolume(self.cv, float("-inf"), 0.25)
@@ -144,6 +190,23 @@ class TestVolumeInterfaceSet(object):
     def test_bad_new_interface(self):
         self.weird_set.new_interface(0.25)
 
+    def test_with_lambdas(self):
+        new_set = self.increasing_set.with_lambdas([0.0, 0.05, 0.2])
+        assert_equal(type(new_set), paths.VolumeInterfaceSet)
+        assert_equal(new_set.lambdas, [0.0, 0.05, 0.2])
+        assert_equal(new_set.direction, 1)
+        assert_equal(new_set.cv, self.cv)
+        assert_equal(new_set[1],
+                     paths.CVDefinedVolume(self.cv, float("-inf"), 0.05))
+        new_set = self.decreasing_set.with_lambdas([0.0, -0.2])
+        assert_equal(new_set.lambdas, [0.0, -0.2])
+        assert_equal(new_set[1],
+                     paths.CVDefinedVolume(self.cv, -0.2, float("inf")))
+
+    @raises(ValueError)
+    def test_bad_with_lambdas(self):
+        self.weird_set.with_lambdas([0.0, 0.1])
+
     def test_storage(self):
         import os
         fname = data_filename("interface_set_storage_test.nc")
@@ -187,11 +250,39 @@ class TestPeriodicVolumeInterfaceSet(object):
         assert_equal(len(self.increasing_set), 3)
         assert_equal(self.increasing_set.lambdas, [100, 150, -160])
 
+    def test_interface_indices(self):
+        values = [-180, -170, -160, -100, -10, 0, 50, 100, 120, 150, 170,
+                  180, 190, 400]
+        traj = make_1d_traj(values)
+        assert_equal(self.increasing_set.classifies_cv_values, True)
+        assert_equal(list(self.increasing_set.interface_indices(traj)),
+                     _per_volume_indices(self.increasing_set, traj))
+        assert_equal(list(self.increasing_set.interface_indices(traj)),
+                     [2, 2, 3, 3, 3, 0, 0, 1, 1, 2, 2, 2, 2, 0])
+
+    def test_interface_indices_full_period(self):
+        full_set = paths.PeriodicVolumeInterfaceSet(
+            cv=self.cv, minvals=0.0, maxvals=[100, 200-360, 360],
+            period_min=-180, period_max=180
+        )
+        traj = make_1d_traj([-170, -100, 0, 50, 120, 179])
+        assert_equal(full_set.classifies_cv_values, True)
+        assert_equal(list(full_set.interface_indices(traj)),
+                     _per_volume_indices(full_set, traj))
+
     def test_new_interface(self):
         new_iface = self.increasing_set.new_interface(-140)
         expected = paths.PeriodicCVDefinedVolume(self.cv, 0.0, -140, -180, 180)
         assert_equal(new_iface, expected)
 
+    def test_with_lambdas(self):
+        new_set = self.increasing_set.with_lambdas([50, 100, -140])
+        assert_equal(type(new_set), paths.PeriodicVolumeInterfaceSet)
+        assert_equal(new_set.lambdas, [50, 100, -140])
+        assert_equal(new_set[2], paths.PeriodicCVDefinedVolume(
+            self.cv, 0.0, -140, -180, 180
+        ))
+
     def test_storage(self):
         import os
         fname = data_filename("interface_set_storage_test.nc")
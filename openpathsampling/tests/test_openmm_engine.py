@@ -175,6 +175,38 @@ class TestOpenMMEngine(object):
         else:
             raise RuntimeError('Did not have correct MaxLengthError')
 
+    def test_unit_free_snapshots(self):
+        snap = self.engine.current_snapshot
+        assert self.engine.unit_free_snapshots is False
+        assert snap.statics.coordinates._value.flags.writeable
+
+        integrator = mm.VerletIntegrator(2.0*u.femtoseconds)
+        engine = self.engine.from_new_options(
+            integrator=integrator,
+            options={'unit_free_snapshots': True}
+        )
+        engine.initialize('CPU')
+        engine.current_snapshot = snap
+        new_snap = engine.generate_next_frame()
+        statics = new_snap.statics
+        assert type(statics.coordinates_array) is np.ndarray
+        assert not statics.coordinates_array.flags.writeable
+        assert new_snap.coordinates.unit == u.nanometers
+        assert new_snap.statics.copy().coordinates_array \
+            is statics.coordinates_array
+        assert new_snap.velocities.unit == old_div(u.nanometers,
+                                                   u.picoseconds)
+        assert engine.is_valid_snapshot(new_snap)
+
+        # setting a unit-free snapshot must restore the same state
+        new_snap_2 = engine.generate_next_frame()
+        engine.current_snapshot = new_snap
+        np.testing.assert_array_equal(
+            engine._build_current_snapshot().statics.coordinates_array,
+            statics.coordinates_array
+        )
+        assert_not_equal_array_array(new_snap_2.xyz, new_snap.xyz)
+
     def test_snapshot_timestep(self):
         assert_equal(self.engine.snapshot_timestep, 4 * u.femtoseconds)
 
@@ -280,3 +312,182 @@ class TestOpenMMEngine(object):
             integrator=omt.integrators.VVVRIntegrator()
         )
         assert engine.has_constraints() == has_constraints
+
+
+class TestOpenMMEnginePool(object):
+    def setup_method(self):
+        integrator = mm.LangevinIntegrator(
+            300*u.kelvin,
+            old_div(1.0, u.picoseconds),
+            2.0*u.femtoseconds
+        )
+        self.engine = peng.Engine(
+            template.topology,
+            system,
+            integrator,
+            options={'n_steps_per_frame': 2, 'n_frames_max': 5}
+        )
+        self.pool = peng.EnginePool(self.engine, n_engines=2,
+                                    threads_per_engine=1)
+
+    def teardown_method(self):
+        self.pool.close()
+
+    def test_engines(self):
+        assert len(self.pool.engines) == 2
+        for engine in self.pool.engines:
+            assert engine is not self.engine
+            assert engine.integrator is not self.engine.integrator
+            assert engine.openmm_properties['Threads'] == '1'
+            assert engine.n_steps_per_frame == 2
+        self.pool.initialize()
+        for engine in self.pool.engines:
+            assert engine.platform == 'CPU'
+
+    def test_platform_properties(self):
+        self.engine.openmm_properties = {'CudaPrecision': 'mixed'}
+        pool = peng.EnginePool(self.engine, n_engines=2,
+                               threads_per_engine=1)
+        for engine in pool.engines:
+            assert engine.openmm_properties == {'Threads': '1'}
+        pool.initialize()
+        pool.close()
+
+    def test_acquire(self):
+        with self.pool.acquire() as engine:
+            assert engine in self.pool.engines
+            engine.current_snapshot = template
+            snap = engine.current_snapshot
+            # snapshots belong to the template engine
+            assert snap.engine is self.engine
+        assert self.pool._available.qsize() == 2
+
+    def test_stop_volumes(self):
+        cv = paths.GeometricCV("d", [(1.0, [0, 10])])
+        volume = paths.CVDefinedVolume(cv, 0.0, 1.0)
+        self.engine.set_stop_volumes([volume])
+        pool = peng.EnginePool(self.engine, n_engines=2,
+                               threads_per_engine=1)
+        for engine in pool.engines:
+            assert engine._stop_volumes == [volume]
+        pool.close()
+
+    def test_generate(self):
+        n_frames = lambda traj, foo: len(traj) < 3
+        # engines in threads can't install signal handlers
+        for engine in self.pool.engines:
+            assert engine.interrupter is not self.engine.interrupter
+        trajs = self.pool.generate([template] * 3, [n_frames])
+        assert [len(traj) for traj in trajs] == [3, 3, 3]
+        for traj in trajs:
+            # first frame is the input; the rest are from the pool
+            assert all(snap.engine is self.engine for snap in traj[1:])
+        # snapshots from one engine can be used by another
+        with self.pool.acquire() as engine:
+            engine.current_snapshot = trajs[1][-1]
+            assert engine.current_snapshot is trajs[1][-1]
+
+
+class TestOpenMMEngineStopVolumes(object):
+    def setup_method(self):
+        integrator = mm.LangevinIntegrator(
+            300*u.kelvin,
+            old_div(1.0, u.picoseconds),
+            2.0*u.femtoseconds
+        )
+        self.engine = peng.Engine(
+            template.topology,
+            system,
+            integrator,
+            options={'n_steps_per_frame': 10, 'n_frames_max': 5}
+        )
+        self.engine.initialize('Reference')
+        self.engine.current_snapshot = template
+        self.cv = paths.GeometricCV("d", [(1.0, [0, 10]),
+                                          (0.5, [4, 6, 8, 10])])
+
+    def _context_value(self):
+        values = self.engine._stop_force.getCollectiveVariableValues(
+            self.engine.simulation.context
+        )
+        return 1.0 * values[0] + 0.5 * values[1]
+
+    def test_set_stop_volumes(self):
+        n_forces = system.getNumForces()
+        volume = paths.CVDefinedVolume(self.cv, 0.0, 1.0)
+        self.engine.set_stop_volumes([volume])
+        assert self.engine.platform == 'Reference'
+        assert self.engine.simulation.system.getNumForces() == n_forces + 1
+        assert system.getNumForces() == n_forces
+        # the stop volumes are not part of the saved engine
+        assert self.engine.to_dict()['system_xml'] == \
+            mm.XmlSerializer.serialize(system)
+        # the current snapshot is kept
+        assert_equal_array_array(self.engine.current_snapshot.coordinates,
+                                 template.coordinates)
+
+        self.engine.set_stop_volumes([])
+        assert self.engine.simulation.system.getNumForces() == n_forces
+
+    def test_context_value(self):
+        volume = paths.CVDefinedVolume(self.cv, 0.0, 1.0)
+        self.engine.set_stop_volumes([volume])
+        assert self._context_value() == pytest.approx(self.cv(template),
+                                                      abs=1e-5)
+
+    def test_frames_keep_length(self):
+        # volumes on both sides of the current value, but not containing it
+        volume = paths.CVDefinedVolume(self.cv, 0.0, 1.0)
+        self.engine.set_stop_volumes([volume])
+        value = self._context_value()
+        volumes = [paths.CVDefinedVolume(self.cv, float('-inf'), value),
+                   paths.CVDefinedVolume(self.cv, value + 1e-6,
+                                         float('inf'))]
+        self.engine.set_stop_volumes(volumes)
+        step = self.engine.simulation.currentStep
+        snap = self.engine.generate_next_frame()
+        assert self.engine.simulation.currentStep == step + 10
+        assert volumes[0](snap) or volumes[1](snap)
+        assert self.engine._stop_volumes_crossed
+
+        def condition(traj, trusted):
+            condition.n_calls += 1
+            return True
+
+        condition.n_calls = 0
+        traj = paths.Trajectory([template, snap])
+        assert not self.engine.stop_conditions(traj, [condition])
+        assert condition.n_calls == 1
+
+    def test_skip_conditions_inside(self):
+        volume = paths.CVDefinedVolume(self.cv, float('-inf'), float('inf'))
+        self.engine.set_stop_volumes([volume])
+        step = self.engine.simulation.currentStep
+        snap = self.engine.generate_next_frame()
+        assert self.engine.simulation.currentStep == step + 10
+        assert not self.engine._stop_volumes_crossed
+
+        def condition(traj, trusted):
+            condition.n_calls += 1
+            return False
+
+        condition.n_calls = 0
+        traj = paths.Trajectory([template, snap])
+        assert not self.engine.stop_conditions(traj, [condition])
+        assert condition.n_calls == 0
+        # untrusted checks (e.g., at the start) are always done
+        assert self.engine.stop_conditions(traj, [condition], trusted=False)
+        assert condition.n_calls == 1
+
+    def test_generate(self):
+        volume = paths.CVDefinedVolume(self.cv, float('-inf'), float('inf'))
+        self.engine.set_stop_volumes([volume])
+        # the condition is never evaluated, so max length ends it
+        with pytest.raises(dyn.EngineMaxLengthError):
+            self.engine.generate(template, [lambda t, foo: len(t) < 3])
+
+    def test_bad_volume(self):
+        cv = paths.FunctionCV("x", lambda snap: snap.xyz[0][0])
+        volume = paths.CVDefinedVolume(cv, 0.0, 1.0)
+        with pytest.raises(TypeError):
+            self.engine.set_stop_volumes([volume])
@@ -363,6 +363,56 @@ class TestCommittorSimulation(object):
             assert_equal(step.change.canonical.mover,
                          sim.backward_mover)
 
+    def test_adaptive_committor_resolved(self):
+        # forward-only shots from +/- velocities always reach one state
+        snap_left = self.snap0.copy_with_replacement(
+            coordinates=np.array([[0.1]]),
+            velocities=np.array([[-1.0]])
+        )
+        sim = CommittorSimulation(storage=self.storage,
+                                  engine=self.engine,
+                                  states=[self.left, self.right],
+                                  randomizer=paths.NoModification(),
+                                  initial_snapshots=[self.snap0,
+                                                     snap_left],
+                                  direction=1)
+        sim.output_stream = open(os.devnull, 'w')
+        analysis = sim.run_adaptive(min_per_snapshot=2,
+                                    max_per_snapshot=50, max_width=0.3)
+        # Wilson interval for 0 of n at 95%: width 3.84 / (n + 3.84), which
+        # gets below 0.3 at n = 9
+        assert_equal(len(sim.storage.steps), 18)
+        n_shots = [sum(analysis[snap].values()) for snap in analysis]
+        assert_equal(n_shots, [9, 9])
+        committor = analysis.committor(self.right)
+        assert_equal(sorted(committor.values()), [0.0, 1.0])
+
+    def test_adaptive_committor_limits(self):
+        snap1 = self.snap0.copy_with_replacement(
+            coordinates=np.array([[0.1]])
+        )
+        sim = CommittorSimulation(storage=self.storage,
+                                  engine=self.engine,
+                                  states=[self.left, self.right],
+                                  randomizer=paths.NoModification(),
+                                  initial_snapshots=[self.snap0, snap1])
+        sim.output_stream = open(os.devnull, 'w')
+        # intervals can't get that narrow: limited by max_per_snapshot
+        analysis = sim.run_adaptive(min_per_snapshot=2,
+                                    max_per_snapshot=6, max_width=0.01)
+        assert_equal(len(sim.storage.steps), 12)
+        n_shots = [sum(analysis[snap].values()) for snap in analysis]
+        assert_equal(n_shots, [6, 6])
+
+        # ... or by the total number of shots
+        analysis = sim.run_adaptive(min_per_snapshot=2,
+                                    max_per_snapshot=6, max_shots=9,
+                                    max_width=0.01)
+        assert_equal(len(sim.storage.steps), 12 + 9)
+        n_shots = [sum(analysis[snap].values()) for snap in analysis]
+        assert_equal(sum(n_shots), 9)
+        assert_true(min(n_shots) >= 2)
+
     def test_multiple_initial_snapshots(self):
         snap1 = toys.Snapshot(coordinates=np.array([[0.1]]),
                               velocities=np.array([[-1.0]]),
@@ -825,6 +875,24 @@ class TestPathSampling(object):
         final_xyz = set(s.xyz.tobytes() for s in final_snaps)
         assert init_xyz & final_xyz == set([])
 
+    def test_decorrelation_hook(self):
+        from openpathsampling.beta.hooks import DecorrelationHook
+        hook = DecorrelationHook()
+        self.sim.attach_hook(hook)
+        self.sim.output_stream = open(os.devnull, 'w')
+        self.sim.run(1)
+        assert hook.n_replicas == 3
+        while not hook.all_decorrelated:
+            self.sim.run(1)
+
+        originals = {s.replica: s.trajectory for s in self.init_cond}
+        for sample in self.sim.sample_set:
+            assert not originals[sample.replica].is_correlated(
+                sample.trajectory, time_reversal=True
+            )
+        assert set(hook.decorrelation_steps) == set(originals)
+        assert max(hook.decorrelation_steps.values()) == self.sim.step
+
     def test_save_initial_scheme(self, tmpdir):
         # check that we actually save scheme when we save this
         filename = tmpdir.join("temp.nc")
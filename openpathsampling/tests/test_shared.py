@@ -1,8 +1,16 @@
 import pytest
+import numpy as np
 from numpy import testing as npt
 import openpathsampling as paths
 import os
 
+from openpathsampling.engines.features.shared import (
+    read_only_array, StaticContainer, KineticContainer,
+    UnitFreeStaticContainer, UnitFreeKineticContainer
+)
+from openpathsampling.integration_tools import HAS_SIMTK_UNIT, unit
+from .test_helpers import data_filename
+
 try:
     import openmmtools
 except ImportError:
@@ -29,3 +37,158 @@ class TestStaticContainerStore(object):
         npt.assert_array_equal(snap.box_vectors, reloaded.box_vectors)
         assert snap.box_vectors is None
         assert reloaded.box_vectors is None
+
+
+class TestReadOnlyArray(object):
+    def test_copies_writable(self):
+        arr = np.array([[1.0, 2.0]])
+        result = read_only_array(arr)
+        assert result is not arr
+        assert not result.flags.writeable
+        assert arr.flags.writeable
+        npt.assert_array_equal(result, arr)
+
+    def test_in_place(self):
+        arr = np.array([[1.0, 2.0]])
+        result = read_only_array(arr, in_place=True)
+        assert result is arr
+        assert not arr.flags.writeable
+
+    def test_shares_read_only(self):
+        arr = read_only_array(np.array([[1.0, 2.0]]))
+        assert read_only_array(arr) is arr
+
+    def test_unmasks(self):
+        arr = np.ma.masked_array([[1.0, 2.0]])
+        result = read_only_array(arr)
+        assert type(result) is np.ndarray
+        assert not result.flags.writeable
+
+    def test_other_types(self):
+        assert read_only_array(None) is None
+        lst = [1.0, 2.0]
+        result = read_only_array(lst)
+        assert result == lst and result is not lst
+
+    def test_quantity(self):
+        if not HAS_SIMTK_UNIT:
+            pytest.skip("Requires openmm.unit")
+        qty = np.array([[1.0, 2.0]]) * unit.nanometer
+        result = read_only_array(qty)
+        assert result.unit == unit.nanometer
+        assert not result._value.flags.writeable
+        assert read_only_array(result) is result
+
+    def test_container_copies_writable(self):
+        coords = np.array([[1.0, 2.0]])
+        statics = StaticContainer(coordinates=coords, box_vectors=None)
+        coords[0, 0] = 5.0  # input can't change the container
+        assert statics.coordinates[0, 0] == 1.0
+        statics.coordinates[0, 0] = 3.0
+        copied = statics.copy()
+        assert copied.coordinates is not statics.coordinates
+        npt.assert_array_equal(copied.coordinates, statics.coordinates)
+
+        kinetics = KineticContainer(velocities=np.array([[3.0, 4.0]]))
+        kinetics.velocities[0, 0] = 5.0
+        assert kinetics.copy().velocities is not kinetics.velocities
+
+
+class TestUnitFreeContainers(object):
+    def setup_method(self):
+        if not HAS_SIMTK_UNIT:
+            pytest.skip("Requires openmm.unit")
+        self.coords = np.array([[1.0, 2.0, 3.0]])
+        self.box = 2.0 * np.identity(3)
+        self.vels = np.array([[0.1, 0.2, 0.3]])
+
+    def _snapshot(self):
+        from openpathsampling.engines.openmm import Snapshot
+        return Snapshot.construct(
+            statics=UnitFreeStaticContainer(coordinates=self.coords,
+                                            box_vectors=self.box),
+            kinetics=UnitFreeKineticContainer(velocities=self.vels)
+        )
+
+    def test_statics(self):
+        statics = UnitFreeStaticContainer(
+            coordinates=self.coords * unit.angstrom,
+            box_vectors=self.box * unit.nanometer
+        )
+        assert type(statics.coordinates_array) is np.ndarray
+        npt.assert_allclose(statics.coordinates_array, 0.1 * self.coords)
+        assert not statics.coordinates_array.flags.writeable
+        assert statics.coordinates.unit == unit.nanometer
+        assert statics.coordinates._value is statics.coordinates_array
+        npt.assert_array_equal(statics.box_vectors / unit.nanometer,
+                               self.box)
+        assert statics.n_atoms == 1
+
+        copied = statics.copy()
+        assert isinstance(copied, UnitFreeStaticContainer)
+        assert copied.coordinates_array is statics.coordinates_array
+        assert copied.box_vectors_array is statics.box_vectors_array
+
+    def test_statics_no_box(self):
+        statics = UnitFreeStaticContainer(coordinates=self.coords,
+                                          box_vectors=None)
+        assert statics.box_vectors is None
+        # plain arrays are copied unless in_place
+        assert statics.coordinates_array is not self.coords
+        assert self.coords.flags.writeable
+
+    def test_in_place(self):
+        statics = UnitFreeStaticContainer(coordinates=self.coords,
+                                          box_vectors=None, in_place=True)
+        assert statics.coordinates_array is self.coords
+        assert not self.coords.flags.writeable
+
+    def test_kinetics(self):
+        kinetics = UnitFreeKineticContainer(velocities=self.vels)
+        npt.assert_array_equal(kinetics.velocities_array, self.vels)
+        assert kinetics.velocities.unit == unit.nanometer / unit.picosecond
+        with pytest.raises(ValueError):
+            kinetics.velocities_array[0, 0] = 5.0
+        copied = kinetics.copy()
+        assert isinstance(copied, UnitFreeKineticContainer)
+        assert copied.velocities_array is kinetics.velocities_array
+
+    def test_snapshot_features(self):
+        snap = self._snapshot()
+        # shared read-only data is not copied on access
+        assert snap.coordinates._value is snap.statics.coordinates_array
+        npt.assert_array_equal(snap.xyz, self.coords)
+        npt.assert_array_equal(snap.reversed.velocities._value, -self.vels)
+
+    def test_storage(self, tmpdir):
+        from openpathsampling.engines.openmm import Snapshot
+        template = paths.engines.openmm.snapshot_from_pdb(
+            data_filename("ala_small_traj.pdb")
+        )
+        snap = Snapshot.construct(
+            statics=UnitFreeStaticContainer(
+                coordinates=template.coordinates,
+                box_vectors=template.box_vectors
+            ),
+            kinetics=UnitFreeKineticContainer(
+                velocities=template.velocities
+            ),
+            engine=template.engine
+        )
+        filename = str(tmpdir.join("unit_free.nc"))
+        storage = paths.Storage(filename, 'w')
+        storage.save(snap)
+        storage.close()
+        load = paths.Storage(filename, 'r')
+        reloaded = load.snapshots[0]
+        assert isinstance(reloaded.statics, StaticContainer)
+        npt.assert_allclose(reloaded.coordinates / unit.nanometer,
+                            template.coordinates / unit.nanometer,
+                            rtol=1e-6)
+        npt.assert_allclose(reloaded.box_vectors / unit.nanometer,
+                            template.box_vectors / unit.nanometer)
+        npt.assert_allclose(
+            reloaded.velocities / (unit.nanometer / unit.picosecond),
+            template.velocities / (unit.nanometer / unit.picosecond)
+        )
+        load.close()
@@ -305,3 +305,59 @@ class TestShootingPointAnalysis(object):
         assert_items_equal(df1.index, list(range(2)))
         assert_same_items(df2.index, [0.0, 0.1])
         assert_same_items(df1.columns, [self.left.name, self.right.name])
+
+    def test_committor_uneven_shots(self):
+        runs = ([(self.snap0, self.left)] * 6 + [(self.snap0, self.right)] * 2
+                + [(self.snap1, self.left), (self.snap1, self.right)])
+        analyzer = ShootingPointAnalysis.from_individual_runs(runs)
+        committor = analyzer.committor(self.left, lambda s: s.xyz[0][0])
+        assert committor == {0.0: 0.75, 0.1: 0.5}
+
+        intervals = analyzer.committor_interval(self.left,
+                                                label_function=lambda s:
+                                                s.xyz[0][0])
+        for (key, (low, high)) in intervals.items():
+            assert low < committor[key] < high
+        # more shots give a narrower interval
+        width = {k: high - low for (k, (low, high)) in intervals.items()}
+        assert width[0.0] < width[0.1]
+
+        rehash = lambda snap: snap.xyz[0][0]
+        bins = [-0.05, 0.15]
+        by_shots, _ = analyzer.committor_histogram(rehash, self.left, bins)
+        by_snaps, _ = analyzer.committor_histogram(rehash, self.left, bins,
+                                                   weighting='snapshots')
+        assert pytest.approx(by_shots[0]) == 0.7
+        assert pytest.approx(by_snaps[0]) == 0.625
+        with pytest.raises(ValueError, match="weighting"):
+            analyzer.committor_histogram(rehash, self.left, bins,
+                                         weighting='foo')
+
+
+@pytest.mark.parametrize('method', ['wilson', 'beta'])
+def test_proportion_interval(method):
+    assert proportion_interval(0, 0, method=method) == (0.0, 1.0)
+    (low, high) = proportion_interval(5, 10, method=method)
+    assert pytest.approx(0.5) == 0.5 * (low + high)
+    assert 0.0 < low < 0.5 < high < 1.0
+    (low_90, high_90) = proportion_interval(5, 10, confidence=0.9,
+                                            method=method)
+    assert low < low_90 and high_90 < high
+    (low, high) = proportion_interval(0, 20, method=method)
+    assert low < 0.01
+    assert high < 0.2
+    (low, high) = proportion_interval(20, 20, method=method)
+    assert low > 0.8
+    assert high > 0.99
+
+
+def test_proportion_interval_wilson_value():
+    # Wilson interval for 0 of n has upper bound z^2 / (n + z^2)
+    (low, high) = proportion_interval(0, 9)
+    assert low == 0.0
+    assert high == pytest.approx(1.96**2 / (9 + 1.96**2), rel=1e-3)
+
+
+def test_proportion_interval_bad_method():
+    with pytest.raises(ValueError, match="method"):
+        proportion_interval(1, 2, method='foo')
@@ -264,6 +264,46 @@ class TestRandomizeVelocities(object):
         assert engine.current_snapshot == zero_snap
         engine.generate(new_snap, [lambda x, foo: len(x) <= 4])
 
+    def test_seeded_rng(self):
+        randomizer = RandomVelocities(beta=old_div(1.0, 5.0))
+        randomizer._rng = np.random.default_rng(42)
+        new_2x3D = randomizer(self.snap_2x3D)
+        draws = np.random.default_rng(42).standard_normal((2, 3))
+        sigma = np.sqrt(5.0 / np.array([[2.0], [3.0]]))
+        assert_array_almost_equal(new_2x3D.velocities, sigma * draws)
+
+    def test_pregenerated(self):
+        randomizer = RandomVelocities(beta=old_div(1.0, 5.0),
+                                      n_pregenerated=3)
+        randomizer._rng = np.random.default_rng(42)
+        draws = np.random.default_rng(42).standard_normal(18)
+        sigma = np.sqrt(5.0 / np.array([[2.0], [3.0]]))
+        for i in range(3):
+            new_2x3D = randomizer(self.snap_2x3D)
+            assert_array_almost_equal(new_2x3D.velocities,
+                                      sigma * draws[6*i:6*(i+1)].reshape(2, 3))
+        assert len(randomizer._pool) == 0
+        # the pool is refilled when it runs out
+        _ = randomizer(self.snap_2x3D)
+        assert len(randomizer._pool) == 12
+
+    def test_distribution(self):
+        # check the variance for a many-atom system
+        n_atoms = 10000
+        masses = np.linspace(1.0, 10.0, n_atoms)
+        topology = paths.engines.toy.Topology(n_spatial=3, n_atoms=n_atoms,
+                                              masses=masses, pes=None)
+        snap = paths.engines.toy.Snapshot(
+            coordinates=np.zeros((n_atoms, 3)),
+            velocities=np.zeros((n_atoms, 3)),
+            engine=paths.engines.toy.Engine({}, topology)
+        )
+        randomizer = RandomVelocities(beta=2.0)
+        new_snap = randomizer(snap)
+        # m v^2 has expectation 1 / beta per degree of freedom
+        mv2 = masses[:, np.newaxis] * new_snap.velocities**2
+        assert np.mean(mv2) == pytest.approx(0.5, rel=0.05)
+
     def test_probability_ratio(self):
         # Should be sampled correctio, so this has to be 1.0
         randomizer = RandomVelocities(beta=20)
@@ -9,6 +9,10 @@ from builtins import object
 import os
 
 import pytest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
 
 from nose.tools import (assert_equal)
 
@@ -19,7 +23,8 @@ import openpathsampling.engines.toy as toys
 
 from openpathsampling.netcdfplus import ObjectJSON
 from openpathsampling.storage import Storage
-from .test_helpers import (data_filename, md, compare_snapshot)
+from .test_helpers import (data_filename, md, compare_snapshot,
+                           make_1d_traj)
 
 import numpy as np
 from nose.plugins.skip import SkipTest
@@ -405,3 +410,341 @@ class TestStorage(object):
 
         assert(os.path.isfile(self.filename))
         assert(store.storage_version == paths.version.version)
+
+
+class TestStepSummary(object):
+    def setup_method(self):
+        paths.InterfaceSet._reset()
+        cv = paths.FunctionCV("x", lambda s: s.xyz[0][0])
+        state_A = paths.CVDefinedVolume(cv, float("-inf"), 0.0)
+        state_B = paths.CVDefinedVolume(cv, 1.0, float("inf"))
+        pes = toys.LinearSlope([0, 0, 0], 0)
+        integ = toys.LangevinBAOABIntegrator(0.01, 0.1, 2.5)
+        topology = toys.Topology(n_spatial=3, masses=[1.0], pes=pes)
+        engine = toys.Engine(options={'integ': integ}, topology=topology)
+        interfaces = paths.VolumeInterfaceSet(cv, float("-inf"),
+                                              [0.0, 0.1, 0.2])
+        self.network = paths.MISTISNetwork([(state_A, interfaces, state_B)])
+        self.scheme = paths.MoveScheme(self.network)
+        self.scheme.append([
+            paths.strategies.OneWayShootingStrategy(
+                selector=paths.UniformSelector(),
+                engine=engine
+            ),
+            paths.strategies.NearestNeighborRepExStrategy(),
+            paths.strategies.OrganizeByMoveGroupStrategy()
+        ])
+        init_traj = make_1d_traj([-0.1, 0.2, 0.5, 0.8, 1.1])
+        self.init_cond = self.scheme.initial_conditions_from_trajectories(
+            init_traj
+        )
+
+    def _run(self, filename, n_steps=10):
+        storage = paths.Storage(filename, mode='w')
+        sim = paths.PathSampling(storage=storage, move_scheme=self.scheme,
+                                 sample_set=self.init_cond)
+        sim.output_stream = open(os.devnull, 'w')
+        sim.run(n_steps)
+        storage.close()
+
+    @staticmethod
+    def _check_summary(storage):
+        summary = storage.steps.summary()
+        steps = list(storage.steps)
+        assert len(summary) == len(steps)
+        for step_idx, step in enumerate(steps):
+            canonical = step.change.canonical
+            assert summary.mccycle[step_idx] == step.mccycle
+            assert summary.accepted[step_idx] == canonical.accepted
+            if canonical.mover is None:
+                assert summary.mover[step_idx] == -1
+            else:
+                mover = storage.pathmovers[int(summary.mover[step_idx])]
+                assert mover == canonical.mover
+            for sample in step.active:
+                col = summary.replica_column(sample.replica)
+                ens_idx = summary.ensembles[step_idx, col]
+                traj_idx = summary.trajectories[step_idx, col]
+                assert storage.ensembles[int(ens_idx)] == sample.ensemble
+                assert storage.trajectories[int(traj_idx)] \
+                    == sample.trajectory
+
+    def test_summary_written_with_steps(self, tmpdir):
+        filename = str(tmpdir.join("summary.nc"))
+        self._run(filename)
+        storage = paths.AnalysisStorage(filename)
+        assert storage.steps.has_summary
+        assert storage.steps._missing_summary() == []
+        self._check_summary(storage)
+        storage.close()
+
+    def test_backfill(self, tmpdir):
+        filename = str(tmpdir.join("summary.nc"))
+        # mimic a file written without the summary
+        with mock.patch.object(paths.storage.MCStepStore,
+                               '_create_summary_variables'):
+            self._run(filename)
+
+        storage = paths.Storage(filename, mode='r')
+        assert not storage.steps.has_summary
+        # calculated from the steps for files that can't be changed
+        self._check_summary(storage)
+        storage.close()
+
+        storage = paths.Storage(filename, mode='a')
+        assert storage.steps.backfill_summary() == 11
+        assert storage.steps.backfill_summary() == 0
+        storage.close()
+
+        storage = paths.AnalysisStorage(filename)
+        assert storage.steps._missing_summary() == []
+        self._check_summary(storage)
+        storage.close()
+
+    def test_analysis_fast_paths(self, tmpdir):
+        from openpathsampling.analysis.tis.core import \
+            steps_to_weighted_trajectories
+        filename = str(tmpdir.join("summary.nc"))
+        self._run(filename, n_steps=20)
+        storage = paths.AnalysisStorage(filename)
+        steps = list(storage.steps)
+        scheme = storage.schemes[0]
+
+        ensembles = scheme.network.sampling_ensembles
+        assert (steps_to_weighted_trajectories(storage.steps, ensembles)
+                == steps_to_weighted_trajectories(steps, ensembles))
+
+        fast = paths.ReplicaNetwork(scheme, storage.steps)
+        slow = paths.ReplicaNetwork(scheme, steps)
+        assert fast.traces == slow.traces
+        assert fast.analysis == slow.analysis
+
+        cv = storage.cvs['x']
+        channels = {
+            'low': paths.AllInXEnsemble(
+                paths.CVDefinedVolume(cv, float("-inf"), 0.3)
+            )
+        }
+        assert (paths.ChannelAnalysis(storage.steps, channels)._results
+                == paths.ChannelAnalysis(steps, channels)._results)
+
+        # an overridden step number is used instead of the summary
+        class ScaledChannelAnalysis(paths.ChannelAnalysis):
+            @staticmethod
+            def _step_num(step):
+                return 10 * step.mccycle
+
+        scaled = ScaledChannelAnalysis(storage.steps, channels)._results
+        assert scaled == ScaledChannelAnalysis(steps, channels)._results
+        assert scaled != paths.ChannelAnalysis(steps, channels)._results
+        storage.close()
+
+
+class TestStorageProfiles(object):
+    def setup_method(self):
+        topology = toys.Topology(n_spatial=3, masses=[1.0] * 20, pes=None,
+                                 n_atoms=20)
+        engine = toys.Engine({}, topology)
+        rng = np.random.RandomState(0)
+        self.traj = paths.Trajectory([
+            toys.Snapshot(coordinates=rng.normal(size=(20, 3)),
+                          velocities=rng.normal(size=(20, 3)),
+                          engine=engine)
+            for _ in range(5)
+        ])
+        self.cv = paths.FunctionCV(
+            "x", lambda s: s.xyz[0][0]
+        ).with_diskcache(allow_incomplete=True)
+
+    def _create(self, filename, profile):
+        storage = paths.Storage(filename, mode='w', template=self.traj[0],
+                                profile=profile)
+        storage.save(self.traj)
+        storage.save(self.cv)
+        self.cv(self.traj)
+        storage.close()
+
+    @staticmethod
+    def _settings(filename, var_name):
+        storage = paths.Storage(filename, mode='r')
+        variable = storage.variables[var_name]
+        result = (storage.profile, variable.chunking(),
+                  variable.filters()['zlib'])
+        storage.close()
+        return result
+
+    @pytest.mark.parametrize('profile, chunking, zlib', [
+        ('default', [256, 20, 3], False),
+        ('write-optimized', [1, 20, 3], False),
+        ('analysis-optimized', [1024, 16, 3], False),
+        ('archival-compressed', [64, 20, 3], True),
+    ])
+    def test_profiles(self, tmpdir, profile, chunking, zlib):
+        filename = str(tmpdir.join("profile.nc"))
+        self._create(filename, profile)
+        assert self._settings(filename, 'snapshot0_coordinates') == \
+            (profile, chunking, zlib)
+        assert self._settings(filename, 'cv0_value')[2] == zlib
+
+    def test_unknown_profile(self, tmpdir):
+        with pytest.raises(ValueError):
+            paths.Storage(str(tmpdir.join("profile.nc")), mode='w',
+                          profile='foo')
+
+    def test_append_uses_saved_profile(self, tmpdir):
+        filename = str(tmpdir.join("profile.nc"))
+        storage = paths.Storage(filename, mode='w', template=self.traj[0],
+                                profile='archival-compressed')
+        storage.close()
+        storage = paths.Storage(filename, mode='a')
+        assert storage.profile == 'archival-compressed'
+        storage.save(self.traj)
+        assert storage.variables['snapshot0_coordinates'].filters()['zlib']
+        storage.close()
+
+    def test_rewrite_with_profile(self, tmpdir):
+        source = str(tmpdir.join("source.nc"))
+        target = str(tmpdir.join("target.nc"))
+        self._create(source, 'default')
+        Storage.rewrite_with_profile(source, target, 'archival-compressed')
+        assert self._settings(target, 'snapshot0_coordinates') == \
+            ('archival-compressed', [64, 20, 3], True)
+
+        storage = paths.Storage(target, mode='r')
+        traj = storage.trajectories[0]
+        # data are stored as float32
+        np.testing.assert_allclose(traj.xyz, self.traj.xyz, rtol=1e-6)
+        np.testing.assert_allclose(
+            np.array([s.velocities for s in traj]),
+            np.array([s.velocities for s in self.traj]),
+            rtol=1e-6
+        )
+        assert storage.cvs[0](traj) == self.cv(self.traj)
+        storage.close()
+
+
+class TestWriteBehind(object):
+    def setup_method(self):
+        topology = toys.Topology(n_spatial=3, masses=[1.0] * 4, pes=None,
+                                 n_atoms=4)
+        engine = toys.Engine({}, topology)
+        rng = np.random.RandomState(0)
+        self.trajs = [
+            paths.Trajectory([
+                toys.Snapshot(coordinates=rng.normal(size=(4, 3)),
+                              velocities=rng.normal(size=(4, 3)),
+                              engine=engine)
+                for _ in range(5)
+            ])
+            for _ in range(3)
+        ]
+
+    def _storage(self, tmpdir, max_objects=256):
+        filename = str(tmpdir.join("write_behind.nc"))
+        storage = paths.Storage(filename, mode='w', template=self.trajs[0][0])
+        storage.set_write_behind(max_objects)
+        return filename, storage
+
+    def test_buffered_until_sync(self, tmpdir):
+        _, storage = self._storage(tmpdir)
+        for traj in self.trajs:
+            storage.save(traj)
+
+        assert len(storage.trajectories) == 3
+        assert len(storage.snapshots) == 30
+        assert len(storage.dimensions['snapshot0']) == 0
+        assert storage.trajectories.write_buffer
+
+        storage.sync()
+        assert not storage.trajectories.write_buffer
+        assert len(storage.dimensions['snapshot0']) == 15
+        assert len(storage.dimensions['trajectories']) == 3
+        np.testing.assert_allclose(
+            storage.variables['snapshot0_coordinates'][:5],
+            self.trajs[0].xyz, rtol=1e-6
+        )
+        storage.close()
+
+    def test_load_before_flush(self, tmpdir):
+        _, storage = self._storage(tmpdir)
+        storage.save(self.trajs[0])
+        storage.snapshots.cache.clear()
+        storage.trajectories.cache.clear()
+        assert storage.trajectories.write_buffer
+        traj = storage.trajectories[0]
+        assert traj.__uuid__ == self.trajs[0].__uuid__
+        np.testing.assert_allclose(traj.xyz, self.trajs[0].xyz, rtol=1e-6)
+        storage.close()
+
+    def test_reopen(self, tmpdir):
+        filename, storage = self._storage(tmpdir)
+        for traj in self.trajs:
+            storage.save(traj)
+        storage.close()
+
+        storage = paths.Storage(filename, mode='r')
+        assert len(storage.trajectories) == 3
+        for loaded, traj in zip(storage.trajectories, self.trajs):
+            assert loaded.__uuid__ == traj.__uuid__
+            np.testing.assert_allclose(loaded.xyz, traj.xyz, rtol=1e-6)
+            np.testing.assert_allclose(
+                np.array([s.velocities for s in loaded]),
+                np.array([s.velocities for s in traj]),
+                rtol=1e-6
+            )
+        storage.close()
+
+    def test_slice_read_before_flush(self, tmpdir):
+        _, storage = self._storage(tmpdir)
+        storage.save(self.trajs[0])
+        storage.save(self.trajs[1])
+        assert storage.trajectories.write_buffer
+        snapshots = storage.trajectories.vars['snapshots'][0:2]
+        assert not storage.trajectories.write_buffer
+        assert [len(snaps) for snaps in snapshots] == [5, 5]
+        storage.close()
+
+    def test_cache_all_before_flush(self, tmpdir):
+        _, storage = self._storage(tmpdir)
+        for traj in self.trajs:
+            storage.save(traj)
+        storage.trajectories.cache.clear()
+        storage.trajectories.cache_all()
+        for idx, traj in enumerate(self.trajs):
+            assert storage.trajectories[idx].__uuid__ == traj.__uuid__
+        storage.close()
+
+    def test_row_key_is_buffered(self, tmpdir):
+        _, storage = self._storage(tmpdir)
+        storage.save(self.trajs[0])
+        velocities = storage.vars['snapshot0_velocities']
+        buffer = velocities.write_buffer
+        assert buffer
+        new_value = np.ones((4, 3))
+        # writes to a full row are buffered like single indices
+        velocities[0, :, :] = new_value
+        assert buffer
+        np.testing.assert_allclose(velocities[0], new_value)
+        np.testing.assert_allclose(velocities[0, :, :], new_value)
+        storage.sync()
+        np.testing.assert_allclose(velocities[0], new_value)
+        storage.close()
+
+    def test_max_objects(self, tmpdir):
+        _, storage = self._storage(tmpdir, max_objects=2)
+        storage.save(self.trajs[0])
+        assert len(storage.dimensions['trajectories']) == 0
+        storage.save(self.trajs[1])
+        assert len(storage.dimensions['trajectories']) == 2
+        assert not storage.trajectories.write_buffer
+        storage.close()
+
+    def test_switch_off(self, tmpdir):
+        _, storage = self._storage(tmpdir)
+        storage.save(self.trajs[0])
+        storage.set_write_behind(None)
+        assert storage.trajectories.write_buffer is None
+        assert len(storage.dimensions['trajectories']) == 1
+        storage.save(self.trajs[1])
+        assert len(storage.dimensions['trajectories']) == 2
+        storage.close()
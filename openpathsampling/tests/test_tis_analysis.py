@@ -1,6 +1,11 @@
 import itertools
+import math
 import random
 import pytest
+try:
+    from unittest.mock import MagicMock
+except ImportError:
+    from mock import MagicMock
 from nose.tools import assert_equal, assert_almost_equal, raises
 from .test_helpers import (make_1d_traj, MoverWithSignature, RandomMDEngine,
                            assert_frame_equal, assert_items_equal)
@@ -8,7 +13,11 @@ from .test_helpers import (make_1d_traj, MoverWithSignature, RandomMDEngine,
 from openpathsampling.analysis.tis import *
 from openpathsampling.analysis.tis.core import steps_to_weighted_trajectories
 from openpathsampling.analysis.tis.flux import default_flux_sort
+from openpathsampling.analysis.tis.interface_placement import (
+    propose_lambdas, local_crossing_probabilities, network_with_interface_sets
+)
 import openpathsampling as paths
+import openpathsampling.engines.toy as toys
 
 import pandas as pd
 import pandas.testing as pdt
@@ -1124,5 +1133,413 @@ class TestStandardTISAnalysis(TestTISAnalysis):
             assert prog.keywords['leave'] is expected_max_lambda
 
 
+def make_minus_move_steps(network, state_A, state_B, base_steps):
+    """MSTIS steps with accepted minus moves interleaved.
+
+    These are the steps of TestStandardTISAnalysis.test_with_minus_move_flux.
+    Returns the scheme and the steps.
+    """
+    scheme = paths.DefaultScheme(network, engine=RandomMDEngine())
+    scheme.build_move_decision_tree()
+
+    # `center` is the edge of the state/innermost interface
+    center = {state_A: 0.0, state_B: 1.0}
+    replica = {state_A: -1, state_B: -2}
+    minus_ensemble_to_mover = {m.minus_ensemble: m
+                               for m in scheme.movers['minus']}
+    state_to_minus_ensemble = {ens.state_vol: ens
+                               for ens in network.minus_ensembles}
+    minus_changes = []
+    # `delta` is the change on either side for in vs. out
+    for (state, delta) in [(state_A, 0.1), (state_B, -0.1)]:
+        minus_ens = state_to_minus_ensemble[state]
+        minus_mover = minus_ensemble_to_mover[minus_ens]
+        a_in = center[state] - delta
+        a_out = center[state] + delta
+        seq_1 = [a_in] + [a_out]*2 + [a_in]*5 + [a_out]*5 + [a_in]
+        seq_2 = [a_in] + [a_out]*3 + [a_in]*3 + [a_out]*3 + [a_in]
+
+        for seq in [seq_1, seq_2]:
+            traj = make_1d_traj(seq)
+            assert minus_ens(traj)
+            samp = paths.Sample(trajectory=traj,
+                                ensemble=minus_ens,
+                                replica=replica[state])
+            minus_changes.append(paths.AcceptedSampleMoveChange(
+                samples=[samp],
+                mover=minus_mover,
+                details=paths.Details()
+            ))
+
+    active = base_steps[0].active
+    steps = []
+    cycle = -1
+    for m_change in minus_changes:
+        cycle += 1
+        active = active.apply_samples(m_change.samples)
+        steps.append(paths.MCStep(mccycle=cycle, active=active,
+                                  change=m_change))
+        for old_step in base_steps[1:]:
+            cycle += 1
+            active = active.apply_samples(old_step.change.samples)
+            steps.append(paths.MCStep(mccycle=cycle, active=active,
+                                      change=old_step.change))
+
+    return scheme, steps
 
 
+class TestOnlineTISAnalysisHook(TISAnalysisTester):
+    def _make_analysis(self, network, flux_method=None, scheme=None):
+        if flux_method is None and scheme is None:
+            flux_method = DictFlux({(t.stateA, t.interfaces[0]): 0.1
+                                    for t in network.sampling_transitions})
+        return StandardTISAnalysis(
+            network=network,
+            flux_method=flux_method,
+            scheme=scheme,
+            max_lambda_calcs={t: {'bin_width': 0.1,
+                                  'bin_range': (-0.1, 1.1)}
+                              for t in network.sampling_transitions}
+        )
+
+    def _assert_same_results(self, online, offline, network):
+        for key in ['rate', 'transition_probability']:
+            for trans in network.transitions.values():
+                pair = (trans.stateA, trans.stateB)
+                assert_almost_equal(online[key][pair], offline[key][pair])
+        assert set(online['flux']) == set(offline['flux'])
+        for pair in offline['flux']:
+            assert_almost_equal(online['flux'][pair],
+                                offline['flux'][pair])
+        for ens, hist in offline['max_lambda'].items():
+            assert (online['max_lambda'][ens].histogram()
+                    == hist.histogram())
+        assert (online['conditional_transition_probability']
+                == offline['conditional_transition_probability'])
+
+    @pytest.mark.parametrize('network_name', ['mistis', 'mstis'])
+    def test_matches_standard_analysis(self, network_name):
+        network = getattr(self, network_name)
+        steps = getattr(self, network_name + '_steps')
+        offline = self._make_analysis(network)
+        offline.calculate(steps)
+        offline_results = dict(offline.results)
+
+        analysis = self._make_analysis(network)
+        hook = OnlineTISAnalysisHook(analysis)
+        for step in steps:
+            hook.add_step(step)
+        results = hook.update()
+        assert hook.n_steps == len(steps)
+        assert analysis.results is results
+        self._assert_same_results(results, offline_results, network)
+        for ens in network.sampling_ensembles:
+            lengths = results['path_length'][ens].histogram()
+            assert sum(lengths.values()) == len(steps)
+
+    def test_minus_move_flux(self):
+        scheme, steps = make_minus_move_steps(
+            self.mstis, self.state_A, self.state_B, self.mstis_steps
+        )
+        offline = self._make_analysis(self.mstis, scheme=scheme)
+        offline.calculate(steps)
+        offline_results = dict(offline.results)
+
+        analysis = self._make_analysis(self.mstis, scheme=scheme)
+        hook = OnlineTISAnalysisHook(analysis)
+        for step in steps:
+            hook.add_step(step)
+        results = hook.update()
+        self._assert_same_results(results, offline_results, self.mstis)
+
+    def test_update_before_steps(self):
+        hook = OnlineTISAnalysisHook(self._make_analysis(self.mistis))
+        with pytest.raises(RuntimeError):
+            hook.update()
+
+    def test_hook_schedule_and_blocks(self):
+        steps = self.mistis_steps
+        analysis = self._make_analysis(self.mistis)
+        hook = OnlineTISAnalysisHook(analysis, update_frequency=3,
+                                     block_size=1)
+        sim = MagicMock(sample_set=steps[0].active)
+        hook.before_simulation(sim)
+        for (step_number, step) in enumerate(steps[1:], start=1):
+            hook.after_step(sim, step_number, None, step.active, step,
+                            None)
+            # the initial sample set makes step 2 the third update step
+            if step_number < 2:
+                assert hook.results == {}
+            else:
+                assert hook.results != {}
+        hook.after_simulation(sim, None)
+        assert hook.n_steps == len(steps)
+
+        offline = self._make_analysis(self.mistis)
+        offline.calculate(steps)
+        self._assert_same_results(hook.results, dict(offline.results),
+                                  self.mistis)
+
+        # in the fake data, the last two steps alone have too little
+        # overlap for WHAM, so only the first two blocks give results
+        assert len(hook.block_results) == 2
+        assert hook.n_skipped_blocks == 2
+        blocks = [self._make_analysis(self.mistis) for _ in range(2)]
+        blocks[0].calculate(steps[:1])
+        blocks[1].calculate(steps[1:2])
+        stats = hook.block_statistics('rate')
+        for trans in self.mistis.transitions.values():
+            pair = (trans.stateA, trans.stateB)
+            block_rates = [b.results['rate'][pair] for b in blocks]
+            (mean, error) = stats[pair]
+            assert_almost_equal(mean, sum(block_rates) / 2.0)
+            assert_almost_equal(error,
+                                abs(block_rates[0] - block_rates[1]) / 2.0)
+
+        hook.reset()
+        assert hook.n_steps == 0
+        assert hook.block_statistics() == {}
+
+
+class TestInterfacePlacement(TISAnalysisTester):
+    def _exponential_tcp(self):
+        xvals = [0.1 * i for i in range(41)]
+        return paths.numerics.LookupFunction(
+            xvals, [math.exp(-x) for x in xvals]
+        )
+
+    def test_propose_lambdas_n_interfaces(self):
+        tcp = self._exponential_tcp()
+        lambdas = propose_lambdas(tcp, 0.0, 3.0, n_interfaces=4)
+        for (lmbda, expected) in zip(lambdas, [0.0, 1.0, 2.0, 3.0]):
+            assert_almost_equal(lmbda, expected)
+        local = local_crossing_probabilities(tcp, lambdas)
+        for prob in local:
+            assert_almost_equal(prob, math.exp(-1.0))
+
+    def test_propose_lambdas_local_probability(self):
+        tcp = self._exponential_tcp()
+        lambdas = propose_lambdas(tcp, 0.0, 3.0,
+                                  local_crossing_probability=0.5)
+        # ln(2) * 5 > 3.0 > ln(2) * 4, so 5 intervals of 0.6
+        assert len(lambdas) == 6
+        for (lmbda, expected) in zip(lambdas, [0.0, 0.6, 1.2, 1.8, 2.4,
+                                               3.0]):
+            assert_almost_equal(lmbda, expected)
+
+    def test_propose_lambdas_bad_input(self):
+        tcp = self._exponential_tcp()
+        with pytest.raises(ValueError):
+            propose_lambdas(tcp, 0.0, 3.0)
+        with pytest.raises(ValueError):
+            propose_lambdas(tcp, 0.0, 3.0, n_interfaces=4,
+                            local_crossing_probability=0.5)
+        with pytest.raises(ValueError):
+            propose_lambdas(tcp, 0.0, 3.0, n_interfaces=1)
+
+    def _make_placement(self, network):
+        return InterfacePlacement(network, {'bin_width': 0.05,
+                                            'bin_range': (0.0, 0.5)})
+
+    @pytest.mark.parametrize('network_name', ['mistis', 'mstis'])
+    def test_analyze_and_rebuild(self, network_name):
+        network = getattr(self, network_name)
+        placement = self._make_placement(network)
+        tcps = placement.analyze(getattr(self, network_name + '_steps'))
+        assert set(tcps) == set(placement.interface_sets)
+        for iface_set in placement.interface_sets:
+            lambdas = placement.propose_lambdas(iface_set)
+            assert len(lambdas) == len(iface_set)
+            assert lambdas[0] == iface_set.lambdas[0]
+            assert lambdas[-1] == iface_set.lambdas[-1]
+            assert lambdas == sorted(lambdas)
+            local = placement.local_crossing_probabilities(iface_set,
+                                                           lambdas)
+            assert len(local) == len(lambdas) - 1
+
+        new_ifaces = placement.propose_interface_sets(n_interfaces=4)
+        new_network = placement.rebuild_network(new_ifaces)
+        assert type(new_network) is type(network)
+        for trans in new_network.sampling_transitions:
+            assert trans.interfaces in new_ifaces.values()
+            assert len(trans.interfaces) == 4
+        assert (len(new_network.sampling_ensembles)
+                == 4 * len(network.sampling_transitions))
+
+    def test_rebuild_with_ms_outers(self):
+        (iface_AB, iface_BA) = [t.interfaces
+                                for t in self.mistis.sampling_transitions]
+        ms_outer = paths.MSOuterTISInterface.from_lambdas(
+            {iface_AB: 0.3, iface_BA: 0.3}
+        )
+        network = paths.MISTISNetwork(self.mistis.trans_info,
+                                      ms_outers=[ms_outer])
+        new_AB = iface_AB.with_lambdas([0.0, 0.15])
+        new_network = network_with_interface_sets(network,
+                                                  {iface_AB: new_AB})
+        [new_outer] = new_network.ms_outer_objects
+        assert set(new_outer.interface_sets) == {new_AB, iface_BA}
+        assert new_outer.lambdas == [0.3, 0.3]
+
+    def test_rebuild_bad_network(self):
+        with pytest.raises(TypeError):
+            network_with_interface_sets(paths.TPSNetwork(self.state_A,
+                                                         self.state_B),
+                                        {})
+
+    def test_initial_conditions(self):
+        placement = self._make_placement(self.mistis)
+        placement.analyze(self.mistis_steps)
+        new_network = placement.rebuild_network(n_interfaces=4)
+        scheme = paths.DefaultScheme(new_network, engine=RandomMDEngine())
+        placement.trajectories = self.trajs_AB + self.trajs_BA
+        init_conds = placement.initial_conditions(scheme)
+        filled = set(s.ensemble for s in init_conds)
+        # the direct transition trajectories fill every ensemble
+        assert set(new_network.sampling_ensembles) <= filled
+
+    def test_explore(self):
+        pes = toys.LinearSlope(m=[0.0, 0.0, 0.0], c=[0.0])
+        topology = toys.Topology(n_spatial=3, masses=[1.0, 1.0, 1.0],
+                                 pes=pes)
+        integrator = toys.LangevinBAOABIntegrator(dt=0.02, temperature=0.1,
+                                                  gamma=2.0)
+        engine = toys.Engine({'integ': integrator,
+                              'n_frames_max': 5000,
+                              'n_steps_per_frame': 5}, topology)
+        trajs = [
+            make_1d_traj([(-0.5 + i) * 0.1 for i in range(12)],
+                         engine=engine),
+            make_1d_traj([1.0 - (-0.5 + i) * 0.1 for i in range(12)],
+                         engine=engine)
+        ]
+        scheme = paths.OneWayShootingMoveScheme(
+            self.mistis, selector=paths.UniformSelector(), engine=engine
+        )
+        init_conds = scheme.initial_conditions_from_trajectories(trajs)
+        placement = InterfacePlacement(self.mistis,
+                                       {'bin_width': 0.05,
+                                        'bin_range': (0.0, 1.1)})
+        tcps = placement.explore(scheme, init_conds, 10)
+        assert set(tcps) == set(placement.interface_sets)
+        assert set(trajs) <= set(placement.trajectories)
+        # each trajectory is only recorded once
+        assert len(set(placement.trajectories)) == \
+            len(placement.trajectories)
+        for (iface_set, tcp) in tcps.items():
+            lambdas = placement.propose_lambdas(iface_set)
+            assert lambdas == sorted(lambdas)
+            assert lambdas[0] == 0.0
+            assert lambdas[-1] == 0.2
+
+
+class TestShardedTISAnalysis(TISAnalysisTester):
+    def _make_analysis(self, network, flux_method=None, scheme=None):
+        if flux_method is None and scheme is None:
+            flux_method = DictFlux({(t.stateA, t.interfaces[0]): 0.1
+                                    for t in network.sampling_transitions})
+        return StandardTISAnalysis(
+            network=network,
+            flux_method=flux_method,
+            scheme=scheme,
+            max_lambda_calcs={t: {'bin_width': 0.1,
+                                  'bin_range': (-0.1, 1.1)}
+                              for t in network.sampling_transitions}
+        )
+
+    def _storable_steps(self, network):
+        # the stub mover of the fake steps can't be loaded from storage
+        return self._make_fake_steps(self._make_fake_sampling_sets(network),
+                                     paths.IdentityPathMover())
+
+    def _save_shards(self, tmpdir, steps, objects, n_files):
+        filenames = []
+        for i in range(n_files):
+            filename = str(tmpdir.join("shard_{}.nc".format(i)))
+            storage = paths.Storage(filename, mode='w')
+            # the max lambda CV needs a stored trajectory as template
+            storage.save(self.trajs_AB[0])
+            for obj in objects:
+                storage.save(obj)
+            for step in steps[i::n_files]:
+                storage.save(step)
+            storage.close()
+            filenames.append(filename)
+        return filenames
+
+    def _assert_same_results(self, sharded, offline, network):
+        for key in ['rate', 'transition_probability']:
+            for trans in network.transitions.values():
+                pair = (trans.stateA, trans.stateB)
+                assert_almost_equal(sharded[key][pair], offline[key][pair])
+        for pair in offline['flux']:
+            assert_almost_equal(sharded['flux'][pair],
+                                offline['flux'][pair])
+        for ens, hist in offline['max_lambda'].items():
+            assert (sharded['max_lambda'][ens].histogram()
+                    == hist.histogram())
+        assert (sharded['conditional_transition_probability']
+                == offline['conditional_transition_probability'])
+
+    @pytest.mark.parametrize('files_per_task', [1, 2])
+    def test_matches_standard_analysis(self, tmpdir, files_per_task):
+        network = self.mistis
+        steps = self._storable_steps(network)
+        filenames = self._save_shards(tmpdir, steps, [network], 3)
+
+        offline = self._make_analysis(network)
+        offline.calculate(steps)
+
+        analysis = self._make_analysis(network)
+        sharded = ShardedTISAnalysis(analysis, filenames,
+                                     files_per_task=files_per_task)
+        results = sharded.calculate(n_workers=1)
+        assert analysis.results is results
+        assert sharded.counts.n_steps == len(steps)
+        self._assert_same_results(results, offline.results, network)
+
+    def test_minus_move_flux(self, tmpdir):
+        self.mstis_steps = self._storable_steps(self.mstis)
+        scheme, steps = make_minus_move_steps(
+            self.mstis, self.state_A, self.state_B, self.mstis_steps
+        )
+        filenames = self._save_shards(tmpdir, steps, [scheme], 2)
+
+        offline = self._make_analysis(self.mstis, scheme=scheme)
+        offline.calculate(steps)
+
+        sharded = ShardedTISAnalysis(
+            self._make_analysis(self.mstis, scheme=scheme), filenames
+        )
+        results = sharded.calculate(n_workers=1)
+        self._assert_same_results(results, offline.results, self.mstis)
+
+    def test_worker_processes(self, tmpdir):
+        network = self.mistis
+        steps = self._storable_steps(network)
+        filenames = self._save_shards(tmpdir, steps, [network], 2)
+
+        offline = self._make_analysis(network)
+        offline.calculate(steps)
+
+        sharded = ShardedTISAnalysis(self._make_analysis(network),
+                                     filenames)
+        results = sharded.calculate(n_workers=2)
+        self._assert_same_results(results, offline.results, network)
+
+    def test_no_steps(self, tmpdir):
+        filenames = self._save_shards(tmpdir, [], [self.mistis], 1)
+        sharded = ShardedTISAnalysis(self._make_analysis(self.mistis),
+                                     filenames)
+        with pytest.raises(RuntimeError):
+            sharded.calculate(n_workers=1)
+
+    def test_distributed_storage(self, tmpdir):
+        steps = self._storable_steps(self.mistis)
+        filenames = self._save_shards(tmpdir, steps, [self.mistis], 2)
+        storages = [paths.Storage(filename, mode='r')
+                    for filename in filenames]
+        distributed = paths.storage.DistributedUUIDStorage(storages)
+        assert len(distributed.steps) == len(steps)
+        for storage in storages:
+            storage.close()
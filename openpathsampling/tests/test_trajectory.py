@@ -138,3 +138,36 @@ class TestSubtrajectoryIndices(object):
         assert_equal(indicesA, [[0, 1], [3], [11, 12]])
         assert_equal(indicesB, [[5, 6], [8]])
         assert_equal(indicesABA, [[3, 4, 5, 6, 7, 8, 9, 10, 11]])
+
+class TestReversedTrajectoryView(object):
+    def setup_method(self):
+        self.traj = make_1d_traj([0.0, 1.0, 2.0, 3.0])
+        self.view = paths.engines.ReversedTrajectoryView(self.traj[1:])
+
+    def test_access(self):
+        assert_equal(len(self.view), 3)
+        assert_equal(self.view[0], self.traj[1])
+        assert_equal(self.view[-1], self.traj[3])
+        assert_equal(self.view.get_as_proxy(1), self.traj[2])
+        assert_equal(list(self.view), self.traj[1:].as_proxies())
+        assert_equal(self.view[0:2], self.traj[1:3])
+        assert_equal(self.view[[2, 0]], self.traj[[3, 1]])
+        assert_equal(self.view.index(self.traj[3]), 2)
+        assert_equal(self.view, self.traj[1:])
+        assert_equal(hash(self.view), hash(self.traj[1:]))
+
+    def test_prepend_and_pop(self):
+        self.view.prepend(self.traj[0])
+        assert_equal(self.view, self.traj)
+        assert_equal(self.view.pop_first(), self.traj[0])
+        assert_equal(self.view, self.traj[1:])
+
+    def test_materialize(self):
+        self.view.prepend(self.traj[0])
+        traj = self.view.materialize()
+        assert type(traj) is paths.Trajectory
+        assert_equal(traj.as_proxies(), self.traj.as_proxies())
+
+    @raises(IndexError)
+    def test_index_out_of_range(self):
+        self.view[3]
@@ -265,3 +265,129 @@ class TestTrajectoryTransitionAnalysis(object):
         assert_equal(trans_times[A2B].mean(),
                      self.analyzer.transition_duration[A2B].mean())
 
+
+
+def _ensemble_lifetime_segments(trajectory, from_vol, to_vol,
+                                forbidden=None, padding=[0, -1]):
+    # reference: the ensemble-based implementation
+    if forbidden is None:
+        forbidden = paths.EmptyVolume()
+    ensemble_BAB = paths.SequentialEnsemble([
+        paths.LengthEnsemble(1) & paths.AllInXEnsemble(to_vol),
+        paths.AllOutXEnsemble(to_vol) & paths.PartInXEnsemble(from_vol),
+        paths.LengthEnsemble(1) & paths.AllInXEnsemble(to_vol)
+    ]) & paths.AllOutXEnsemble(forbidden)
+    ensemble_AB = paths.SequentialEnsemble([
+        paths.LengthEnsemble(1) & paths.AllInXEnsemble(from_vol),
+        paths.OptionalEnsemble(paths.AllOutXEnsemble(to_vol)),
+        paths.LengthEnsemble(1) & paths.AllInXEnsemble(to_vol)
+    ])
+    BAB_split = ensemble_BAB.split(trajectory)
+    AB_split = [ensemble_AB.split(part)[0] for part in BAB_split]
+    return [subtraj[padding[0]:padding[1]] for subtraj in AB_split]
+
+
+def _ensemble_transition_segments(trajectory, stateA, stateB):
+    # reference: the ensemble-based implementation
+    transition_ensemble = paths.SequentialEnsemble([
+        paths.AllInXEnsemble(stateA) & paths.LengthEnsemble(1),
+        paths.OptionalEnsemble(
+            paths.AllOutXEnsemble(stateA) & paths.AllOutXEnsemble(stateB)
+        ),
+        paths.AllInXEnsemble(stateB) & paths.LengthEnsemble(1)
+    ])
+    return [seg[1:-1] for seg in transition_ensemble.split(trajectory)]
+
+
+class TestTrajectoryTransitionAnalysisChunks(TestTrajectoryTransitionAnalysis):
+    # all tests again, with runs that continue across chunks
+    def setup_method(self):
+        super(TestTrajectoryTransitionAnalysisChunks, self).setup_method()
+        self.analyzer.chunksize = 3
+
+    def _random_strings(self, n_strings=10, length=40):
+        rng = random.Random(5)
+        return [''.join(rng.choice('aaiixxbb') for _ in range(length))
+                for _ in range(n_strings)]
+
+    def test_mask_runs(self):
+        from openpathsampling.analysis.trajectory_transition_analysis \
+            import _mask_runs
+        masks = np.array([[1, 1, 0, 0, 0, 1],
+                          [0, 0, 0, 1, 1, 1]], dtype=bool)
+        runs = [(start, length, inside.tolist())
+                for (start, length, inside) in _mask_runs(masks)]
+        assert_equal(runs, [(0, 2, [True, False]),
+                            (2, 1, [False, False]),
+                            (3, 2, [False, True]),
+                            (5, 1, [True, True])])
+
+    def test_matches_ensembles(self):
+        states = [self.stateA, self.stateB]
+        volume_sets = [
+            (self.stateA, self.stateB, None, [0, -1]),
+            (self.stateA, ~self.interfaceA0, self.stateB, [None, -1]),
+            (~self.interfaceA0, self.stateA, self.stateB, [None, -1]),
+            # overlapping volumes
+            (self.interfaceA0, self.stateA, None, [None, None])
+        ]
+        for traj_str in self._random_strings():
+            traj = self._make_traj(traj_str)
+            for chunksize in [1, 4, 10000]:
+                self.analyzer.chunksize = chunksize
+                for state in states:
+                    assert_equal(
+                        self.analyzer.analyze_continuous_time(traj,
+                                                              state)[:],
+                        paths.AllInXEnsemble(state).split(traj, overlap=0)
+                    )
+                for (vol1, vol2) in [(self.stateA, self.stateB),
+                                     (self.stateB, self.stateA),
+                                     (self.interfaceA0, self.stateA)]:
+                    assert_equal(
+                        self.analyzer.analyze_transition_duration(
+                            traj, vol1, vol2
+                        )[:],
+                        _ensemble_transition_segments(traj, vol1, vol2)
+                    )
+                for (from_vol, to_vol, forbidden, padding) in volume_sets:
+                    assert_equal(
+                        self.analyzer.get_lifetime_segments(
+                            traj, from_vol, to_vol, forbidden, padding,
+                            chunksize=chunksize
+                        ),
+                        _ensemble_lifetime_segments(traj, from_vol, to_vol,
+                                                    forbidden, padding)
+                    )
+
+    def test_analyze_single_pass(self):
+        trajs = [self._make_traj(s) for s in self._random_strings(3)]
+        self.analyzer.analyze(trajs)
+        reference = paths.TrajectoryTransitionAnalysis(self.transition,
+                                                       dt=0.1)
+        for traj in trajs:
+            for state in [self.stateA, self.stateB]:
+                reference.continuous_segments[state] += \
+                    reference.analyze_continuous_time(traj, state)
+                reference.lifetime_segments[state] += \
+                    reference.analyze_lifetime(traj, state)
+                flux = reference.analyze_flux(traj, state)
+                reference.flux_segments[state]['in'] += flux['in']
+                reference.flux_segments[state]['out'] += flux['out']
+            for (stateA, stateB) in reference.transition_segments:
+                reference.transition_segments[(stateA, stateB)] += \
+                    reference.analyze_transition_duration(traj, stateA,
+                                                          stateB)
+
+        for attr in ['continuous_segments', 'lifetime_segments',
+                     'transition_segments']:
+            ours = getattr(self.analyzer, attr)
+            theirs = getattr(reference, attr)
+            for key in theirs:
+                assert_equal(ours[key][:], theirs[key][:])
+        for state in [self.stateA, self.stateB]:
+            for direction in ['in', 'out']:
+                assert_equal(
+                    self.analyzer.flux_segments[state][direction][:],
+                    reference.flux_segments[state][direction][:]
+                )
@@ -421,8 +421,9 @@ class CVDefinedVolume(Volume):
         return val.__float__()
 
     def __call__(self, snapshot):
-        l = self._get_cv_float(snapshot)
+        return self._contains_value(self._get_cv_float(snapshot))
 
+    def _contains_value(self, l):
         # we explicitly test for infinity to allow the user to
         # define `lambda_min/max='inf'` also when using units
         # an openmm unit cannot be compared to a python infinite float
@@ -530,8 +531,7 @@ class PeriodicCVDefinedVolume(CVDefinedVolume):
                                     self.period_min, self.period_max
                                    )
 
-    def __call__(self, snapshot):
-        l = self._get_cv_float(snapshot)
+    def _contains_value(self, l):
         if self.wrap:
             l = self.do_wrap(l)
         if self.lambda_min > self.lambda_max: